@@ -1,23 +1,169 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import FileResponse
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.middleware.gzip import GZipMiddleware
+try:
+    from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+except ImportError:  # Starlette plus ancienne : pas d'exclusion par type de contenu
+    DEFAULT_EXCLUDED_CONTENT_TYPES = None
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from datetime import date, timedelta
-from services.calcul import calcul_tableau, calcul_detail, RESULTS_DIR
+from services.calcul import (
+    calcul_tableau, calcul_tableau_colonnes, calcul_detail, calcul_detail_colonnes, calcul_lot, calcul_recherche, csv_tableau,
+    devis_toutes_proprietes, flux_csv_tableau, iterer_tableau, lister_periodes, modifier_periodes, lister_proprietes, registre_propriete,
+    obtenir_matrice, tableaux_plateformes,
+    statistiques_donnees, version_donnees, cache_csv,
+)
+from services.cache import CacheLRU
+from services import profilage
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from fastapi import Request
-from core.utils import formater_date_jour
+from core import metriques
+from core.tableau_tarifs import TableauTarifs
+from core.utils import formater_date_jour, lire_date
+
+import csv
+import hashlib
+import hmac
+import io
+import json
 
 import os
 
+try:
+    import orjson
+except ImportError:  # orjson est facultatif : json de la bibliothèque standard sinon
+    orjson = None
+
 # On récupère le chemin absolu du projet pour éviter les erreurs 404
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 
 app = FastAPI(title="Tarifs Location")
 
+# Les réponses plus grandes sont compressées pour les clients qui acceptent gzip
+TAILLE_MIN_COMPRESSION = 1024
+# Les archives zip des exports sont déjà compressées
+TYPES_NON_COMPRESSES = ("application/zip",)
+if DEFAULT_EXCLUDED_CONTENT_TYPES is None:
+    app.add_middleware(GZipMiddleware, minimum_size=TAILLE_MIN_COMPRESSION)
+else:
+    app.add_middleware(
+        GZipMiddleware, minimum_size=TAILLE_MIN_COMPRESSION,
+        exclude_content_types=tuple(dict.fromkeys((*DEFAULT_EXCLUDED_CONTENT_TYPES, *TYPES_NON_COMPRESSES))),
+    )
+
+# Format colonnes de /detail et /tableau, demandé par ?format=colonnes ou par l'en-tête Accept
+TYPE_COLONNES = "application/vnd.tarifs.colonnes+json"
+
 # On monte le dossier static pour les fichiers CSS/JS
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_PATH, "static")), name="static")
 templates = Jinja2Templates(directory=os.path.join(BASE_PATH, "templates"))
 
+# Réponses JSON déjà calculées de /tableau et /detail
+cache_reponses = CacheLRU(max_entrees=256, max_octets=32 * 1024 * 1024)
+nb_non_modifies = 0
+
+metriques.enregistrer_cache("reponses", cache_reponses.statistiques)
+
+
+def encoder_json(donnees) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(donnees)
+    return json.dumps(donnees, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def format_colonnes(request: Request, format: str) -> bool:
+    # Le paramètre l'emporte sur l'en-tête Accept
+    if format is not None:
+        return format == "colonnes"
+    return TYPE_COLONNES in request.headers.get("accept", "")
+
+
+def propriete_demandee(propriete: str = Query(None)) -> str:
+    # Propriété visée par la requête (None = propriété par défaut)
+    try:
+        registre_propriete(propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return propriete
+
+
+def plateforme_demandee(plateforme: str = Query(None), propriete: str = Depends(propriete_demandee)) -> str:
+    # Plateforme parmi les commissions des règles de la propriété (None = tarif net)
+    if not plateforme:
+        return None
+    plateforme = plateforme.lower()
+    commissions = registre_propriete(propriete).index().commissions
+    if plateforme not in commissions:
+        raise HTTPException(
+            status_code=422, detail=f"Plateforme '{plateforme}' inconnue ({', '.join(commissions)})"
+        )
+    return plateforme
+
+
+def reponse_en_cache(request: Request, route: str, params: dict, calcul):
+    """
+    Renvoie la réponse JSON de 'calcul()' en passant par le cache.
+
+    La clé associe la route, les paramètres normalisés et la version des
+    fichiers de données : l'ETag se calcule donc sans rien recalculer, et un
+    If-None-Match correspondant reçoit directement une 304.
+    """
+    global nb_non_modifies
+
+    mode = mode_profil(request)
+    if mode:
+        return reponse_profilee(route, mode, calcul)
+
+    cle = (route, version_donnees(params.get("propriete")), tuple(sorted(params.items())))
+    etag = '"' + hashlib.sha1(repr(cle).encode()).hexdigest()[:20] + '"'
+    entetes = {"ETag": etag, "Cache-Control": "public, no-cache", "Vary": "Accept"}
+
+    etags_client = request.headers.get("if-none-match", "")
+    if etag in [e.strip() for e in etags_client.split(",")] or etags_client.strip() == "*":
+        nb_non_modifies += 1
+        return Response(status_code=304, headers=entetes)
+
+    def encoder():
+        donnees = calcul()
+        with metriques.mesurer("serialisation_json"):
+            return encoder_json(donnees)
+
+    corps = cache_reponses.obtenir_ou_calculer(cle, encoder)
+    return Response(content=corps, media_type="application/json", headers=entetes)
+
+
+def mode_profil(request: Request):
+    """
+    Mode de profilage demandé par l'en-tête X-Profil ou le paramètre 'profil'
+    ('inline' pour recevoir les piles au lieu du résultat), ou None.
+    Sans TARIFS_PROFILAGE=1 côté serveur, la demande est ignorée.
+    """
+    valeur = request.headers.get("x-profil") or request.query_params.get("profil")
+    if not profilage.profilage_demande(valeur):
+        return None
+    return "inline" if valeur.strip().lower() == "inline" else "fichier"
+
+
+def reponse_profilee(route: str, mode: str, calcul):
+    """
+    Exécute 'calcul()' sous l'échantillonneur, sans passer par le cache.
+
+    En mode 'inline', la réponse est le profil en piles repliées ; sinon le
+    profil est enregistré et son nom renvoyé dans l'en-tête X-Profil.
+    """
+    with profilage.Echantillonneur() as profil:
+        donnees = calcul()
+        corps = encoder_json(donnees)
+
+    piles = profil.piles_repliees()
+    if mode == "inline":
+        return PlainTextResponse(piles, headers={"X-Profil-Duree": f"{profil.duree:.6f}"})
+
+    nom = profilage.enregistrer_profil(route, piles)
+    return Response(content=corps, media_type="application/json",
+                    headers={"X-Profil": nom, "Cache-Control": "no-store"})
+
 
 @app.get("/")
 def home(request: Request):
@@ -25,71 +171,508 @@ def home(request: Request):
     aujourdhui = date.today()
     jour_depart = aujourdhui + timedelta(days=7) # Aujourd'hui + 7 jours
     
-    return templates.TemplateResponse("index.html", {
-        "request": request,
+    return templates.TemplateResponse(request, "index.html", {
         "default_debut": aujourdhui.isoformat(),
         "default_fin": jour_depart.isoformat()
     })
 
-def frais_menage(nb_nuitees: int) -> float:
-    return 25.0 if nb_nuitees <= 2 else 40.0
-
 @app.get("/tableau")
 def tableau(
+    request: Request,
     date_debut: date = Query(...),
     date_fin: date = Query(...),
-    plateforme: str = Query(None, enum=["airbnb", "booking", "abritel", "gites"]),
-    menage: bool = Query(False)
+    plateforme: str = Depends(plateforme_demandee),
+    menage: bool = Query(False),
+    format: str = Query(None, enum=["lignes", "colonnes"]),
+    propriete: str = Depends(propriete_demandee)
 ):
+    colonnes = format_colonnes(request, format)
+    params = {
+        "date_debut": date_debut.isoformat(),
+        "date_fin": date_fin.isoformat(),
+        "plateforme": plateforme,
+        "menage": menage,
+        "propriete": propriete,
+        "colonnes": colonnes,
+    }
+    return reponse_en_cache(
+        request, "tableau", params,
+        lambda: calculer_tableau(date_debut, date_fin, plateforme, menage, propriete, colonnes),
+    )
+
+
+def calculer_tableau(date_debut: date, date_fin: date, plateforme: str, menage: bool,
+                     propriete: str = None, colonnes: bool = False):
     # On calcule jusqu'à la veille du départ
     derniere_nuitee = date_fin - timedelta(days=1)
-    rows = calcul_tableau(date_debut, derniere_nuitee, plateforme)
+    try:
+        if colonnes:
+            donnees = calcul_tableau_colonnes(date_debut, derniere_nuitee, plateforme, propriete)
+        else:
+            donnees = calcul_tableau(date_debut, derniere_nuitee, plateforme, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     if menage:
-        for row in rows:
-            try:
-                row["prix_semaine_7j"] = f"{float(row['prix_semaine_7j']) + frais_menage(7):.2f}"
-            except ValueError:
-                pass  # "trop court" — on ne touche pas
-    return rows
+        plan = registre_propriete(propriete).obtenir().plan
+        if colonnes:
+            donnees["prix_semaine_7j"] = [
+                None if prix is None else round(prix + plan.frais_menage(7), 2)
+                for prix in donnees["prix_semaine_7j"]
+            ]
+        else:
+            for row in donnees:
+                ajouter_menage(row, plan)
+    return donnees
+
+
+def ajouter_menage(row: dict, plan) -> dict:
+    # Ajoute le forfait de ménage au prix indicatif sur 7 nuits
+    try:
+        row["prix_semaine_7j"] = f"{float(row['prix_semaine_7j']) + plan.frais_menage(7):.2f}"
+    except ValueError:
+        pass  # "trop court" — on ne touche pas
+    return row
+
+
+@app.get("/tableau/flux")
+def tableau_flux(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    plateforme: str = Depends(plateforme_demandee),
+    menage: bool = Query(False),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Même contenu que /tableau, une ligne JSON par période, envoyé au fil du calcul
+    derniere_nuitee = date_fin - timedelta(days=1)
+    try:
+        rows = iterer_tableau(date_debut, derniere_nuitee, plateforme, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if menage:
+        plan = registre_propriete(propriete).obtenir().plan
+        rows = (ajouter_menage(row, plan) for row in rows)
+
+    return StreamingResponse(TableauTarifs.blocs_ndjson(rows), media_type="application/x-ndjson")
 
 
 @app.get("/detail")
 def detail(
+    request: Request,
     date_debut: date = Query(...),
     date_fin: date = Query(...),
-    menage: bool = Query(False)
+    menage: bool = Query(False),
+    format: str = Query(None, enum=["lignes", "colonnes"]),
+    propriete: str = Depends(propriete_demandee)
 ):
+    colonnes = format_colonnes(request, format)
+    params = {
+        "date_debut": date_debut.isoformat(),
+        "date_fin": date_fin.isoformat(),
+        "menage": menage,
+        "propriete": propriete,
+        "colonnes": colonnes,
+    }
+    calcul = calculer_detail_colonnes if colonnes else calculer_detail
+    return reponse_en_cache(
+        request, "detail", params,
+        lambda: calcul(date_debut, date_fin, menage, propriete),
+    )
+
+
+def verifier_detail(calculateur, date_debut: date, derniere_nuitee: date):
+    # Seul le minimum propre au tarif d'arrivée s'applique : l'API chiffre aussi les séjours d'une nuit
+    if derniere_nuitee >= date_debut:
+        calculateur.plan.verifier_sejour(calculateur.calendrier, date_debut, derniere_nuitee, minimum_global=False)
+
+
+def calculer_detail_colonnes(date_debut: date, date_fin: date, menage: bool, propriete: str = None):
+    # Mêmes montants que calculer_detail ; les nuitées sont des prix en centimes à partir de date_debut
+    derniere_nuitee = date_fin - timedelta(days=1)
+    calculateur = registre_propriete(propriete).obtenir()
+    try:
+        verifier_detail(calculateur, date_debut, derniere_nuitee)
+        prix, periodes = calcul_detail_colonnes(date_debut, derniere_nuitee, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    devis = calculateur.plan.devis(sum(prix), len(prix), menage)
+    return {
+        "date_debut": date_debut.isoformat(),
+        "prix_centimes": prix,
+        "periodes": periodes,
+        "total": devis.total,
+        "total_nuitees": devis.nuitees,
+        "remise_montant": devis.remise,
+        "menage_montant": devis.menage,
+        "moyenne": devis.moyenne,
+        "nb_nuitees": devis.nb_nuitees,
+    }
+
+
+def calculer_detail(date_debut: date, date_fin: date, menage: bool, propriete: str = None):
     # On calcule jusqu'à la veille du départ
     derniere_nuitee = date_fin - timedelta(days=1)
-    details, total = calcul_detail(date_debut, derniere_nuitee)
+    calculateur = registre_propriete(propriete).obtenir()
+    try:
+        verifier_detail(calculateur, date_debut, derniere_nuitee)
+        details, total = calcul_detail(date_debut, derniere_nuitee, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     nb_nuitees = len(details)
-    moyenne = total / nb_nuitees if nb_nuitees > 0 else 0
+    devis = calculateur.plan.devis(round(total * 100), nb_nuitees, menage)
 
     # On utilise formater_date_jour pour envoyer une chaîne déjà prête
     formated_details = [[formater_date_jour(d), p] for d, p in details]
-    montant_menage = 0.0
+    if devis.remise:
+        formated_details.append(["Remise durée", -devis.remise])
     if menage:
-        montant_menage = frais_menage(nb_nuitees)
-        formated_details.append(["Frais de ménage", montant_menage])
-        total += montant_menage
+        formated_details.append(["Frais de ménage", devis.menage])
 
     return {
         "details": formated_details,
-        "total": total,
-        "total_nuitees": total - montant_menage,
-        "menage_montant": montant_menage,
-        "moyenne": moyenne,
+        "total": devis.total,
+        "total_nuitees": devis.nuitees,
+        "remise_montant": devis.remise,
+        "menage_montant": devis.menage,
+        "moyenne": devis.moyenne,
         "nb_nuitees": nb_nuitees,
     }
 
+@app.get("/matrice")
+def matrice(
+    request: Request,
+    date_debut: date = Query(None),
+    date_fin: date = Query(None),
+    plateforme: str = Depends(plateforme_demandee),
+    format: str = Query(None, enum=["json", "binaire"]),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Totaux de tous les séjours par date d'arrivée (date_debut → date_fin incluses) et par durée
+    binaire = format == "binaire" or (
+        format is None and "application/octet-stream" in request.headers.get("accept", "")
+    )
+    if binaire:
+        try:
+            contenu = obtenir_matrice(propriete).en_octets([plateforme], date_debut, date_fin)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(content=contenu, media_type="application/octet-stream",
+                        headers={"Cache-Control": "public, no-cache"})
+
+    params = {
+        "date_debut": date_debut.isoformat() if date_debut else None,
+        "date_fin": date_fin.isoformat() if date_fin else None,
+        "plateforme": plateforme,
+        "propriete": propriete,
+    }
+    return reponse_en_cache(
+        request, "matrice", params,
+        lambda: calculer_matrice(date_debut, date_fin, plateforme, propriete),
+    )
+
+
+def calculer_matrice(date_debut: date, date_fin: date, plateforme: str, propriete: str = None):
+    try:
+        matrice = obtenir_matrice(propriete)
+        lignes = [
+            {"date_debut": jour.isoformat(), "totaux": totaux}
+            for jour, totaux in matrice.lignes(plateforme, date_debut, date_fin)
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "plateforme": plateforme,
+        "nuits_min": matrice.nuits_min,
+        "nuits_max": matrice.nuits_max,
+        "lignes": lignes,
+    }
+
+
+@app.get("/recherche")
+def recherche(
+    request: Request,
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    nuits: int = Query(7, ge=1),
+    nuits_max: int = Query(None, ge=1),
+    plateforme: str = Depends(plateforme_demandee),
+    k: int = Query(5, ge=1, le=100),
+    ordre: str = Query("moins_cher", enum=["moins_cher", "plus_cher"]),
+    critere: str = Query("total", enum=["total", "moyenne"]),
+    propriete: str = Depends(propriete_demandee)
+):
+    # date_fin est le dernier jour de départ possible
+    derniere_nuitee = date_fin - timedelta(days=1)
+
+    def calculer():
+        try:
+            fenetres = calcul_recherche(
+                date_debut, derniere_nuitee, nuits, nuits_max, plateforme,
+                k=k, moins_chers=(ordre == "moins_cher"), critere=critere, propriete=propriete,
+                minimum_global=False,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return formater_fenetres(fenetres)
+
+    mode = mode_profil(request)
+    if mode:
+        return reponse_profilee("recherche", mode, calculer)
+    return calculer()
+
+
+def formater_fenetres(fenetres) -> list:
+    return [
+        {
+            "date_debut": f.debut.isoformat(),
+            "date_fin": (f.derniere_nuitee + timedelta(days=1)).isoformat(),
+            "nb_nuitees": f.nb_nuitees,
+            "total": f.total,
+            "moyenne": f.moyenne,
+        }
+        for f in fenetres
+    ]
+
+
+def lire_sejours(corps: bytes, type_contenu: str):
+    """
+    Lit une liste de séjours (date_debut, date_fin) depuis un tableau JSON
+    ou un CSV (délimiteur ';' ou ',') avec les colonnes date_debut et date_fin.
+    """
+    texte = corps.decode("utf-8-sig")
+    if "csv" in type_contenu:
+        delimiteur = ";" if ";" in texte.split("\n", 1)[0] else ","
+        lignes = list(csv.DictReader(io.StringIO(texte), delimiter=delimiteur))
+    else:
+        lignes = json.loads(texte)
+        if not isinstance(lignes, list):
+            raise ValueError("Un tableau JSON de séjours est attendu")
+
+    return [(lire_date(l["date_debut"]), lire_date(l["date_fin"])) for l in lignes]
+
+
+def chiffrer_sejours(corps: bytes, type_contenu: str, plateforme: str, menage: bool, propriete: str) -> list:
+    """
+    Lit et chiffre les séjours de /quotes ; exécuté hors de la boucle
+    d'événements, le calcul par lot pouvant être long.
+    """
+    try:
+        sejours = lire_sejours(corps, type_contenu)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Séjours illisibles : {e}")
+
+    debuts = [debut for debut, _ in sejours]
+    # Comme pour /detail, on calcule jusqu'à la veille du départ
+    dernieres_nuitees = [fin - timedelta(days=1) for _, fin in sejours]
+    try:
+        resultat = calcul_lot(debuts, dernieres_nuitees, plateforme, menage, propriete, minimum_global=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    lignes = []
+    for (debut, fin), total, moyenne, nb, minimum in zip(
+        sejours, resultat.totaux, resultat.moyennes, resultat.nb_nuitees, resultat.minimums
+    ):
+        ligne = {"date_debut": debut.isoformat(), "date_fin": fin.isoformat(), "nb_nuitees": int(nb)}
+        if 0 < nb < minimum:
+            # Même règle que /detail : le séjour est refusé, sans bloquer les autres
+            ligne["erreur"] = f"Séjour trop court ({nb} jour(s)). Le minimum est de {minimum} jours."
+        else:
+            ligne.update(total=float(total), moyenne=float(moyenne))
+        lignes.append(ligne)
+    return lignes
+
+
+@app.post("/quotes")
+async def quotes(
+    request: Request,
+    plateforme: str = Depends(plateforme_demandee),
+    menage: bool = Query(False),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Le corps est lu ici (asynchrone), le calcul tourne dans le pool de threads
+    corps = await request.body()
+    return await run_in_threadpool(
+        chiffrer_sejours, corps, request.headers.get("content-type", ""), plateforme, menage, propriete
+    )
+
+
 @app.get("/download-csv")
-def download_csv(plateforme: str = Query(None)):
+def download_csv(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    plateforme: str = Depends(plateforme_demandee),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Mêmes paramètres que /tableau : le CSV est produit en mémoire à la demande
+    derniere_nuitee = date_fin - timedelta(days=1)
+    try:
+        contenu = csv_tableau(date_debut, derniere_nuitee, plateforme, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     nom_fichier = f"tableau_tarifs_{plateforme}.csv" if plateforme else "tableau_tarifs.csv"
-    file_path = RESULTS_DIR / nom_fichier
+    return Response(
+        content=contenu,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nom_fichier}"'},
+    )
+
+
+@app.get("/download-csv/flux")
+def download_csv_flux(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    plateforme: str = Depends(plateforme_demandee),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Même fichier que /download-csv, encodé par blocs : la mémoire reste
+    # constante quelle que soit la longueur de la plage
+    derniere_nuitee = date_fin - timedelta(days=1)
+    try:
+        blocs = flux_csv_tableau(date_debut, derniere_nuitee, plateforme, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    nom_fichier = f"tableau_tarifs_{plateforme}.csv" if plateforme else "tableau_tarifs.csv"
+    return StreamingResponse(
+        iter(blocs),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nom_fichier}"'},
+    )
+
+
+@app.get("/download-csv/plateformes")
+def download_csv_plateformes(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    format: str = Query("zip", enum=["zip", "large"]),
+    propriete: str = Depends(propriete_demandee)
+):
+    # Tableaux nets et de toutes les plateformes, calculés en un seul parcours :
+    # un CSV par plateforme dans un zip, ou un CSV large aux prix côte à côte
+    derniere_nuitee = date_fin - timedelta(days=1)
+    try:
+        contenu = tableaux_plateformes(date_debut, derniere_nuitee, format, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "zip":
+        return Response(
+            content=contenu,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="tableaux_tarifs.zip"'},
+        )
+    return Response(
+        content=contenu,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="tableau_tarifs_plateformes.csv"'},
+    )
+
+
+@app.get("/proprietes")
+def proprietes():
+    return lister_proprietes()
+
+
+def jeton_administration(authorization: str = Header(None)):
+    """
+    Exige l'en-tête 'Authorization: Bearer <jeton>', le jeton étant celui de
+    la variable d'environnement TARIFS_JETON_ADMIN. Sans cette variable,
+    les modifications des périodes et les profils de /debug sont refusés.
+    """
+    attendu = os.environ.get("TARIFS_JETON_ADMIN")
+    if not attendu:
+        raise HTTPException(status_code=403, detail="Administration désactivée (TARIFS_JETON_ADMIN)")
+
+    schema, _, jeton = (authorization or "").partition(" ")
+    if schema.lower() != "bearer" or not hmac.compare_digest(jeton.strip().encode(), attendu.encode()):
+        raise HTTPException(status_code=401, detail="Jeton invalide", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/periodes")
+def periodes(propriete: str = Depends(propriete_demandee)):
+    # Périodes courantes, modifications journalisées comprises (dates de fin incluses)
+    return lister_periodes(propriete)
+
+
+async def modifier(request: Request, propriete: str, operation: str = None):
+    try:
+        corps = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corps JSON illisible")
+    if operation and isinstance(corps, dict):
+        corps = {**corps, "operation": operation}
+
+    try:
+        return modifier_periodes(corps, propriete)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.put("/periodes", dependencies=[Depends(jeton_administration)])
+async def ajouter_periode(request: Request, propriete: str = Depends(propriete_demandee)):
+    # Ajoute une période à la fin du calendrier : {date_debut, date_fin, id_tarif}
+    return await modifier(request, propriete, "ajouter")
+
+
+@app.patch("/periodes", dependencies=[Depends(jeton_administration)])
+async def modifier_periode(request: Request, propriete: str = Depends(propriete_demandee)):
+    # Scinde, fusionne ou change le tarif d'une période : {operation, jour, id_tarif}
+    return await modifier(request, propriete)
+
+
+@app.get("/devis")
+def devis(
+    date_debut: date = Query(...),
+    date_fin: date = Query(...),
+    plateforme: str = Query(None),
+    menage: bool = Query(False)
+):
+    # Même séjour chiffré pour toutes les propriétés ; une plateforme absente
+    # des règles d'une propriété donne une erreur sur sa seule ligne
+    derniere_nuitee = date_fin - timedelta(days=1)
+    return devis_toutes_proprietes(date_debut, derniere_nuitee, plateforme, menage, minimum_global=False)
+
+
+@app.get("/stats")
+def stats():
+    # Compteurs de chargement des fichiers de données (rechargements, durée)
+    return {
+        "donnees": statistiques_donnees(),
+        "cache_csv": cache_csv.statistiques(),
+        "cache_reponses": {**cache_reponses.statistiques(), "non_modifies": nb_non_modifies},
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    # Histogrammes de durée par étape, compteurs et caches, au format Prometheus
+    # (durées et compteurs seulement si TARIFS_METRIQUES=1)
+    return PlainTextResponse(metriques.exporter_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles", dependencies=[Depends(jeton_administration)])
+def debug_profiles():
+    # Profils conservés (les plus récents d'abord), si le profilage est activé ;
+    # ils révèlent le code et les données traitées : réservés à l'administration
+    if not profilage.PROFILAGE_ACTIF:
+        raise HTTPException(status_code=404, detail="Profilage désactivé (TARIFS_PROFILAGE=1)")
+    return profilage.lister_profils()
+
 
-    if not file_path.exists():
-        # Optionnel : générer un fichier par défaut ou renvoyer une erreur plus propre
-        return {"error": "Veuillez d'abord lancer un calcul."}
+@app.get("/debug/profiles/{nom}", dependencies=[Depends(jeton_administration)])
+def debug_profile(nom: str):
+    if not profilage.PROFILAGE_ACTIF:
+        raise HTTPException(status_code=404, detail="Profilage désactivé (TARIFS_PROFILAGE=1)")
+    try:
+        chemin = profilage.chemin_profil(nom)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    return FileResponse(path=file_path, filename=nom_fichier)
\ No newline at end of file
+    if chemin.suffix == ".prof":
+        return FileResponse(chemin, media_type="application/octet-stream", filename=nom)
+    return FileResponse(chemin, media_type="text/plain; charset=utf-8")
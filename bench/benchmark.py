@@ -0,0 +1,220 @@
+"""
+Banc de performance du moteur de tarifs et de la couche HTTP.
+
+Génère des calendriers synthétiques (de 10 à 10 000 périodes) et des grilles
+de tailles variables, chronomètre les chemins critiques et écrit les
+résultats en JSON pour comparer deux exécutions.
+
+Exemples (depuis la racine du projet) :
+    python -m bench.benchmark --sortie bench.json
+    python -m bench.benchmark --reference bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from core.calculateur import CalculateurLocation
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.grille_tarifs import GrilleTarifs
+from core.tableau_tarifs import TableauTarifs
+
+TAILLES_DEFAUT = [10, 100, 1000, 10000]
+PREMIER_JOUR = date(2026, 1, 1)
+
+
+# ----------------------------------------------------------------------
+# Données synthétiques
+# ----------------------------------------------------------------------
+def generer_donnees(dossier: Path, nb_periodes: int, nb_tarifs: int, graine: int = 42):
+    """
+    Écrit prix.csv et periode.csv dans 'dossier' : nb_periodes périodes
+    consécutives de 1 à 30 jours, réparties sur nb_tarifs tarifs.
+    """
+    aleatoire = random.Random(graine)
+    ids = [f"T{i:04d}" for i in range(nb_tarifs)]
+
+    with open(dossier / "prix.csv", "w", encoding="utf-8", newline="") as f:
+        f.write("id;prix_semaine;prix_weekend\n")
+        for id_tarif in ids:
+            semaine = aleatoire.randint(40, 150)
+            f.write(f"{id_tarif};{semaine};{semaine + aleatoire.randint(0, 20)}\n")
+
+    jour = PREMIER_JOUR
+    with open(dossier / "periode.csv", "w", encoding="utf-8", newline="") as f:
+        f.write("date_debut;date_fin;id\n")
+        for _ in range(nb_periodes):
+            fin = jour + timedelta(days=aleatoire.randint(1, 30) - 1)
+            f.write(f"{jour.strftime('%d-%m-%Y')};{fin.strftime('%d-%m-%Y')};{aleatoire.choice(ids)}\n")
+            jour = fin + timedelta(days=1)
+
+    return PREMIER_JOUR, jour - timedelta(days=1)
+
+
+# ----------------------------------------------------------------------
+# Chronométrage
+# ----------------------------------------------------------------------
+def chronometrer(fonction, repetitions: int) -> dict:
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return {
+        "median_s": statistics.median(durees),
+        "min_s": min(durees),
+        "repetitions": repetitions,
+    }
+
+
+def mesurer_moteur(dossier: Path, premier: date, dernier: date, repetitions: int, resultats: dict, suffixe: str):
+    prix, periodes = str(dossier / "prix.csv"), str(dossier / "periode.csv")
+    grille = GrilleTarifs.depuis_fichier(prix)
+    calendrier = CalendrierTarifaire.depuis_fichier(periodes, grille)
+    calculateur = CalculateurLocation(calendrier, grille)
+
+    aleatoire = random.Random(7)
+    horizon = (dernier - premier).days
+    jours = [premier + timedelta(days=aleatoire.randint(0, horizon)) for _ in range(1000)]
+    fin_annee = min(dernier, premier + timedelta(days=364))
+    export = dossier / "export.csv"
+
+    cas = {
+        "GrilleTarifs.depuis_fichier": lambda: GrilleTarifs.depuis_fichier(prix),
+        "CalendrierTarifaire.depuis_fichier": lambda: CalendrierTarifaire.depuis_fichier(periodes, grille),
+        "periode_pour_jour x1000": lambda: [calendrier.periode_pour_jour(j) for j in jours],
+        "CalculateurLocation.calculer (1 an)": lambda: calculateur.calculer(premier, fin_annee),
+        "TableauTarifs.generer_tableau_plage (1 an)":
+            lambda: TableauTarifs(calculateur, "booking").generer_tableau_plage(premier, fin_annee),
+        "TableauTarifs.exporter_csv_plage (1 an)":
+            lambda: TableauTarifs(calculateur, "booking").exporter_csv_plage(str(export), premier, fin_annee),
+    }
+    for nom, fonction in cas.items():
+        resultats[f"{nom} [{suffixe}]"] = chronometrer(fonction, repetitions)
+
+
+def mesurer_http(dossier: Path, premier: date, dernier: date, repetitions: int, resultats: dict, suffixe: str):
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("FastAPI / httpx absents : mesures HTTP ignorées", file=sys.stderr)
+        return
+
+    import app
+    from services import calcul
+
+    # Le registre de données pointe vers le jeu synthétique le temps des mesures
+    registre_origine = calcul.registre
+    calcul.registre = calcul.RegistreCalculateur(dossier)
+    calcul.registre.obtenir()  # chargement initial hors mesure
+    client = TestClient(app.app)
+
+    fin_annee = min(dernier, premier + timedelta(days=364))
+    params_annee = {"date_debut": premier.isoformat(), "date_fin": fin_annee.isoformat()}
+    params_semaine = {"date_debut": premier.isoformat(), "date_fin": (premier + timedelta(days=7)).isoformat()}
+
+    def appeler(route, params):
+        # Cache de réponses vidé : on mesure le calcul, pas la relecture du cache
+        app.cache_reponses.vider()
+        calcul.cache_csv.vider()
+        reponse = client.get(route, params=params)
+        reponse.raise_for_status()
+
+    cas = {
+        "GET /detail (7 nuits)": lambda: appeler("/detail", params_semaine),
+        "GET /detail (1 an)": lambda: appeler("/detail", params_annee),
+        "GET /tableau (1 an)": lambda: appeler("/tableau", {**params_annee, "plateforme": "booking"}),
+        "GET /download-csv (1 an)": lambda: appeler("/download-csv", {**params_annee, "plateforme": "booking"}),
+    }
+    try:
+        for nom, fonction in cas.items():
+            resultats[f"{nom} [{suffixe}]"] = chronometrer(fonction, repetitions)
+    finally:
+        calcul.registre = registre_origine
+
+
+# ----------------------------------------------------------------------
+# Comparaison à une référence
+# ----------------------------------------------------------------------
+def comparer(resultats: dict, reference: dict, tolerance: float) -> list:
+    """
+    Retourne la liste des mesures dont la médiane dépasse celle de la
+    référence de plus de 'tolerance' (0.25 = +25 %).
+    """
+    regressions = []
+    for nom, mesure in resultats.items():
+        ancienne = reference.get(nom)
+        if ancienne is None or ancienne["median_s"] <= 0:
+            continue
+        ratio = mesure["median_s"] / ancienne["median_s"]
+        if ratio > 1 + tolerance:
+            regressions.append((nom, ancienne["median_s"], mesure["median_s"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de performance du calculateur de tarifs")
+    parser.add_argument("--tailles", default=",".join(map(str, TAILLES_DEFAUT)),
+                        help="Nombres de périodes des calendriers générés (séparés par des virgules)")
+    parser.add_argument("--tarifs", type=int, default=50,
+                        help="Nombre de tarifs de la grille générée (défaut : 50)")
+    parser.add_argument("--repetitions", type=int, default=5,
+                        help="Nombre de répétitions par mesure (défaut : 5)")
+    parser.add_argument("--sans-http", action="store_true",
+                        help="Ne pas mesurer les endpoints FastAPI")
+    parser.add_argument("--sortie", help="Fichier JSON où écrire les résultats")
+    parser.add_argument("--reference", help="Fichier JSON d'une exécution précédente à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Ralentissement toléré par rapport à la référence (défaut : 0.25)")
+    args = parser.parse_args()
+
+    tailles = [int(t) for t in args.tailles.split(",") if t.strip()]
+    resultats = {}
+
+    for taille in tailles:
+        with tempfile.TemporaryDirectory() as tmp:
+            dossier = Path(tmp)
+            premier, dernier = generer_donnees(dossier, taille, min(args.tarifs, taille))
+            suffixe = f"{taille} périodes"
+            print(f"Mesures sur {suffixe} ({premier} → {dernier})...", file=sys.stderr)
+
+            mesurer_moteur(dossier, premier, dernier, args.repetitions, resultats, suffixe)
+            if not args.sans_http:
+                mesurer_http(dossier, premier, dernier, args.repetitions, resultats, suffixe)
+
+    for nom, mesure in resultats.items():
+        print(f"{nom:<65} {mesure['median_s'] * 1000:>10.3f} ms")
+
+    rapport = {
+        "meta": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tailles": tailles,
+            "tarifs": args.tarifs,
+        },
+        "resultats": resultats,
+    }
+    if args.sortie:
+        Path(args.sortie).write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nRésultats écrits dans '{args.sortie}'")
+
+    if args.reference:
+        reference = json.loads(Path(args.reference).read_text(encoding="utf-8"))["resultats"]
+        regressions = comparer(resultats, reference, args.tolerance)
+        if regressions:
+            print(f"\nRégressions (tolérance {args.tolerance:.0%}) :")
+            for nom, avant, apres, ratio in regressions:
+                print(f"  {nom} : {avant * 1000:.3f} ms → {apres * 1000:.3f} ms (x{ratio:.2f})")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Test de charge local de l'API (app.py).
+
+Lance app.py sous uvicorn (ou vise un serveur déjà démarré avec --url),
+rejoue un mélange configurable de requêtes /, /detail, /tableau et
+/download-csv à des niveaux de concurrence croissants, puis rapporte pour
+chaque niveau le débit, les latences p50/p95/p99 et le taux d'erreurs.
+
+Les dates suivent une distribution réaliste : arrivées concentrées sur les
+prochains mois, séjours courts (week-end, semaine) plus fréquents que les
+longs, tableaux sur un à douze mois.
+
+Exemples (depuis la racine du projet) :
+    python -m bench.charge --concurrences 1,8,32 --duree 10 --sortie charge.json
+    python -m bench.charge --workers 4 --melange detail=60,tableau=20,csv=10,accueil=10
+    python -m bench.charge --reference charge.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+RACINE = Path(__file__).resolve().parent.parent
+
+CONCURRENCES_DEFAUT = [1, 4, 16, 64]
+MELANGE_DEFAUT = "detail=50,tableau=20,csv=10,accueil=20"
+PLATEFORMES = [None, "airbnb", "booking", "abritel", "gites"]
+
+# Durées de séjour (nuits) et leurs poids : week-ends et semaines dominent
+DUREES = [2, 3, 4, 5, 6, 7, 10, 14, 21]
+POIDS_DUREES = [18, 14, 7, 6, 5, 30, 8, 9, 3]
+
+
+# ----------------------------------------------------------------------
+# Serveur
+# ----------------------------------------------------------------------
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def lancer_serveur(port: int, workers: int) -> subprocess.Popen:
+    """Démarre app.py sous uvicorn dans un sous-processus."""
+    commande = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(commande, cwd=RACINE)
+
+
+def attendre_serveur(url: str, delai: float = 30.0):
+    limite = time.monotonic() + delai
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{url}/stats", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Le serveur {url} ne répond pas après {delai:.0f} s")
+
+
+def horizon(url: str):
+    """Premier et dernier jour couverts par le calendrier du serveur."""
+    try:
+        periodes = httpx.get(f"{url}/periodes", timeout=5.0).json()
+        return date.fromisoformat(periodes[0]["date_debut"]), date.fromisoformat(periodes[-1]["date_fin"])
+    except (httpx.HTTPError, ValueError, LookupError, TypeError):
+        aujourdhui = date.today()
+        return aujourdhui, aujourdhui + timedelta(days=365)
+
+
+# ----------------------------------------------------------------------
+# Génération des requêtes
+# ----------------------------------------------------------------------
+def lire_melange(texte: str) -> dict:
+    """
+    Lit un mélange 'route=poids,...' (routes : accueil, detail, tableau, csv).
+
+    :raises ValueError: Si une route est inconnue ou un poids invalide.
+    """
+    melange = {}
+    for element in texte.split(","):
+        if not element.strip():
+            continue
+        route, _, poids = element.partition("=")
+        route = route.strip()
+        if route not in GENERATEURS:
+            raise ValueError(f"Route '{route}' inconnue ({', '.join(GENERATEURS)})")
+        melange[route] = float(poids or 1)
+    if not melange or sum(melange.values()) <= 0:
+        raise ValueError("Mélange de requêtes vide")
+    return melange
+
+
+class Generateur:
+    """Tire des requêtes (route, chemin, paramètres) sur l'horizon du calendrier."""
+
+    def __init__(self, premier: date, dernier: date, melange: dict, graine: int):
+        self.premier = max(premier, date.today())
+        if self.premier >= dernier:
+            self.premier = premier
+        self.dernier = dernier
+        self.routes = list(melange)
+        self.poids = list(melange.values())
+        self.aleatoire = random.Random(graine)
+
+    def _arrivee(self, marge: int) -> date:
+        # Réservations majoritairement à moins de quatre mois
+        jours = (self.dernier - self.premier).days - marge
+        decalage = min(int(self.aleatoire.expovariate(1 / 60)), max(jours, 0))
+        return self.premier + timedelta(days=decalage)
+
+    def _sejour(self) -> dict:
+        nuits = self.aleatoire.choices(DUREES, POIDS_DUREES)[0]
+        arrivee = self._arrivee(nuits)
+        # date_fin de l'API : jour du départ
+        return {"date_debut": arrivee.isoformat(), "date_fin": (arrivee + timedelta(days=nuits)).isoformat()}
+
+    def _plage(self) -> dict:
+        mois = self.aleatoire.randint(1, 12)
+        debut = self._arrivee(0)
+        fin = min(debut + timedelta(days=30 * mois), self.dernier + timedelta(days=1))
+        params = {"date_debut": debut.isoformat(), "date_fin": fin.isoformat()}
+        plateforme = self.aleatoire.choice(PLATEFORMES)
+        if plateforme:
+            params["plateforme"] = plateforme
+        return params
+
+    def requete(self):
+        route = self.aleatoire.choices(self.routes, self.poids)[0]
+        return (route, *GENERATEURS[route](self))
+
+
+GENERATEURS = {
+    "accueil": lambda g: ("/", {}),
+    "detail": lambda g: ("/detail", {**g._sejour(), "menage": str(g.aleatoire.random() < 0.5).lower()}),
+    "tableau": lambda g: ("/tableau", g._plage()),
+    "csv": lambda g: ("/download-csv", g._plage()),
+}
+
+
+# ----------------------------------------------------------------------
+# Mesure
+# ----------------------------------------------------------------------
+def percentile(valeurs: list, q: float) -> float:
+    """Percentile par rang le plus proche d'une liste triée (0 si vide)."""
+    if not valeurs:
+        return 0.0
+    rang = max(int(round(q * len(valeurs) + 0.5)) - 1, 0)
+    return valeurs[min(rang, len(valeurs) - 1)]
+
+
+def resumer(latences: list, nb_erreurs: int, duree: float) -> dict:
+    latences = sorted(latences)
+    nombre = len(latences)
+    return {
+        "requetes": nombre,
+        "debit_rps": nombre / duree if duree > 0 else 0.0,
+        "taux_erreurs": nb_erreurs / nombre if nombre else 0.0,
+        "p50_ms": percentile(latences, 0.50) * 1000,
+        "p95_ms": percentile(latences, 0.95) * 1000,
+        "p99_ms": percentile(latences, 0.99) * 1000,
+        "max_ms": latences[-1] * 1000 if latences else 0.0,
+    }
+
+
+async def niveau(url: str, generateur: Generateur, concurrence: int, duree: float) -> dict:
+    """Exécute 'concurrence' clients en boucle pendant 'duree' secondes."""
+    latences = defaultdict(list)
+    erreurs = defaultdict(int)
+    exemples_erreurs = {}
+    limites = httpx.Limits(max_connections=concurrence, max_keepalive_connections=concurrence)
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60.0) as client:
+        fin = time.perf_counter() + duree
+
+        async def client_virtuel():
+            while time.perf_counter() < fin:
+                route, chemin, params = generateur.requete()
+                debut = time.perf_counter()
+                try:
+                    reponse = await client.get(chemin, params=params)
+                    await reponse.aread()
+                    erreur = None if reponse.status_code < 400 else f"HTTP {reponse.status_code}"
+                except httpx.HTTPError as e:
+                    erreur = type(e).__name__
+                latences[route].append(time.perf_counter() - debut)
+                if erreur:
+                    erreurs[route] += 1
+                    exemples_erreurs.setdefault(erreur, f"{chemin}?{httpx.QueryParams(params)}")
+
+        debut = time.perf_counter()
+        await asyncio.gather(*(client_virtuel() for _ in range(concurrence)))
+        ecoule = time.perf_counter() - debut
+
+    toutes = [latence for valeurs in latences.values() for latence in valeurs]
+    return {
+        "concurrence": concurrence,
+        "duree_s": ecoule,
+        **resumer(toutes, sum(erreurs.values()), ecoule),
+        "routes": {route: resumer(valeurs, erreurs[route], ecoule) for route, valeurs in sorted(latences.items())},
+        "exemples_erreurs": exemples_erreurs,
+    }
+
+
+# ----------------------------------------------------------------------
+# Comparaison à une référence
+# ----------------------------------------------------------------------
+def comparer(niveaux: list, reference: list, tolerance: float) -> list:
+    """
+    Retourne les niveaux de concurrence dont le p95 dépasse celui de la
+    référence de plus de 'tolerance' (0.25 = +25 %).
+    """
+    p95_reference = {n["concurrence"]: n["p95_ms"] for n in reference}
+    regressions = []
+    for mesure in niveaux:
+        ancien = p95_reference.get(mesure["concurrence"])
+        if not ancien:
+            continue
+        ratio = mesure["p95_ms"] / ancien
+        if ratio > 1 + tolerance:
+            regressions.append((mesure["concurrence"], ancien, mesure["p95_ms"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge local de l'API de tarifs")
+    parser.add_argument("--url", help="Serveur déjà démarré (sinon app.py est lancé sous uvicorn)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de workers uvicorn du serveur lancé (défaut : 1)")
+    parser.add_argument("--concurrences", default=",".join(map(str, CONCURRENCES_DEFAUT)),
+                        help="Niveaux de concurrence successifs (séparés par des virgules)")
+    parser.add_argument("--duree", type=float, default=10.0,
+                        help="Durée de chaque niveau, en secondes (défaut : 10)")
+    parser.add_argument("--melange", default=MELANGE_DEFAUT,
+                        help=f"Poids des routes (défaut : {MELANGE_DEFAUT})")
+    parser.add_argument("--graine", type=int, default=42, help="Graine du tirage des requêtes")
+    parser.add_argument("--sortie", help="Fichier JSON où écrire le rapport")
+    parser.add_argument("--reference", help="Rapport JSON d'une exécution précédente à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Hausse de p95 tolérée par rapport à la référence (défaut : 0.25)")
+    args = parser.parse_args()
+
+    if httpx is None:
+        sys.exit("httpx est nécessaire au test de charge (pip install httpx uvicorn)")
+    try:
+        melange = lire_melange(args.melange)
+        concurrences = [int(c) for c in args.concurrences.split(",") if c.strip()]
+    except ValueError as e:
+        sys.exit(f"Erreur : {e}")
+
+    serveur = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{port_libre()}"
+        serveur = lancer_serveur(int(url.rsplit(":", 1)[1]), args.workers)
+
+    try:
+        attendre_serveur(url)
+        premier, dernier = horizon(url)
+        print(f"Serveur {url}, calendrier {premier} → {dernier}", file=sys.stderr)
+
+        niveaux = []
+        for concurrence in concurrences:
+            generateur = Generateur(premier, dernier, melange, args.graine + concurrence)
+            mesure = asyncio.run(niveau(url, generateur, concurrence, args.duree))
+            niveaux.append(mesure)
+            print(
+                f"concurrence {concurrence:>4} : {mesure['debit_rps']:>8.1f} req/s  "
+                f"p50 {mesure['p50_ms']:>8.2f} ms  p95 {mesure['p95_ms']:>8.2f} ms  "
+                f"p99 {mesure['p99_ms']:>8.2f} ms  erreurs {mesure['taux_erreurs']:.2%}"
+            )
+
+        # Compteurs du serveur : des rechargements pendant le test trahissent une régression
+        try:
+            statistiques = httpx.get(f"{url}/stats", timeout=5.0).json()
+        except (httpx.HTTPError, ValueError):
+            statistiques = None
+    finally:
+        if serveur is not None:
+            serveur.terminate()
+            try:
+                serveur.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                serveur.kill()
+
+    rapport = {
+        "meta": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": args.url,
+            "workers": None if args.url else args.workers,
+            "cpus": os.cpu_count(),
+            "duree_niveau_s": args.duree,
+            "melange": melange,
+            "graine": args.graine,
+        },
+        "niveaux": niveaux,
+        "serveur": statistiques,
+    }
+    if args.sortie:
+        Path(args.sortie).write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nRapport écrit dans '{args.sortie}'")
+
+    if args.reference:
+        reference = json.loads(Path(args.reference).read_text(encoding="utf-8"))["niveaux"]
+        regressions = comparer(niveaux, reference, args.tolerance)
+        if regressions:
+            print(f"\nRégressions de p95 (tolérance {args.tolerance:.0%}) :")
+            for concurrence, avant, apres, ratio in regressions:
+                print(f"  concurrence {concurrence} : {avant:.2f} ms → {apres:.2f} ms (x{ratio:.2f})")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Format binaire précompilé de la grille et du calendrier.
+
+Le fichier est produit une fois par compiler(), après validation complète
+des CSV, puis relu par charger() via mmap, sans analyse de texte ni de date.
+
+Disposition (petit-boutiste) :
+    en-tête   : magique 'TARF', version (u16), réservé (u16),
+                nb_tarifs (u32), nb_periodes (u32)
+    tarifs    : pour chacun, longueur de l'id (u16), id UTF-8,
+                prix semaine (i64, centimes), prix week-end (i64, centimes)
+    bourrage  : jusqu'à un multiple de 8 octets
+    périodes  : ordinaux de début (i32 × n), ordinaux de fin (i32 × n),
+                indices dans la table des tarifs (u16 × n)
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.grille_tarifs import GrilleTarifs
+from core.periode import periode_partagee_ordinaux
+from core.tarifs import tarif_partage
+
+MAGIQUE = b"TARF"
+VERSION_FORMAT = 1
+NOM_FICHIER = "calendrier.bin"
+
+_EN_TETE = struct.Struct("<4sHHII")
+_LONGUEUR_ID = struct.Struct("<H")
+_PRIX = struct.Struct("<qq")
+
+
+def _petit_boutiste(tableau: array) -> array:
+    # Les tableaux sont écrits et lus en petit-boutiste quelle que soit la machine
+    if sys.byteorder == "big":
+        tableau = array(tableau.typecode, tableau)
+        tableau.byteswap()
+    return tableau
+
+
+def compiler(fichier_prix: str, fichier_periodes: str, fichier_binaire: str):
+    """
+    Valide prix.csv et periode.csv puis écrit leur version binaire.
+
+    La validation est celle du chargement CSV : tarifs inconnus et
+    périodes non consécutives lèvent ValueError, et rien n'est écrit.
+
+    :return: Le calendrier validé.
+    """
+    grille = GrilleTarifs.depuis_fichier(fichier_prix)
+    calendrier = CalendrierTarifaire.depuis_fichier(fichier_periodes, grille)
+
+    ids = list(grille.tarifs)
+    position = {id_tarif: i for i, id_tarif in enumerate(ids)}
+    periodes = calendrier.periodes
+
+    contenu = bytearray(_EN_TETE.pack(MAGIQUE, VERSION_FORMAT, 0, len(ids), len(periodes)))
+    for id_tarif in ids:
+        tarif = grille.tarifs[id_tarif]
+        code = id_tarif.encode("utf-8")
+        contenu += _LONGUEUR_ID.pack(len(code)) + code
+        contenu += _PRIX.pack(tarif.semaine_cents, tarif.weekend_cents)
+    contenu += b"\0" * (-len(contenu) % 8)
+
+    contenu += _petit_boutiste(array("i", (p.debut_ord for p in periodes))).tobytes()
+    contenu += _petit_boutiste(array("i", (p.fin_ord for p in periodes))).tobytes()
+    contenu += _petit_boutiste(array("H", (position[p.id_tarif] for p in periodes))).tobytes()
+
+    # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+    temporaire = f"{fichier_binaire}.tmp"
+    with open(temporaire, "wb") as f:
+        f.write(contenu)
+    os.replace(temporaire, fichier_binaire)
+
+    return calendrier
+
+
+def _tableau(vue: memoryview, typecode: str) -> memoryview:
+    if sys.byteorder == "big":
+        return memoryview(_petit_boutiste(array(typecode, vue.tobytes())))
+    return vue.cast(typecode)
+
+
+def charger(fichier_binaire: str):
+    """
+    Charge une grille et un calendrier depuis un fichier produit par compiler().
+
+    :return: Un tuple (GrilleTarifs, CalendrierTarifaire).
+    :raises ValueError: Si le fichier n'est pas au format attendu.
+    """
+    with open(fichier_binaire, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as carte:
+            vue = memoryview(carte)
+            try:
+                return _lire(vue)
+            finally:
+                vue.release()
+
+
+def _lire(vue: memoryview):
+    if len(vue) < _EN_TETE.size:
+        raise ValueError("Fichier binaire tronqué")
+    magique, version, _, nb_tarifs, nb_periodes = _EN_TETE.unpack_from(vue, 0)
+    if magique != MAGIQUE or version != VERSION_FORMAT:
+        raise ValueError(f"Format binaire non reconnu (version {version})")
+
+    grille = GrilleTarifs()
+    ids = []
+    pos = _EN_TETE.size
+    for _ in range(nb_tarifs):
+        (longueur,) = _LONGUEUR_ID.unpack_from(vue, pos)
+        pos += _LONGUEUR_ID.size
+        id_tarif = bytes(vue[pos:pos + longueur]).decode("utf-8")
+        pos += longueur
+        semaine, weekend = _PRIX.unpack_from(vue, pos)
+        pos += _PRIX.size
+        grille.tarifs[id_tarif] = tarif_partage(semaine / 100, weekend / 100)
+        ids.append(id_tarif)
+    pos += -pos % 8
+
+    taille_i32 = 4 * nb_periodes
+    if len(vue) < pos + 2 * taille_i32 + 2 * nb_periodes:
+        raise ValueError("Fichier binaire tronqué")
+    debuts = _tableau(vue[pos:pos + taille_i32], "i")
+    fins = _tableau(vue[pos + taille_i32:pos + 2 * taille_i32], "i")
+    indices = _tableau(vue[pos + 2 * taille_i32:pos + 2 * taille_i32 + 2 * nb_periodes], "H")
+
+    try:
+        if nb_periodes and max(indices) >= nb_tarifs:
+            raise ValueError(f"Indice de tarif hors de la table ({max(indices)} ≥ {nb_tarifs})")
+        periodes = [
+            periode_partagee_ordinaux(debuts[k], fins[k], ids[indices[k]])
+            for k in range(nb_periodes)
+        ]
+    finally:
+        for tableau in (debuts, fins, indices):
+            tableau.release()
+
+    # Les périodes ont été validées à la compilation
+    return grille, CalendrierTarifaire(periodes)
+
+
+def charger_donnees(fichier_prix: str, fichier_periodes: str, fichier_binaire: str = None):
+    """
+    Charge grille et calendrier depuis le fichier binaire s'il existe et qu'il
+    est plus récent que les deux CSV, sinon depuis les CSV.
+
+    :return: Un tuple (GrilleTarifs, CalendrierTarifaire).
+    """
+    if fichier_binaire and binaire_a_jour(fichier_prix, fichier_periodes, fichier_binaire):
+        try:
+            return charger(fichier_binaire)
+        except (OSError, ValueError, struct.error):
+            pass  # fichier illisible : on retombe sur les CSV
+
+    grille = GrilleTarifs.depuis_fichier(fichier_prix)
+    return grille, CalendrierTarifaire.depuis_fichier(fichier_periodes, grille)
+
+
+def binaire_a_jour(fichier_prix: str, fichier_periodes: str, fichier_binaire: str) -> bool:
+    """Indique si le fichier binaire existe et est plus récent que les CSV."""
+    try:
+        date_binaire = os.stat(fichier_binaire).st_mtime_ns
+    except OSError:
+        return False
+    return all(os.stat(f).st_mtime_ns <= date_binaire for f in (fichier_prix, fichier_periodes))
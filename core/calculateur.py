@@ -1,30 +1,50 @@
 from datetime import date, timedelta
+from core import metriques
+from core.metriques import chronometre
+from core.regles import plan_par_defaut
 
 class CalculateurLocation:
     """
     Calcule le prix journalier et total d'une location saisonnière.
     """
 
-    def __init__(self, calendrier, grille_tarifs):
+    def __init__(self, calendrier, grille_tarifs, plan=None):
+        """
+        :param plan: PlanTarifaire des règles de tarification (règles par défaut si absent).
+        """
         self.calendrier = calendrier
         self.grille_tarifs = grille_tarifs
+        self.plan = plan if plan is not None else plan_par_defaut(grille_tarifs)
 
+    @chronometre("calculer")
     def calculer(self, date_debut: date, date_fin: date):
         """
         Calcule le détail jour par jour et le total.
+        Le total est cumulé en centimes entiers, sans dérive d'arrondi.
         """
-        jour = date_debut
-        total = 0.0
+        total = 0
         details = []
 
-        while jour <= date_fin:
-            periode = self.calendrier.periode_pour_jour(jour)
-            tarif = self.grille_tarifs.obtenir(periode.id_tarif)
+        for periode, jour, fin_segment in self.calendrier.segments(date_debut, date_fin):
+            prix_jours = self.plan.prix_jours(periode.id_tarif)
+
+            while jour <= fin_segment:
+                montant = prix_jours[jour.weekday()]
 
-            montant = tarif.prix_pour_jour(jour)
+                details.append((jour, montant / 100))
+                total += montant
+                jour += timedelta(days=1)
 
-            details.append((jour, montant))
-            total += montant
-            jour += timedelta(days=1)
+        metriques.compter("jours_calcules", len(details))
+        return details, total / 100
 
-        return details, total
+    def calculer_total(self, date_debut: date, date_fin: date) -> float:
+        """
+        Calcule uniquement le total, sans le détail jour par jour.
+
+        Chaque segment de période est tarifé en temps constant à partir des
+        prix de ses jours de la semaine (voir PlanTarifaire.total_semaines).
+        Le coût ne dépend donc que du nombre de périodes traversées,
+        pas de la durée du séjour.
+        """
+        return self.plan.total_centimes(self.calendrier, date_debut, date_fin) / 100
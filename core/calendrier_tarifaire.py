@@ -1,7 +1,9 @@
 import csv
+from bisect import bisect_right
 from datetime import date, timedelta
-from core.periode import Periode
-from core.utils import date_fr
+from core.metriques import chronometre
+from core.periode import Periode, periode_partagee, periode_partagee_ordinaux
+from core.utils import LecteurDates
 
 class CalendrierTarifaire:
     """
@@ -18,44 +20,99 @@ class CalendrierTarifaire:
 
         :param periodes: Liste d'instances de la classe Periode.
         """
-        self.periodes = sorted(periodes, key=lambda p: p.debut)
+        self.periodes = sorted(periodes, key=lambda p: p.debut_ord)
+        self._indexer()
+
+    def _indexer(self):
+        """
+        Construit l'index de recherche : les ordinaux des dates de début,
+        triés, permettent une recherche dichotomique de la période d'un jour.
+        """
+        self._debuts = [p.debut_ord for p in self.periodes]
 
     @classmethod
+    @chronometre("chargement_periodes")
     def depuis_fichier(cls, fichier: str, grille_tarifs):
         """
         Crée une instance de CalendrierTarifaire à partir d'un fichier CSV.
 
         Le fichier doit utiliser le point-virgule (;) comme délimiteur et 
-        contenir les colonnes 'id', 'date_debut' et 'date_fin'.
+        contenir les colonnes 'id', 'date_debut' et 'date_fin'. Les dates
+        sont au format JJ-MM-AAAA ou AAAA-MM-JJ (détecté sur la première),
+        avec '-', '/' ou '.' comme séparateur.
 
         :param fichier: Chemin vers le fichier CSV des périodes.
         :param grille_tarifs: Instance de GrilleTarifs pour validation des IDs.
         :return: Une instance configurée de CalendrierTarifaire.
-        :raises ValueError: Si un ID de tarif est inconnu ou si les périodes 
-                            ne sont pas consécutives.
+        :raises ValueError: Si une date est invalide, si un ID de tarif est
+                            inconnu ou si les périodes ne sont pas consécutives ;
+                            le message liste toutes les lignes en erreur.
         """
+        lire_date = LecteurDates()
+        tarifs = grille_tarifs.tarifs
         periodes = []
+        erreurs = []
+        precedente = None  # dernière période valide, pour la consécutivité
+        apres_erreur = False  # ligne en erreur depuis 'precedente' : le trou peut venir d'elle
+        triees = True
 
+        # Un seul passage : dates, tarif et consécutivité sont vérifiés ligne
+        # par ligne et toutes les erreurs sont rapportées ensemble.
         with open(fichier, newline="", encoding="utf-8") as f:
-            lecteur = csv.DictReader(f, delimiter=";")
-            for ligne in lecteur:
-                id_tarif = ligne["id"]
+            lecteur = csv.reader(f, delimiter=";")
+            entete = [champ.strip() for champ in next(lecteur, [])]
+            try:
+                col_debut, col_fin, col_id = (entete.index(c) for c in ("date_debut", "date_fin", "id"))
+            except ValueError:
+                raise ValueError(f"Colonnes 'date_debut', 'date_fin' et 'id' attendues dans {fichier}")
 
-                if id_tarif not in grille_tarifs.tarifs:
-                    raise ValueError(
-                        f"Tarif '{id_tarif}' absent de prix.csv"
-                    )
+            for ligne in lecteur:
+                if not ligne:
+                    continue
+                numero = lecteur.line_num
+                try:
+                    id_tarif = ligne[col_id]
+                    debut_ord = lire_date.ordinal(ligne[col_debut])
+                    fin_ord = lire_date.ordinal(ligne[col_fin])
+                    if id_tarif not in tarifs:
+                        erreurs.append((numero, f"Tarif '{id_tarif}' absent de prix.csv"))
+                    periode = periode_partagee_ordinaux(debut_ord, fin_ord, id_tarif)
+                except IndexError:
+                    erreurs.append((numero, "Colonnes manquantes"))
+                    apres_erreur = True
+                    continue
+                except ValueError as e:
+                    erreurs.append((numero, str(e)))
+                    apres_erreur = True
+                    continue
 
-                periodes.append(
-                    Periode(
-                        date_fr(ligne["date_debut"]),
-                        date_fr(ligne["date_fin"]),
-                        id_tarif,
-                    )
-                )
+                if precedente is not None:
+                    if debut_ord < precedente.debut_ord:
+                        triees = False
+                    elif triees and debut_ord != precedente.fin_ord + 1:
+                        # Un chevauchement est toujours une erreur ; un trou juste
+                        # après une ligne invalide n'en est que la conséquence
+                        if not (apres_erreur and debut_ord > precedente.fin_ord + 1):
+                            erreurs.append((numero, _message_jonction(precedente, periode)))
+                periodes.append(periode)
+                precedente = periode
+                apres_erreur = False
 
         calendrier = cls(periodes)
-        calendrier._verifier_consecutivite()
+        if not triees:
+            # Lignes dans le désordre : la consécutivité se vérifie après le tri
+            erreurs = [e for e in erreurs if not e[1].startswith("Périodes non consécutives")]
+            erreurs += [(None, message) for message in _jonctions_invalides(calendrier.periodes)]
+
+        if erreurs:
+            if len(erreurs) == 1:
+                numero, message = erreurs[0]
+                raise ValueError(message if numero is None else f"Ligne {numero} : {message}")
+            raise ValueError(
+                f"{len(erreurs)} erreurs dans {fichier} :\n"
+                + "\n".join(message if numero is None else f"  ligne {numero} : {message}"
+                            for numero, message in erreurs)
+            )
         return calendrier
 
     def _verifier_consecutivite(self):
@@ -64,16 +121,116 @@ class CalendrierTarifaire:
 
         :raises ValueError: Si un écart ou un chevauchement est détecté entre deux périodes.
         """
-        for i in range(1, len(self.periodes)):
-            prec = self.periodes[i - 1]
-            curr = self.periodes[i]
+        _verifier_jonctions(self.periodes)
+
+    # ------------------------------------------------------------------
+    # Modifications incrémentales
+    # ------------------------------------------------------------------
+    def copie(self):
+        """
+        Retourne un calendrier indépendant qui partage les mêmes objets Periode
+        (ceux-ci ne sont jamais modifiés, seulement remplacés).
+        """
+        calendrier = type(self).__new__(type(self))
+        calendrier.periodes = list(self.periodes)
+        calendrier._debuts = list(self._debuts)
+        return calendrier
+
+    def _remplacer(self, premier: int, dernier: int, nouvelles: list):
+        """
+        Remplace self.periodes[premier:dernier + 1] par 'nouvelles' et met à
+        jour l'index de recherche.
+
+        Seules les jonctions entre les nouvelles périodes et leurs voisines
+        immédiates sont vérifiées : le reste du calendrier, déjà validé,
+        n'est pas relu.
+
+        :return: Un tuple (debut, fin) couvrant les nouvelles périodes.
+        :raises ValueError: Si une jonction présente un écart ou un chevauchement.
+        """
+        _verifier_jonctions(
+            self.periodes[max(premier - 1, 0):premier]
+            + nouvelles
+            + self.periodes[dernier + 1:dernier + 2]
+        )
+        self.periodes[premier:dernier + 1] = nouvelles
+        self._debuts[premier:dernier + 1] = [p.debut_ord for p in nouvelles]
+        return nouvelles[0].debut, nouvelles[-1].fin
+
+    def scinder(self, jour: date, id_tarif: str = None):
+        """
+        Coupe la période contenant 'jour' en deux : la seconde commence à 'jour'.
+
+        :param id_tarif: Tarif de la seconde partie (par défaut, celui de la période).
+        :return: La plage (debut, fin) dont les prix peuvent avoir changé.
+        :raises ValueError: Si 'jour' n'est couvert par aucune période ou en est déjà le premier jour.
+        """
+        i = self._position(jour)
+        periode = self.periodes[i]
+        coupure = jour.toordinal()
+        if coupure == periode.debut_ord:
+            raise ValueError(f"Le {jour} est déjà le premier jour d'une période")
+
+        self._remplacer(i, i, [
+            periode_partagee_ordinaux(periode.debut_ord, coupure - 1, periode.id_tarif),
+            periode_partagee_ordinaux(coupure, periode.fin_ord, id_tarif or periode.id_tarif),
+        ])
+        return jour, periode.fin
+
+    def fusionner(self, jour: date, id_tarif: str = None):
+        """
+        Fusionne la période contenant 'jour' avec la suivante.
+
+        :param id_tarif: Tarif de la période fusionnée (par défaut, celui de la première).
+        :return: La plage (debut, fin) dont les prix peuvent avoir changé.
+        :raises ValueError: Si 'jour' n'est couvert par aucune période ou si elle est la dernière.
+        """
+        i = self._position(jour)
+        if i + 1 >= len(self.periodes):
+            raise ValueError(f"Aucune période après celle du {jour}")
+        premiere, seconde = self.periodes[i], self.periodes[i + 1]
+
+        return self._remplacer(i, i + 1, [
+            periode_partagee_ordinaux(premiere.debut_ord, seconde.fin_ord, id_tarif or premiere.id_tarif),
+        ])
+
+    def retarifer(self, jour: date, id_tarif: str):
+        """
+        Change le tarif de la période contenant 'jour', sans toucher à ses bornes.
+
+        :return: La plage (debut, fin) de la période.
+        :raises ValueError: Si 'jour' n'est couvert par aucune période.
+        """
+        i = self._position(jour)
+        periode = self.periodes[i]
+
+        return self._remplacer(i, i, [
+            periode_partagee_ordinaux(periode.debut_ord, periode.fin_ord, id_tarif),
+        ])
+
+    def ajouter(self, date_debut: date, date_fin: date, id_tarif: str):
+        """
+        Ajoute une période à la fin du calendrier.
+
+        :return: La plage (debut, fin) de la nouvelle période.
+        :raises ValueError: Si la période ne commence pas le lendemain de la dernière.
+        """
+        n = len(self.periodes)
+        return self._remplacer(n, n - 1, [periode_partagee(date_debut, date_fin, id_tarif)])
 
-            if curr.debut != prec.fin + timedelta(days=1):
-                raise ValueError(
-                    "Périodes non consécutives : "
-                    f"{prec.fin} -> {curr.debut}"
-                )
 
+    def _position(self, jour: date) -> int:
+        """
+        Retourne l'indice dans self.periodes de la période contenant 'jour'.
+
+        Recherche dichotomique sur les dates de début (O(log n)).
+
+        :raises ValueError: Si la date ne correspond à aucune période définie.
+        """
+        i = bisect_right(self._debuts, jour.toordinal()) - 1
+        if i < 0 or not self.periodes[i].contient(jour):
+            raise ValueError(f"Aucune période trouvée pour {jour}")
+        return i
 
     def periode_pour_jour(self, jour: date) -> Periode:
         """
@@ -83,8 +240,55 @@ class CalendrierTarifaire:
         :return: L'objet Periode englobant cette date.
         :raises ValueError: Si la date ne correspond à aucune période définie.
         """
-        for periode in self.periodes:
-            if periode.contient(jour):
-                return periode
+        return self.periodes[self._position(jour)]
+
+    def segments(self, date_debut: date, date_fin: date):
+        """
+        Parcourt les périodes qui recouvrent la plage [date_debut, date_fin].
 
-        raise ValueError(f"Aucune période trouvée pour {jour}")
\ No newline at end of file
+        Une seule recherche dichotomique est faite pour le premier jour,
+        les périodes suivantes étant consécutives.
+
+        :param date_debut: Premier jour de la plage (inclus).
+        :param date_fin: Dernier jour de la plage (inclus).
+        :return: Générateur de tuples (periode, debut_segment, fin_segment),
+                 bornés à la plage demandée.
+        :raises ValueError: Si un jour de la plage n'est couvert par aucune période.
+        """
+        if date_fin < date_debut:
+            return
+
+        i = self._position(date_debut)
+        jour = date_debut
+        while True:
+            periode = self.periodes[i]
+            fin_segment = min(periode.fin, date_fin)
+            yield periode, jour, fin_segment
+
+            if fin_segment == date_fin:
+                return
+            jour = fin_segment + timedelta(days=1)
+            i += 1
+            if i >= len(self.periodes) or not self.periodes[i].contient(jour):
+                raise ValueError(f"Aucune période trouvée pour {jour}")
+
+
+def _message_jonction(prec, curr) -> str:
+    return f"Périodes non consécutives : {prec.fin} -> {curr.debut}"
+
+
+def _jonctions_invalides(periodes):
+    """Produit le message de chaque jonction présentant un écart ou un chevauchement."""
+    for prec, curr in zip(periodes, periodes[1:]):
+        if curr.debut_ord != prec.fin_ord + 1:
+            yield _message_jonction(prec, curr)
+
+
+def _verifier_jonctions(periodes):
+    """
+    Vérifie que chaque période de la liste commence le lendemain de la précédente.
+
+    :raises ValueError: Si un écart ou un chevauchement est détecté entre deux périodes.
+    """
+    for message in _jonctions_invalides(periodes):
+        raise ValueError(message)
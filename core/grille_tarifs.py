@@ -1,22 +1,26 @@
 import csv
-from core.tarifs import Tarif
+from core.metriques import chronometre
+from core.tarifs import Tarif, tarif_partage
 
 class GrilleTarifs:
     """
     Charge les tarifs depuis un fichier CSV.
     """
 
+    __slots__ = ("tarifs", "__weakref__")
+
     def __init__(self):
         self.tarifs = {}
 
     @classmethod
+    @chronometre("chargement_prix")
     def depuis_fichier(cls, fichier: str):
         grille = cls()
 
         with open(fichier, newline="", encoding="utf-8") as f:
             lecteur = csv.DictReader(f, delimiter=";")
             for ligne in lecteur:
-                grille.tarifs[ligne["id"]] = Tarif(
+                grille.tarifs[ligne["id"]] = tarif_partage(
                     float(ligne["prix_semaine"]),
                     float(ligne["prix_weekend"]),
                 )
@@ -0,0 +1,442 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import accumulate
+from core.regles import plan_par_defaut
+
+try:
+    import numpy as np
+except ImportError:  # calculs par lot en Python pur, plus lents
+    np = None
+
+# Résultat de IndexPrix.calculer_lot : un tableau NumPy par colonne (une liste sans NumPy)
+ResultatLot = namedtuple("ResultatLot", ["totaux", "moyennes", "nb_nuitees", "minimums"])
+
+# Format du fichier partagé entre processus (voir IndexPrix.publier)
+MAGIQUE = b"IDXP"
+VERSION_FORMAT = 1
+_EN_TETE = struct.Struct("<4sHHiIQ")
+_LONGUEUR_NOM = struct.Struct("<H")
+
+
+class IndexPrix:
+    """
+    Chronologie précalculée des prix par nuitée sur tout l'horizon du calendrier.
+
+    Pour le tarif net et pour chaque plateforme des règles de tarification,
+    on conserve le prix de chaque nuit (en centimes) et les sommes cumulées
+    correspondantes. Le total d'une plage quelconque se lit alors en deux
+    accès : cumuls[fin + 1] - cumuls[debut].
+
+    Les prix sont ceux du PlanTarifaire : prix de la grille par jour de la
+    semaine, majorés et arrondis à l'euro supérieur pour les plateformes,
+    comme dans TableauTarifs.
+    """
+
+    def __init__(self, calendrier, grille_tarifs, commissions=None, plan=None):
+        """
+        :param calendrier: Instance de CalendrierTarifaire (sans trou).
+        :param grille_tarifs: Instance de GrilleTarifs.
+        :param commissions: Taux par plateforme, pour les règles par défaut
+                            (TableauTarifs.COMMISSIONS si absent).
+        :param plan: PlanTarifaire compilé ; remplace grille_tarifs et commissions.
+        """
+        if plan is None:
+            plan = plan_par_defaut(grille_tarifs, commissions)
+        self.plan = plan
+        self.commissions = dict(plan.commissions)
+
+        periodes = calendrier.periodes
+        if not periodes:
+            raise ValueError("Le calendrier ne contient aucune période")
+
+        self.premier_jour = periodes[0].debut
+        self.dernier_jour = periodes[-1].fin
+        self._origine = self.premier_jour.toordinal()
+
+        self._prix = {
+            plateforme: array("q", prix)
+            for plateforme, prix in self._prix_plage(calendrier, self.premier_jour, self.dernier_jour).items()
+        }
+        self._cumuls = {
+            plateforme: array("q", accumulate(prix, initial=0))
+            for plateforme, prix in self._prix.items()
+        }
+
+    def _prix_plage(self, calendrier, date_debut: date, date_fin: date) -> dict:
+        """
+        Calcule le prix de chaque nuitée de la plage (en centimes), pour le
+        tarif net et chaque plateforme.
+
+        :return: Un dict {plateforme ou None: liste des prix}.
+        """
+        prix = {plateforme: [] for plateforme in [None, *self.commissions]}
+
+        for periode, debut, fin in calendrier.segments(date_debut, date_fin):
+            # Motif hebdomadaire aligné sur le premier jour du segment
+            nb_jours = (fin - debut).days + 1
+            semaines, reste = divmod(nb_jours, 7)
+            jours = [(debut.weekday() + k) % 7 for k in range(7)]
+            for plateforme in prix:
+                prix_jours = self.plan.prix_jours(periode.id_tarif, plateforme)
+                motif = [prix_jours[j] for j in jours]
+                prix[plateforme].extend(motif * semaines + motif[:reste])
+
+        return prix
+
+    @property
+    def nb_jours(self) -> int:
+        return len(self._prix[None])
+
+    # ------------------------------------------------------------------
+    # Mise à jour partielle
+    # ------------------------------------------------------------------
+    def copie(self):
+        """
+        Retourne une copie indépendante de l'index, à modifier par rafraichir()
+        pendant que l'original continue de servir.
+        """
+        index = type(self).__new__(type(self))
+        index.plan = self.plan
+        index.commissions = dict(self.commissions)
+        index.premier_jour = self.premier_jour
+        index.dernier_jour = self.dernier_jour
+        index._origine = self._origine
+        # array() copie aussi bien un tableau qu'une vue sur un fichier partagé
+        index._prix = {plateforme: array("q", prix) for plateforme, prix in self._prix.items()}
+        index._cumuls = {plateforme: array("q", cumuls) for plateforme, cumuls in self._cumuls.items()}
+        return index
+
+    def __getstate__(self):
+        # Envoi à un processus du pool : un index projeté (attacher) est copié,
+        # la projection du fichier ne se transmet pas
+        return self.copie().__dict__
+
+    def rafraichir(self, calendrier, date_debut: date, date_fin: date):
+        """
+        Recalcule les prix des seules nuitées de date_debut à date_fin, après
+        une modification du calendrier sur cette plage.
+
+        La plage peut prolonger l'horizon (période ajoutée à la fin). Les
+        sommes cumulées sont reprises à partir de date_debut.
+
+        :raises ValueError: Si la plage commence avant l'horizon ou laisse un trou après lui.
+        """
+        i = date_debut.toordinal() - self._origine
+        j = date_fin.toordinal() - self._origine + 1
+        if i < 0 or i > self.nb_jours:
+            raise ValueError(f"Aucune période trouvée pour {date_debut}")
+
+        for plateforme, nouveaux in self._prix_plage(calendrier, date_debut, date_fin).items():
+            prix = self._prix[plateforme]
+            prix[i:j] = array("q", nouveaux)
+
+            cumuls = self._cumuls[plateforme]
+            suite = accumulate(prix[i:], initial=cumuls[i])
+            next(suite)  # cumuls[i] lui-même, inchangé
+            del cumuls[i + 1:]
+            cumuls.extend(suite)
+
+        self.dernier_jour = max(self.dernier_jour, date_fin)
+
+    # ------------------------------------------------------------------
+    # Partage entre processus
+    # ------------------------------------------------------------------
+    def publier(self, fichier: str, generation: int = 0):
+        """
+        Écrit l'index dans un fichier que d'autres processus projettent en
+        mémoire avec attacher(), de façon atomique.
+
+        Disposition (petit-boutiste) :
+            en-tête   : magique 'IDXP', version (u16), nb_variantes (u16),
+                        premier jour (ordinal i32), nb_jours (u32), génération (u64)
+            variantes : pour chacune, longueur du nom (u16), nom UTF-8 (vide = net)
+            bourrage  : jusqu'à un multiple de 8 octets
+            tableaux  : pour chaque variante, prix (i64 × nb_jours)
+                        puis sommes cumulées (i64 × (nb_jours + 1))
+        """
+        plateformes = list(self._prix)
+        contenu = bytearray(_EN_TETE.pack(
+            MAGIQUE, VERSION_FORMAT, len(plateformes), self._origine, self.nb_jours, generation
+        ))
+        for plateforme in plateformes:
+            nom = (plateforme or "").encode("utf-8")
+            contenu += _LONGUEUR_NOM.pack(len(nom)) + nom
+        contenu += b"\0" * (-len(contenu) % 8)
+        for plateforme in plateformes:
+            for tableau in (self._prix[plateforme], self._cumuls[plateforme]):
+                tableau = array("q", tableau)
+                if sys.byteorder == "big":
+                    tableau.byteswap()
+                contenu += tableau.tobytes()
+
+        temporaire = f"{fichier}.{os.getpid()}.tmp"
+        with open(temporaire, "wb") as f:
+            f.write(contenu)
+        os.replace(temporaire, fichier)
+
+    @classmethod
+    def attacher(cls, fichier: str, plan):
+        """
+        Projette en lecture seule un index écrit par publier(), sans copie :
+        les processus qui attachent le même fichier partagent ses pages.
+
+        :param plan: PlanTarifaire des données dont l'index est issu.
+        :return: Un tuple (IndexPrix, génération).
+        :raises ValueError: Si le fichier n'est pas au format attendu ou ne
+                            correspond pas aux plateformes du plan.
+        """
+        with open(fichier, "rb") as f:
+            carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        vue = memoryview(carte)
+        try:
+            if len(vue) < _EN_TETE.size:
+                raise ValueError("Index partagé tronqué")
+            magique, version, nb_variantes, origine, nb_jours, generation = _EN_TETE.unpack_from(vue, 0)
+            if magique != MAGIQUE or version != VERSION_FORMAT:
+                raise ValueError(f"Format d'index partagé non reconnu (version {version})")
+
+            plateformes = []
+            pos = _EN_TETE.size
+            for _ in range(nb_variantes):
+                (longueur,) = _LONGUEUR_NOM.unpack_from(vue, pos)
+                pos += _LONGUEUR_NOM.size
+                plateformes.append(bytes(vue[pos:pos + longueur]).decode("utf-8") or None)
+                pos += longueur
+            pos += -pos % 8
+            if set(plateformes) != {None, *plan.commissions}:
+                raise ValueError("L'index partagé ne correspond pas aux règles de tarification")
+            if len(vue) < pos + 8 * (2 * nb_jours + 1) * nb_variantes:
+                raise ValueError("Index partagé tronqué")
+
+            def tableau(debut, longueur):
+                morceau = vue[debut:debut + 8 * longueur]
+                if sys.byteorder == "big":
+                    copie = array("q", morceau.tobytes())
+                    copie.byteswap()
+                    return copie
+                return morceau.cast("q")
+
+            index = cls.__new__(cls)
+            index.plan = plan
+            index.commissions = dict(plan.commissions)
+            index._origine = origine
+            index.premier_jour = date.fromordinal(origine)
+            index.dernier_jour = date.fromordinal(origine + nb_jours - 1)
+            index._prix = {}
+            index._cumuls = {}
+            for plateforme in plateformes:
+                index._prix[plateforme] = tableau(pos, nb_jours)
+                pos += 8 * nb_jours
+                index._cumuls[plateforme] = tableau(pos, nb_jours + 1)
+                pos += 8 * (nb_jours + 1)
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            vue.release()
+            carte.close()
+            raise ValueError(f"{fichier} : {e}")
+
+        # La projection vit aussi longtemps que l'index qui l'utilise
+        index._carte = carte
+        return index, generation
+
+    # ------------------------------------------------------------------
+    # Accès
+    # ------------------------------------------------------------------
+    def _bornes(self, date_debut: date, date_fin: date):
+        """
+        Convertit une plage de dates (incluses) en indices du tableau.
+
+        :raises ValueError: Si la plage sort de l'horizon du calendrier.
+        """
+        if date_debut < self.premier_jour:
+            raise ValueError(f"Aucune période trouvée pour {date_debut}")
+        if date_fin > self.dernier_jour:
+            premier_manquant = max(date_debut, self.dernier_jour + timedelta(days=1))
+            raise ValueError(f"Aucune période trouvée pour {premier_manquant}")
+        return date_debut.toordinal() - self._origine, date_fin.toordinal() - self._origine + 1
+
+    def _variante(self, plateforme):
+        if plateforme is not None and plateforme not in self.commissions:
+            raise ValueError(f"Plateforme '{plateforme}' inconnue")
+        return plateforme
+
+    def cumuls_centimes(self, plateforme: str = None):
+        """
+        Retourne les sommes cumulées (en centimes) d'une variante :
+        l'élément k est le total des k premières nuits depuis premier_jour.
+        """
+        return self._cumuls[self._variante(plateforme)]
+
+    def prix(self, jour: date, plateforme: str = None) -> float:
+        """
+        Retourne le prix d'une nuitée.
+        """
+        i, _ = self._bornes(jour, jour)
+        return self._prix[self._variante(plateforme)][i] / 100
+
+    def prix_centimes(self, date_debut: date, date_fin: date, plateforme: str = None) -> list:
+        """
+        Retourne les prix (en centimes) des nuitées de date_debut à date_fin incluses.
+        """
+        if date_fin < date_debut:
+            return []
+        i, j = self._bornes(date_debut, date_fin)
+        return self._prix[self._variante(plateforme)][i:j].tolist()
+
+    def total_centimes(self, date_debut: date, date_fin: date, plateforme: str = None) -> int:
+        """
+        Retourne le total en centimes des nuitées de date_debut à date_fin incluses.
+        """
+        if date_fin < date_debut:
+            return 0
+        i, j = self._bornes(date_debut, date_fin)
+        cumuls = self._cumuls[self._variante(plateforme)]
+        return cumuls[j] - cumuls[i]
+
+    def total(self, date_debut: date, date_fin: date, plateforme: str = None) -> float:
+        """
+        Retourne le total des nuitées de date_debut à date_fin incluses.
+        """
+        return self.total_centimes(date_debut, date_fin, plateforme) / 100
+
+    def moyenne(self, date_debut: date, date_fin: date, plateforme: str = None) -> float:
+        """
+        Retourne le prix moyen par nuitée sur la plage (0 si la plage est vide).
+        """
+        nb_nuitees = (date_fin - date_debut).days + 1
+        if nb_nuitees <= 0:
+            return 0
+        return self.total(date_debut, date_fin, plateforme) / nb_nuitees
+
+    def details(self, date_debut: date, date_fin: date, plateforme: str = None):
+        """
+        Retourne le détail jour par jour et le total, comme CalculateurLocation.calculer.
+        """
+        if date_fin < date_debut:
+            return [], 0.0
+        i, j = self._bornes(date_debut, date_fin)
+        prix = self._prix[self._variante(plateforme)]
+
+        details = [
+            (date.fromordinal(self._origine + k), prix[k] / 100)
+            for k in range(i, j)
+        ]
+        return details, self.total(date_debut, date_fin, plateforme)
+
+    # ------------------------------------------------------------------
+    # Calcul par lot (NumPy)
+    # ------------------------------------------------------------------
+    def _cumuls_numpy(self, plateforme):
+        # Vue sans copie sur le tableau des sommes cumulées
+        return np.frombuffer(self._cumuls[plateforme], dtype=np.int64)
+
+    def calculer_lot(self, debuts, fins, plateforme: str = None, menage: bool = False,
+                     minimums=None) -> ResultatLot:
+        """
+        Calcule en une fois les totaux d'un grand nombre de séjours.
+
+        Chaque séjour couvre les nuitées de debuts[k] à fins[k] incluses,
+        comme CalculateurLocation.calculer ; la remise de durée des règles
+        est déduite des totaux. Les totaux sont lus dans les sommes
+        cumulées, sans boucle Python par séjour ; sans NumPy, une boucle
+        donne les mêmes valeurs, dans des listes.
+
+        :param debuts: Dates de début (séquence de dates ou tableau datetime64[D]).
+        :param fins: Dates de dernière nuitée, même longueur que debuts.
+        :param plateforme: Plateforme dont la commission est incluse (None = net).
+        :param menage: Ajoute le forfait de ménage de chaque séjour non vide aux totaux.
+        :param minimums: Séjour minimum de chaque date d'arrivée de l'horizon,
+                         depuis premier_jour (voir PlanTarifaire.sejours_minimums).
+        :return: ResultatLot(totaux, moyennes, nb_nuitees, minimums) ; les
+                 moyennes portent sur les nuitées seules, hors ménage, et
+                 minimums donne le séjour minimum de chaque séjour (1 sans
+                 'minimums'), à comparer à nb_nuitees.
+        :raises ValueError: Si un séjour sort de l'horizon du calendrier.
+        """
+        if np is None:
+            return self._calculer_lot_python(debuts, fins, plateforme, menage, minimums)
+
+        origine = np.datetime64(self.premier_jour, "D")
+        i = (np.asarray(debuts, dtype="datetime64[D]") - origine).astype(np.int64)
+        j = (np.asarray(fins, dtype="datetime64[D]") - origine).astype(np.int64) + 1
+        if i.shape != j.shape:
+            raise ValueError("Les listes de débuts et de fins n'ont pas la même longueur")
+
+        nb_nuitees = np.maximum(j - i, 0)
+        hors_plage = (nb_nuitees > 0) & ((i < 0) | (j > self.nb_jours))
+        if hors_plage.any():
+            k = int(np.argmax(hors_plage))
+            raise ValueError(
+                f"Séjour n°{k + 1} hors du calendrier "
+                f"({self.premier_jour} → {self.dernier_jour})"
+            )
+
+        cumuls = self._cumuls_numpy(self._variante(plateforme))
+        vides = nb_nuitees == 0
+        i = np.where(vides, 0, i)
+        j = np.where(vides, 0, j)
+        centimes = cumuls[j] - cumuls[i]
+
+        # Remise de durée : même arrondi entier que PlanTarifaire.remise_centimes
+        remises = self.plan.regles.remises_duree
+        if remises:
+            seuils = np.array([seuil for seuil, _ in remises], dtype=np.int64)
+            numerateurs = np.array([0] + [taux.numerator for _, taux in remises], dtype=np.int64)
+            denominateurs = np.array([1] + [taux.denominator for _, taux in remises], dtype=np.int64)
+            rang = np.searchsorted(seuils, nb_nuitees, side="right")
+            num, den = numerateurs[rang], denominateurs[rang]
+            centimes = centimes - (2 * centimes * num + den) // (2 * den)
+        totaux = centimes / 100
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            moyennes = np.where(vides, 0.0, totaux / nb_nuitees)
+
+        if menage:
+            regles = self.plan.regles
+            forfaits = np.where(
+                nb_nuitees <= regles.nuitees_sejour_court, regles.frais_menage_court, regles.frais_menage
+            )
+            # Pas de ménage pour un séjour vide (fin avant le début)
+            totaux = totaux + np.where(vides, 0.0, forfaits)
+
+        if minimums is None:
+            minimums_sejours = np.ones_like(nb_nuitees)
+        else:
+            minimums_sejours = np.asarray(minimums, dtype=np.int64)[i]
+
+        return ResultatLot(totaux, moyennes, nb_nuitees, minimums_sejours)
+
+    def _calculer_lot_python(self, debuts, fins, plateforme, menage, minimums) -> ResultatLot:
+        # Même calcul que calculer_lot, séjour par séjour
+        debuts, fins = list(debuts), list(fins)
+        if len(debuts) != len(fins):
+            raise ValueError("Les listes de débuts et de fins n'ont pas la même longueur")
+
+        cumuls = self._cumuls[self._variante(plateforme)]
+        plan = self.plan
+        resultat = ResultatLot([], [], [], [])
+        for k, (debut, fin) in enumerate(zip(debuts, fins)):
+            i = debut.toordinal() - self._origine
+            j = fin.toordinal() - self._origine + 1
+            nb_nuitees = max(j - i, 0)
+            if not nb_nuitees:
+                i = j = 0
+            elif i < 0 or j > self.nb_jours:
+                raise ValueError(
+                    f"Séjour n°{k + 1} hors du calendrier "
+                    f"({self.premier_jour} → {self.dernier_jour})"
+                )
+
+            centimes = cumuls[j] - cumuls[i]
+            total = (centimes - plan.remise_centimes(centimes, nb_nuitees)) / 100
+            resultat.moyennes.append(total / nb_nuitees if nb_nuitees else 0.0)
+            if menage and nb_nuitees:
+                total += plan.frais_menage(nb_nuitees)
+            resultat.totaux.append(total)
+            resultat.nb_nuitees.append(nb_nuitees)
+            resultat.minimums.append(1 if minimums is None else minimums[i])
+        return resultat
@@ -0,0 +1,292 @@
+"""
+Matrice précalculée des devis : date d'arrivée × durée de séjour.
+
+Pour chaque variante (tarif net et chaque plateforme), chaque date
+d'arrivée de l'horizon du calendrier et chaque durée de nuits_min à
+nuits_max, la matrice conserve le total des nuitées en centimes, remise de
+durée déduite (hors ménage). Une case vaut NON_RESERVABLE si le séjour
+sort de l'horizon ou s'il est plus court que le séjour minimum du tarif
+d'arrivée.
+
+Format binaire (petit-boutiste), utilisé pour la sauvegarde et par /matrice :
+    en-tête    : magique 'MATR', version (u16), nb_variantes (u16),
+                 première date d'arrivée (ordinal i32), nb_lignes (u32),
+                 nuits_min (u16), nuits_max (u16)
+    variantes  : pour chacune, longueur du nom (u16), nom UTF-8 (vide = net)
+    bourrage   : jusqu'à un multiple de 8 octets
+    cellules   : pour chaque variante, i64 × nb_lignes × nb_durees,
+                 une ligne par date d'arrivée
+"""
+
+import os
+import struct
+import sys
+from array import array
+from datetime import date, timedelta
+from core.metriques import chronometre
+
+MAGIQUE = b"MATR"
+VERSION_FORMAT = 2
+
+# Cellules en entiers 64 bits, comme les sommes cumulées de IndexPrix : un
+# séjour long à prix élevé dépasserait 2**31 centimes en 32 bits
+TYPE_CELLULE = "q"
+
+# Durée maximale par défaut, en nuits
+NUITS_MAX = 28
+
+NON_RESERVABLE = -1
+
+_EN_TETE = struct.Struct("<4sHHiIHH")
+_LONGUEUR_NOM = struct.Struct("<H")
+
+
+def _petit_boutiste(tableau: array) -> array:
+    if sys.byteorder == "big":
+        tableau = array(tableau.typecode, tableau)
+        tableau.byteswap()
+    return tableau
+
+
+class MatriceDevis:
+    """
+    Totaux de tous les séjours (arrivée, durée) de l'horizon, par variante.
+
+    Les totaux sont lus dans les sommes cumulées d'un IndexPrix. Après une
+    modification du calendrier, rafraichir() ne recalcule que la bande
+    diagonale des séjours qui touchent la plage modifiée.
+    """
+
+    def __init__(self, calendrier, index, nuits_min: int = None, nuits_max: int = NUITS_MAX):
+        """
+        :param calendrier: CalendrierTarifaire dont l'index est issu.
+        :param index: IndexPrix à jour (fournit le plan et les sommes cumulées).
+        :param nuits_min: Durée minimale (séjour minimum des règles par défaut).
+        :param nuits_max: Durée maximale, en nuits.
+        :raises ValueError: Si les durées sont incohérentes.
+        """
+        if nuits_min is None:
+            nuits_min = index.plan.regles.sejour_minimum
+        if not 1 <= nuits_min <= nuits_max <= 0xFFFF:
+            raise ValueError("Durées de séjour invalides")
+
+        self.nuits_min = nuits_min
+        self.nuits_max = nuits_max
+        self._initialiser(index)
+        self._remplir(calendrier, index, 0, self.nb_jours - 1)
+
+    def _initialiser(self, index):
+        self.plan = index.plan
+        self.premier_jour = index.premier_jour
+        self.nb_jours = index.nb_jours
+        self._origine = self.premier_jour.toordinal()
+        self._remises = [self.plan.taux_remise(n) for n in range(self.nuits_min, self.nuits_max + 1)]
+        vide = array(TYPE_CELLULE, [NON_RESERVABLE]) * (self.nb_jours * self.nb_durees)
+        self._cellules = {plateforme: vide[:] for plateforme in [None, *index.commissions]}
+
+    @property
+    def nb_durees(self) -> int:
+        return self.nuits_max - self.nuits_min + 1
+
+    @property
+    def dernier_jour(self) -> date:
+        return self.premier_jour + timedelta(days=self.nb_jours - 1)
+
+    @property
+    def plateformes(self) -> list:
+        return list(self._cellules)
+
+    # ------------------------------------------------------------------
+    # Calcul
+    # ------------------------------------------------------------------
+    def _minimums(self, calendrier, i0: int, i1: int) -> list:
+        """Séjour minimum de chaque date d'arrivée de i0 à i1 inclus."""
+        return self.plan.sejours_minimums(
+            calendrier, date.fromordinal(self._origine + i0), date.fromordinal(self._origine + i1)
+        )
+
+    @chronometre("matrice_devis")
+    def _remplir(self, calendrier, index, a: int, b: int):
+        """
+        Recalcule les séjours dont au moins une nuitée tombe entre les jours
+        d'indices a et b : arrivées de a - nuits_max + 1 à b, et pour les
+        arrivées avant a, les seules durées qui atteignent a.
+        """
+        nmin, nb_durees, nb_jours = self.nuits_min, self.nb_durees, self.nb_jours
+        i0 = max(a - self.nuits_max + 1, 0)
+        i1 = min(b, nb_jours - 1)
+        if i1 < i0:
+            return
+        minimums = self._minimums(calendrier, i0, i1)
+
+        for plateforme, cellules in self._cellules.items():
+            cumuls = index.cumuls_centimes(plateforme)
+            for i in range(i0, i1 + 1):
+                k0 = max(a - i + 1 - nmin, 0)
+                depart = cumuls[i]
+                minimum = minimums[i - i0]
+                ligne = []
+                for k in range(k0, nb_durees):
+                    n = nmin + k
+                    if i + n > nb_jours or n < minimum:
+                        ligne.append(NON_RESERVABLE)
+                        continue
+                    total = cumuls[i + n] - depart
+                    taux = self._remises[k]
+                    if taux:
+                        # Même arrondi que PlanTarifaire.remise_centimes
+                        total -= (2 * total * taux.numerator + taux.denominator) // (2 * taux.denominator)
+                    ligne.append(total)
+                cellules[i * nb_durees + k0:(i + 1) * nb_durees] = array(TYPE_CELLULE, ligne)
+
+    def copie(self):
+        """
+        Retourne une copie indépendante de la matrice, à modifier par
+        rafraichir() pendant que l'original continue de servir.
+        """
+        matrice = type(self).__new__(type(self))
+        matrice.__dict__.update(self.__dict__)
+        matrice._cellules = {plateforme: cellules[:] for plateforme, cellules in self._cellules.items()}
+        return matrice
+
+    def rafraichir(self, calendrier, index, date_debut: date, date_fin: date):
+        """
+        Met à jour la matrice après une modification du calendrier sur la
+        plage date_debut → date_fin, l'index étant déjà rafraîchi.
+
+        Une plage qui prolonge l'horizon ajoute les lignes correspondantes ;
+        si l'horizon ou le plan change autrement, tout est recalculé.
+        """
+        if (index.premier_jour != self.premier_jour or index.nb_jours < self.nb_jours
+                or index.plan is not self.plan or set(index.commissions) != set(self._cellules) - {None}):
+            self._initialiser(index)
+            self._remplir(calendrier, index, 0, self.nb_jours - 1)
+            return
+
+        ajout = index.nb_jours - self.nb_jours
+        if ajout:
+            for cellules in self._cellules.values():
+                cellules.extend(array(TYPE_CELLULE, [NON_RESERVABLE]) * (ajout * self.nb_durees))
+            self.nb_jours = index.nb_jours
+
+        a = max(date_debut.toordinal() - self._origine, 0)
+        b = date_fin.toordinal() - self._origine
+        self._remplir(calendrier, index, a, b)
+
+    # ------------------------------------------------------------------
+    # Accès
+    # ------------------------------------------------------------------
+    def _variante(self, plateforme):
+        if plateforme not in self._cellules:
+            raise ValueError(f"Plateforme '{plateforme}' inconnue")
+        return plateforme
+
+    def _lignes(self, date_debut: date = None, date_fin: date = None):
+        """
+        Convertit une plage de dates d'arrivée (incluses) en indices de lignes,
+        bornée à l'horizon.
+        """
+        i0 = 0 if date_debut is None else max(date_debut.toordinal() - self._origine, 0)
+        i1 = self.nb_jours if date_fin is None else min(date_fin.toordinal() - self._origine + 1, self.nb_jours)
+        return i0, max(i1, i0)
+
+    def total_centimes(self, date_debut: date, nb_nuitees: int, plateforme: str = None):
+        """
+        Retourne le total (en centimes) d'un séjour, ou None s'il n'est pas
+        réservable ou hors de la matrice.
+        """
+        i = date_debut.toordinal() - self._origine
+        k = nb_nuitees - self.nuits_min
+        if not (0 <= i < self.nb_jours and 0 <= k < self.nb_durees):
+            return None
+        total = self._cellules[self._variante(plateforme)][i * self.nb_durees + k]
+        return None if total == NON_RESERVABLE else total
+
+    def lignes(self, plateforme: str = None, date_debut: date = None, date_fin: date = None):
+        """
+        Génère, pour chaque date d'arrivée de la plage, un tuple
+        (date, totaux en euros de nuits_min à nuits_max, None si non réservable).
+        """
+        cellules = self._cellules[self._variante(plateforme)]
+        nb_durees = self.nb_durees
+        i0, i1 = self._lignes(date_debut, date_fin)
+        for i in range(i0, i1):
+            ligne = cellules[i * nb_durees:(i + 1) * nb_durees]
+            yield (
+                date.fromordinal(self._origine + i),
+                [None if total == NON_RESERVABLE else total / 100 for total in ligne],
+            )
+
+    # ------------------------------------------------------------------
+    # Format binaire
+    # ------------------------------------------------------------------
+    def en_octets(self, plateformes=None, date_debut: date = None, date_fin: date = None) -> bytes:
+        """
+        Sérialise tout ou partie de la matrice au format binaire du module.
+
+        :param plateformes: Variantes à inclure (toutes par défaut ; None = net).
+        """
+        if plateformes is None:
+            plateformes = self.plateformes
+        i0, i1 = self._lignes(date_debut, date_fin)
+
+        contenu = bytearray(_EN_TETE.pack(
+            MAGIQUE, VERSION_FORMAT, len(plateformes), self._origine + i0,
+            i1 - i0, self.nuits_min, self.nuits_max,
+        ))
+        for plateforme in plateformes:
+            nom = (self._variante(plateforme) or "").encode("utf-8")
+            contenu += _LONGUEUR_NOM.pack(len(nom)) + nom
+        contenu += b"\0" * (-len(contenu) % 8)
+
+        for plateforme in plateformes:
+            cellules = self._cellules[plateforme][i0 * self.nb_durees:i1 * self.nb_durees]
+            contenu += _petit_boutiste(cellules).tobytes()
+        return bytes(contenu)
+
+    def enregistrer(self, fichier: str):
+        """Écrit la matrice complète dans un fichier, de façon atomique."""
+        temporaire = f"{fichier}.tmp"
+        with open(temporaire, "wb") as f:
+            f.write(self.en_octets())
+        os.replace(temporaire, fichier)
+
+    @classmethod
+    def charger(cls, fichier: str, index):
+        """
+        Relit une matrice écrite par enregistrer() pour l'index donné.
+
+        :raises ValueError: Si le fichier est illisible ou ne correspond pas à l'index.
+        """
+        with open(fichier, "rb") as f:
+            contenu = f.read()
+        if len(contenu) < _EN_TETE.size:
+            raise ValueError("Matrice tronquée")
+        magique, version, nb_variantes, origine, nb_lignes, nuits_min, nuits_max = _EN_TETE.unpack_from(contenu, 0)
+        if magique != MAGIQUE or version != VERSION_FORMAT:
+            raise ValueError(f"Format de matrice non reconnu (version {version})")
+
+        plateformes = []
+        pos = _EN_TETE.size
+        for _ in range(nb_variantes):
+            (longueur,) = _LONGUEUR_NOM.unpack_from(contenu, pos)
+            pos += _LONGUEUR_NOM.size
+            plateformes.append(contenu[pos:pos + longueur].decode("utf-8") or None)
+            pos += longueur
+        pos += -pos % 8
+
+        if (origine != index.premier_jour.toordinal() or nb_lignes != index.nb_jours
+                or set(plateformes) != {None, *index.commissions}):
+            raise ValueError("La matrice ne correspond pas aux données chargées")
+
+        matrice = cls.__new__(cls)
+        matrice.nuits_min = nuits_min
+        matrice.nuits_max = nuits_max
+        matrice._initialiser(index)
+        taille = array(TYPE_CELLULE).itemsize * nb_lignes * matrice.nb_durees
+        if len(contenu) < pos + taille * nb_variantes:
+            raise ValueError("Matrice tronquée")
+        for plateforme in plateformes:
+            matrice._cellules[plateforme] = _petit_boutiste(array(TYPE_CELLULE, contenu[pos:pos + taille]))
+            pos += taille
+        return matrice
@@ -0,0 +1,255 @@
+"""
+Métriques internes : histogrammes de durée par étape et compteurs.
+
+Tout est conservé en mémoire dans le processus et exporté au format texte
+de Prometheus (exporter_prometheus) ou en résumé lisible (resume).
+
+Les mesures sont désactivées par défaut : TARIFS_METRIQUES=1 les active
+pour l'API, l'option --stats pour le CLI. Désactivées, chronometre() et
+mesurer() se réduisent à un test de booléen.
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Bornes des histogrammes, en secondes (de 50 µs à 10 s)
+BORNES = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+PREFIXE = "tarifs"
+
+_actif = os.environ.get("TARIFS_METRIQUES", "").strip().lower() in ("1", "true", "oui")
+_verrou = threading.Lock()
+_histogrammes = {}
+_compteurs = {}
+_caches = {}
+
+_SANS_MESURE = nullcontext()
+
+
+class Histogramme:
+    """
+    Histogramme cumulatif de durées, aux bornes fixes de BORNES.
+    """
+
+    __slots__ = ("comptes", "nombre", "somme", "maximum")
+
+    def __init__(self):
+        self.comptes = [0] * (len(BORNES) + 1)  # dernière case : au-delà de 10 s
+        self.nombre = 0
+        self.somme = 0.0
+        self.maximum = 0.0
+
+    def observer(self, duree: float):
+        self.comptes[bisect.bisect_left(BORNES, duree)] += 1
+        self.nombre += 1
+        self.somme += duree
+        if duree > self.maximum:
+            self.maximum = duree
+
+    def quantile(self, q: float) -> float:
+        """Estime un quantile : borne supérieure de la case qui le contient."""
+        if not self.nombre:
+            return 0.0
+        rang = q * self.nombre
+        cumul = 0
+        for borne, compte in zip(BORNES, self.comptes):
+            cumul += compte
+            if cumul >= rang:
+                return min(borne, self.maximum)
+        return self.maximum
+
+
+# ----------------------------------------------------------------------
+# Activation
+# ----------------------------------------------------------------------
+def activer(actif: bool = True):
+    global _actif
+    _actif = actif
+
+
+def est_actif() -> bool:
+    return _actif
+
+
+def reinitialiser():
+    """Remet à zéro histogrammes et compteurs (les caches restent enregistrés)."""
+    with _verrou:
+        _histogrammes.clear()
+        _compteurs.clear()
+
+
+# ----------------------------------------------------------------------
+# Enregistrement
+# ----------------------------------------------------------------------
+def observer(etape: str, duree: float):
+    """Ajoute une durée (en secondes) à l'histogramme de 'etape'."""
+    with _verrou:
+        histogramme = _histogrammes.get(etape)
+        if histogramme is None:
+            histogramme = _histogrammes[etape] = Histogramme()
+        histogramme.observer(duree)
+
+
+def compter(nom: str, valeur: int = 1):
+    """Incrémente le compteur 'nom' (sans effet si les métriques sont désactivées)."""
+    if not _actif:
+        return
+    with _verrou:
+        _compteurs[nom] = _compteurs.get(nom, 0) + valeur
+
+
+@contextmanager
+def _chronometrer(etape: str):
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer(etape, time.perf_counter() - debut)
+
+
+def mesurer(etape: str):
+    """
+    Gestionnaire de contexte qui mesure la durée du bloc :
+
+        with mesurer("serialisation_json"):
+            ...
+    """
+    if not _actif:
+        return _SANS_MESURE
+    return _chronometrer(etape)
+
+
+def chronometre(etape: str):
+    """
+    Décorateur qui mesure la durée de chaque appel de la fonction.
+    """
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if not _actif:
+                return fonction(*args, **kwargs)
+            debut = time.perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                observer(etape, time.perf_counter() - debut)
+        return enveloppe
+    return decorateur
+
+
+def enregistrer_cache(nom: str, statistiques):
+    """
+    Déclare un cache dont les statistiques sont lues au moment de l'export.
+
+    :param statistiques: Fonction sans argument retournant un dict avec au
+                         moins 'hits' et 'misses' (comme CacheLRU.statistiques).
+    """
+    with _verrou:
+        _caches[nom] = statistiques
+
+
+def statistiques_lru(fonction):
+    """Adapte le cache_info() d'une fonction functools.lru_cache pour enregistrer_cache."""
+    def statistiques():
+        info = fonction.cache_info()
+        total = info.hits + info.misses
+        return {
+            "entrees": info.currsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "taux_hits": info.hits / total if total else 0.0,
+        }
+    return statistiques
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+def _instantane():
+    with _verrou:
+        histogrammes = {
+            etape: (list(h.comptes), h.nombre, h.somme, h.maximum, h.quantile(0.5), h.quantile(0.95))
+            for etape, h in _histogrammes.items()
+        }
+        compteurs = dict(_compteurs)
+        caches = dict(_caches)
+    return histogrammes, compteurs, {nom: lire() for nom, lire in caches.items()}
+
+
+def _nombre(valeur) -> str:
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+def exporter_prometheus() -> str:
+    """
+    Retourne toutes les métriques au format texte d'exposition de Prometheus.
+    """
+    histogrammes, compteurs, caches = _instantane()
+    lignes = []
+
+    nom = f"{PREFIXE}_etape_duree_secondes"
+    lignes.append(f"# HELP {nom} Durée des étapes instrumentées.")
+    lignes.append(f"# TYPE {nom} histogram")
+    for etape, (comptes, nombre, somme, _, _, _) in sorted(histogrammes.items()):
+        cumul = 0
+        for borne, compte in zip(BORNES, comptes):
+            cumul += compte
+            lignes.append(f'{nom}_bucket{{etape="{etape}",le="{borne}"}} {cumul}')
+        lignes.append(f'{nom}_bucket{{etape="{etape}",le="+Inf"}} {nombre}')
+        lignes.append(f'{nom}_sum{{etape="{etape}"}} {_nombre(somme)}')
+        lignes.append(f'{nom}_count{{etape="{etape}"}} {nombre}')
+
+    for compteur, valeur in sorted(compteurs.items()):
+        lignes.append(f"# TYPE {PREFIXE}_{compteur}_total counter")
+        lignes.append(f"{PREFIXE}_{compteur}_total {valeur}")
+
+    if caches:
+        for cle, type_metrique in (("hits", "counter"), ("misses", "counter"),
+                                   ("entrees", "gauge"), ("taux_hits", "gauge")):
+            suffixe = "_total" if type_metrique == "counter" else ""
+            metrique = f"{PREFIXE}_cache_{cle}{suffixe}"
+            lignes.append(f"# TYPE {metrique} {type_metrique}")
+            for cache, stats in sorted(caches.items()):
+                if cle in stats:
+                    lignes.append(f'{metrique}{{cache="{cache}"}} {_nombre(stats[cle])}')
+
+    return "\n".join(lignes) + "\n"
+
+
+def resume() -> str:
+    """
+    Retourne un résumé lisible des métriques (utilisé par l'option --stats du CLI).
+    """
+    histogrammes, compteurs, caches = _instantane()
+    lignes = [
+        f"{'Étape':<28} {'Appels':>8} {'Total ms':>10} {'Moy. ms':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'Max ms':>9}",
+        "-" * 89,
+    ]
+    for etape, (_, nombre, somme, maximum, p50, p95) in sorted(histogrammes.items()):
+        lignes.append(
+            f"{etape:<28} {nombre:>8} {somme * 1000:>10.3f} {somme / nombre * 1000:>10.3f} "
+            f"{p50 * 1000:>9.3f} {p95 * 1000:>9.3f} {maximum * 1000:>9.3f}"
+        )
+
+    if compteurs:
+        lignes.append("")
+        for compteur, valeur in sorted(compteurs.items()):
+            lignes.append(f"{compteur:<28} {valeur:>8}")
+
+    if caches:
+        lignes.append("")
+        for cache, stats in sorted(caches.items()):
+            lignes.append(
+                f"cache {cache:<22} {stats.get('hits', 0):>8} hits "
+                f"{stats.get('misses', 0):>8} misses ({stats.get('taux_hits', 0.0):.1%})"
+            )
+
+    return "\n".join(lignes)
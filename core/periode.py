@@ -1,20 +1,79 @@
+import weakref
 from datetime import date
+from core.tarifs import id_tarif_pour_indice, indice_tarif
+
+# Périodes partagées entre calendriers (plusieurs propriétés aux mêmes saisons)
+_PERIODES_PARTAGEES = weakref.WeakValueDictionary()
 
 class Periode:
     """
     Représente une période calendaire associée à un tarif.
+
+    Les bornes sont conservées sous forme d'ordinaux de jour (debut_ord,
+    fin_ord) et le tarif sous forme d'indice interné ; debut, fin et
+    id_tarif en sont une vue.
     """
 
+    __slots__ = ("debut_ord", "fin_ord", "indice_tarif", "__weakref__")
+
     def __init__(self, debut: date, fin: date, id_tarif: str):
         if fin < debut:
             raise ValueError("La date de fin est antérieure à la date de début")
 
-        self.debut = debut
-        self.fin = fin
-        self.id_tarif = id_tarif
+        self.debut_ord = debut.toordinal()
+        self.fin_ord = fin.toordinal()
+        self.indice_tarif = indice_tarif(id_tarif)
+
+    @classmethod
+    def depuis_ordinaux(cls, debut_ord: int, fin_ord: int, id_tarif: str):
+        """
+        Crée une période directement à partir d'ordinaux de jour,
+        sans passer par des objets date.
+        """
+        if fin_ord < debut_ord:
+            raise ValueError("La date de fin est antérieure à la date de début")
+
+        periode = cls.__new__(cls)
+        periode.debut_ord = debut_ord
+        periode.fin_ord = fin_ord
+        periode.indice_tarif = indice_tarif(id_tarif)
+        return periode
+
+    @property
+    def debut(self) -> date:
+        return date.fromordinal(self.debut_ord)
+
+    @property
+    def fin(self) -> date:
+        return date.fromordinal(self.fin_ord)
+
+    @property
+    def id_tarif(self) -> str:
+        return id_tarif_pour_indice(self.indice_tarif)
 
     def contient(self, jour: date) -> bool:
         """
         Indique si une date appartient à cette période.
         """
-        return self.debut <= jour <= self.fin
+        return self.debut_ord <= jour.toordinal() <= self.fin_ord
+
+
+def periode_partagee(debut: date, fin: date, id_tarif: str) -> Periode:
+    """
+    Retourne l'unique instance de Periode pour ces bornes et ce tarif (internement).
+
+    Une Periode partagée ne doit pas être modifiée : on la remplace.
+    """
+    return periode_partagee_ordinaux(debut.toordinal(), fin.toordinal(), id_tarif)
+
+
+def periode_partagee_ordinaux(debut_ord: int, fin_ord: int, id_tarif: str) -> Periode:
+    """
+    Variante de periode_partagee à partir d'ordinaux de jour.
+    """
+    cle = (debut_ord, fin_ord, id_tarif)
+    periode = _PERIODES_PARTAGEES.get(cle)
+    if periode is None:
+        periode = Periode.depuis_ordinaux(debut_ord, fin_ord, id_tarif)
+        _PERIODES_PARTAGEES[cle] = periode
+    return periode
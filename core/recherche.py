@@ -0,0 +1,85 @@
+import heapq
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Une fenêtre de séjour : nuitées de 'debut' à 'derniere_nuitee' incluses
+Fenetre = namedtuple("Fenetre", ["debut", "derniere_nuitee", "nb_nuitees", "total", "moyenne"])
+
+
+def rechercher_fenetres(index, date_debut: date, date_fin: date, nuits_min: int,
+                        nuits_max: int = None, plateforme: str = None, k: int = 5,
+                        moins_chers: bool = True, critere: str = "total",
+                        calendrier=None, minimum_global: bool = True):
+    """
+    Recherche les k fenêtres de séjour les moins (ou les plus) chères.
+
+    Toutes les fenêtres dont les nuitées tiennent dans [date_debut, date_fin]
+    et dont la durée est comprise entre nuits_min et nuits_max sont évaluées
+    par différence des sommes cumulées de l'index : le coût est linéaire en
+    la taille de la plage pour chaque durée. Comme pour un devis, la remise
+    de durée des règles est déduite des totaux et les fenêtres plus courtes
+    que le séjour minimum de leur date d'arrivée sont écartées.
+
+    :param index: Instance de IndexPrix.
+    :param date_debut: Premier jour de la plage de recherche.
+    :param date_fin: Dernière nuitée possible (incluse).
+    :param nuits_min: Durée minimale du séjour, en nuits.
+    :param nuits_max: Durée maximale (par défaut égale à nuits_min).
+    :param plateforme: Plateforme dont la commission est incluse (None = net).
+    :param k: Nombre de fenêtres à retourner.
+    :param moins_chers: True pour les moins chères, False pour les plus chères.
+    :param critere: 'total' ou 'moyenne' (prix par nuit) pour le classement.
+    :param calendrier: Calendrier dont l'index est issu, pour le séjour minimum
+                       du tarif d'arrivée (sans lui, seul le minimum général compte).
+    :param minimum_global: Tenir compte du séjour minimum général des règles.
+    :return: Liste de Fenetre triée selon le critère.
+    :raises ValueError: Si les paramètres sont incohérents ou hors du calendrier.
+    """
+    if nuits_max is None:
+        nuits_max = nuits_min
+    if nuits_min < 1 or nuits_max < nuits_min:
+        raise ValueError("Durées de séjour invalides")
+    if critere not in ("total", "moyenne"):
+        raise ValueError(f"Critère '{critere}' inconnu (total ou moyenne)")
+    if k < 1 or date_fin < date_debut:
+        return []
+
+    # Validation de l'horizon : lève l'erreur habituelle si besoin
+    index.total_centimes(date_debut, date_fin, plateforme)
+    plan = index.plan
+    cumuls = index.cumuls_centimes(plateforme)
+    origine = index.premier_jour.toordinal()
+    i0 = date_debut.toordinal() - origine
+    j0 = date_fin.toordinal() - origine + 1
+    if calendrier is not None:
+        minimums = plan.sejours_minimums(calendrier, date_debut, date_fin, minimum_global)
+    else:
+        minimums = [plan.sejour_minimum(minimum_global=minimum_global)] * (j0 - i0)
+
+    def total_centimes(i, nb_nuitees):
+        total = cumuls[i + nb_nuitees] - cumuls[i]
+        return total - plan.remise_centimes(total, nb_nuitees)
+
+    def candidates():
+        for nb_nuitees in range(nuits_min, min(nuits_max, j0 - i0) + 1):
+            for i in range(i0, j0 - nb_nuitees + 1):
+                if nb_nuitees < minimums[i - i0]:
+                    continue
+                total = total_centimes(i, nb_nuitees)
+                yield (total / nb_nuitees if critere == "moyenne" else total), i, nb_nuitees
+
+    choisir = heapq.nsmallest if moins_chers else heapq.nlargest
+    meilleures = choisir(k, candidates(), key=lambda c: c[0])
+
+    fenetres = []
+    for _, i, nb_nuitees in meilleures:
+        total = total_centimes(i, nb_nuitees) / 100
+        debut = date.fromordinal(origine + i)
+        fenetres.append(Fenetre(
+            debut,
+            debut + timedelta(days=nb_nuitees - 1),
+            nb_nuitees,
+            total,
+            total / nb_nuitees,
+        ))
+    return fenetres
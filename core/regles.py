@@ -0,0 +1,312 @@
+"""
+Règles de tarification déclaratives et plan d'évaluation compilé.
+
+Les règles sont lues dans regles.json, à côté de prix.csv et periode.csv.
+Toute clé absente garde sa valeur par défaut, qui reproduit le calcul
+historique ; un fichier absent équivaut donc à {}. Exemple :
+
+    {
+        "jours_weekend": ["samedi", "dimanche"],
+        "prix_jours": {"Haute_2026": {"vendredi": 75}},
+        "sejour_minimum": 2,
+        "sejour_minimum_tarifs": {"Tres_haute_2026": 7},
+        "remises_duree": [{"nuitees": 7, "taux": 0.05}, {"nuitees": 28, "taux": 0.15}],
+        "menage": {"montant": 40, "montant_court": 25, "nuitees_court": 2},
+        "commissions": {"airbnb": 0.036, "booking": 0.164}
+    }
+
+Les règles sont compilées une fois par grille en un PlanTarifaire : pour
+chaque tarif et chaque variante (net ou plateforme), le prix de chacun des
+sept jours de la semaine. Un segment de période se chiffre alors sans
+parcourir ses jours.
+"""
+
+import json
+from collections import namedtuple
+from datetime import date
+from fractions import Fraction
+from core.tableau_tarifs import TableauTarifs, majorer_centimes
+from core.tarifs import centimes
+
+NOM_FICHIER = "regles.json"
+
+JOURS = ("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche")
+
+# Durée minimale de séjour, en nuitées, quand regles.json ne la précise pas
+SEJOUR_MINIMUM = 2
+
+# Forfait de ménage quand regles.json ne le précise pas (mêmes clés que "menage") :
+# montant réduit pour les séjours d'au plus 'nuitees_court' nuitées
+MENAGE = {"montant": 40.0, "montant_court": 25.0, "nuitees_court": 2}
+
+# Chiffrage d'un séjour, en euros : total = nuitees - remise + menage
+Devis = namedtuple("Devis", ["nb_nuitees", "nuitees", "remise", "menage", "total", "moyenne"])
+
+
+class Regles:
+    """
+    Règles de tarification (jours de week-end, prix par jour de la semaine,
+    séjour minimum, remises de durée, ménage, commissions).
+    """
+
+    CLES = (
+        "jours_weekend", "prix_jours", "sejour_minimum", "sejour_minimum_tarifs",
+        "remises_duree", "menage", "commissions",
+    )
+
+    def __init__(self, jours_weekend=("samedi", "dimanche"), prix_jours=None, sejour_minimum: int = SEJOUR_MINIMUM,
+                 sejour_minimum_tarifs=None, remises_duree=None, menage=None, commissions=None):
+        """
+        :raises ValueError: Si une règle est mal formée.
+        """
+        self.jours_weekend = frozenset(_indice_jour(j) for j in jours_weekend)
+        self.prix_jours = {
+            id_tarif: {_indice_jour(j): centimes(float(prix)) for j, prix in jours.items()}
+            for id_tarif, jours in (prix_jours or {}).items()
+        }
+
+        self.sejour_minimum = _entier_positif(sejour_minimum, "sejour_minimum")
+        self.sejour_minimum_tarifs = {
+            id_tarif: _entier_positif(n, f"sejour_minimum_tarifs.{id_tarif}")
+            for id_tarif, n in (sejour_minimum_tarifs or {}).items()
+        }
+
+        # Remises triées par seuil : (nuitées minimum, taux exact)
+        self.remises_duree = sorted(
+            (_entier_positif(r["nuitees"], "remises_duree.nuitees"), _taux(r["taux"], "remises_duree.taux"))
+            for r in (remises_duree or [])
+        )
+
+        menage = {**MENAGE, **(menage or {})}
+        self.frais_menage = float(menage["montant"])
+        self.frais_menage_court = float(menage["montant_court"])
+        self.nuitees_sejour_court = int(menage["nuitees_court"])
+
+        if commissions is None:
+            commissions = TableauTarifs.COMMISSIONS
+        self.commissions = {plateforme: float(_taux(taux, f"commissions.{plateforme}"))
+                            for plateforme, taux in commissions.items()}
+
+    @classmethod
+    def depuis_dict(cls, donnees: dict):
+        """
+        :raises ValueError: Si une clé est inconnue ou une règle mal formée.
+        """
+        if not isinstance(donnees, dict):
+            raise ValueError("Les règles doivent être un objet JSON")
+        inconnues = set(donnees) - set(cls.CLES)
+        if inconnues:
+            raise ValueError(f"Règle(s) inconnue(s) : {', '.join(sorted(inconnues))}")
+        try:
+            return cls(**donnees)
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Règles mal formées : {e}")
+
+    @classmethod
+    def depuis_fichier(cls, fichier: str):
+        """
+        Charge les règles d'un fichier JSON.
+
+        :raises ValueError: Si le fichier n'est pas un JSON de règles valide.
+        """
+        with open(fichier, encoding="utf-8") as f:
+            try:
+                donnees = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{fichier} : JSON invalide ({e})")
+        return cls.depuis_dict(donnees)
+
+    def compiler(self, grille_tarifs):
+        """Retourne le plan d'évaluation de ces règles pour une grille."""
+        return PlanTarifaire(self, grille_tarifs)
+
+
+class PlanTarifaire:
+    """
+    Règles compilées pour une grille de tarifs.
+
+    Pour chaque tarif, prix de chaque jour de la semaine (lundi = 0) en
+    centimes, pour le tarif net (None) et chaque plateforme. Les prix
+    plateforme sont majorés et arrondis à l'euro supérieur, comme dans
+    TableauTarifs.
+    """
+
+    def __init__(self, regles: Regles, grille_tarifs):
+        """
+        :raises ValueError: Si une règle vise un tarif absent de la grille.
+        """
+        self.regles = regles
+        self.commissions = regles.commissions
+
+        for id_tarif in [*regles.prix_jours, *regles.sejour_minimum_tarifs]:
+            if id_tarif not in grille_tarifs.tarifs:
+                raise ValueError(f"Tarif '{id_tarif}' des règles absent de prix.csv")
+
+        self._base = {}
+        for id_tarif, tarif in grille_tarifs.tarifs.items():
+            prix = [
+                tarif.weekend_cents if jour in regles.jours_weekend else tarif.semaine_cents
+                for jour in range(7)
+            ]
+            for jour, montant in regles.prix_jours.get(id_tarif, {}).items():
+                prix[jour] = montant
+            self._base[id_tarif] = tuple(prix)
+
+        self._variantes = {None: self._base}
+        for plateforme, taux in self.commissions.items():
+            self._variantes[plateforme] = {
+                id_tarif: self.majorer(prix, taux) for id_tarif, prix in self._base.items()
+            }
+
+    # ------------------------------------------------------------------
+    # Prix des nuitées
+    # ------------------------------------------------------------------
+    @staticmethod
+    def majorer(prix_jours: tuple, taux: float = None) -> tuple:
+        """Majore (et arrondit à l'euro supérieur) les sept prix d'une semaine."""
+        return tuple(majorer_centimes(prix, taux) for prix in prix_jours)
+
+    def prix_jours(self, id_tarif: str, plateforme: str = None) -> tuple:
+        """
+        Retourne les prix (en centimes) du lundi au dimanche d'un tarif.
+
+        :param plateforme: Variante majorée de la commission d'une plateforme (None = net).
+        :raises ValueError: Si le tarif ou la plateforme est inconnu.
+        """
+        variante = self._variantes.get(plateforme)
+        if variante is None:
+            raise ValueError(f"Plateforme '{plateforme}' inconnue")
+        prix = variante.get(id_tarif)
+        if prix is None:
+            raise ValueError(f"Tarif '{id_tarif}' inexistant")
+        return prix
+
+    @staticmethod
+    def total_semaines(prix_jours: tuple, debut: date, fin: date) -> int:
+        """
+        Total (en centimes) des nuitées de 'debut' à 'fin' incluses pour un
+        même tarif, sans parcourir la plage : semaines complètes + reste.
+        """
+        nb_jours = (fin - debut).days + 1
+        if nb_jours <= 0:
+            return 0
+        semaines, reste = divmod(nb_jours, 7)
+        premier = debut.weekday()
+        return semaines * sum(prix_jours) + sum(prix_jours[(premier + k) % 7] for k in range(reste))
+
+    def total_centimes(self, calendrier, date_debut: date, date_fin: date, plateforme: str = None) -> int:
+        """
+        Total (en centimes) des nuitées de date_debut à date_fin incluses,
+        chiffré segment de période par segment.
+        """
+        total = 0
+        for periode, debut, fin in calendrier.segments(date_debut, date_fin):
+            total += self.total_semaines(self.prix_jours(periode.id_tarif, plateforme), debut, fin)
+        return total
+
+    # ------------------------------------------------------------------
+    # Règles de séjour
+    # ------------------------------------------------------------------
+    def taux_remise(self, nb_nuitees: int) -> Fraction:
+        """Taux de la remise de durée applicable (0 si aucune)."""
+        taux = Fraction(0)
+        for seuil, taux_seuil in self.regles.remises_duree:
+            if nb_nuitees < seuil:
+                break
+            taux = taux_seuil
+        return taux
+
+    def remise_centimes(self, total_centimes: int, nb_nuitees: int) -> int:
+        """Montant de la remise de durée sur un total de nuitées, arrondi au centime le plus proche."""
+        taux = self.taux_remise(nb_nuitees)
+        if not taux:
+            return 0
+        return (2 * total_centimes * taux.numerator + taux.denominator) // (2 * taux.denominator)
+
+    def frais_menage(self, nb_nuitees: int) -> float:
+        """Forfait de ménage applicable à un séjour de 'nb_nuitees' nuits."""
+        regles = self.regles
+        return regles.frais_menage_court if nb_nuitees <= regles.nuitees_sejour_court else regles.frais_menage
+
+    def sejour_minimum(self, calendrier=None, date_debut: date = None, minimum_global: bool = True) -> int:
+        """
+        Durée minimale d'un séjour : le minimum général et, si un calendrier
+        est fourni, celui du tarif de la période d'arrivée.
+
+        :param minimum_global: Tenir compte du minimum général (sinon, 1 nuit).
+        """
+        minimum = self.regles.sejour_minimum if minimum_global else 1
+        if calendrier is not None and self.regles.sejour_minimum_tarifs:
+            id_tarif = calendrier.periode_pour_jour(date_debut).id_tarif
+            minimum = max(minimum, self.regles.sejour_minimum_tarifs.get(id_tarif, 1))
+        return minimum
+
+    def sejours_minimums(self, calendrier, date_debut: date, date_fin: date, minimum_global: bool = True) -> list:
+        """
+        Séjour minimum (voir sejour_minimum) de chaque date d'arrivée de
+        date_debut à date_fin incluses, chiffré segment par segment.
+
+        :raises ValueError: Si la plage contient un jour sans période.
+        """
+        nb_jours = (date_fin - date_debut).days + 1
+        minimum = self.regles.sejour_minimum if minimum_global else 1
+        if not self.regles.sejour_minimum_tarifs:
+            return [minimum] * max(nb_jours, 0)
+        minimums = []
+        for periode, debut, fin in calendrier.segments(date_debut, date_fin):
+            minimum_tarif = max(minimum, self.regles.sejour_minimum_tarifs.get(periode.id_tarif, 1))
+            minimums.extend([minimum_tarif] * ((fin - debut).days + 1))
+        return minimums
+
+    def verifier_sejour(self, calendrier, date_debut: date, date_fin: date, minimum_global: bool = True):
+        """
+        :raises ValueError: Si le séjour (date_fin = dernière nuitée) est trop court.
+        """
+        nb_nuitees = (date_fin - date_debut).days + 1
+        minimum = self.sejour_minimum(calendrier, date_debut, minimum_global)
+        if nb_nuitees < minimum:
+            raise ValueError(f"Séjour trop court ({nb_nuitees} jour(s)). Le minimum est de {minimum} jours.")
+
+    def devis(self, total_centimes: int, nb_nuitees: int, menage: bool = False) -> Devis:
+        """
+        Applique remise de durée et ménage à un total de nuitées.
+
+        :param total_centimes: Total des nuitées, en centimes.
+        """
+        remise = self.remise_centimes(total_centimes, nb_nuitees)
+        nuitees = total_centimes - remise
+        montant_menage = self.frais_menage(nb_nuitees) if menage else 0.0
+        return Devis(
+            nb_nuitees=nb_nuitees,
+            nuitees=total_centimes / 100,
+            remise=remise / 100,
+            menage=montant_menage,
+            total=nuitees / 100 + montant_menage,
+            moyenne=nuitees / 100 / nb_nuitees if nb_nuitees > 0 else 0,
+        )
+
+
+def plan_par_defaut(grille_tarifs, commissions=None) -> PlanTarifaire:
+    """Plan des règles par défaut (comportement historique) pour une grille."""
+    return PlanTarifaire(Regles(commissions=commissions), grille_tarifs)
+
+
+def _indice_jour(jour) -> int:
+    if isinstance(jour, int) and 0 <= jour <= 6:
+        return jour
+    nom = str(jour).strip().lower()
+    if nom not in JOURS:
+        raise ValueError(f"Jour '{jour}' inconnu ({', '.join(JOURS)})")
+    return JOURS.index(nom)
+
+
+def _entier_positif(valeur, nom: str) -> int:
+    if isinstance(valeur, bool) or not isinstance(valeur, int) or valeur < 1:
+        raise ValueError(f"'{nom}' doit être un entier supérieur ou égal à 1")
+    return valeur
+
+
+def _taux(valeur, nom: str) -> Fraction:
+    if isinstance(valeur, bool) or not isinstance(valeur, (int, float)) or not 0 <= valeur < 1:
+        raise ValueError(f"'{nom}' doit être un taux compris entre 0 et 1")
+    return Fraction(str(valeur))
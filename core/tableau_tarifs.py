@@ -1,6 +1,41 @@
 import csv
+import io
+import json
+import zipfile
 from datetime import date, timedelta
 from decimal import Decimal, ROUND_UP
+from functools import lru_cache
+from core.metriques import chronometre
+
+# Majorations mémorisées : quelques prix de grille par commission suffisent,
+# la borne évite que les grilles successives (rechargements) s'accumulent
+TAILLE_CACHE_MAJORATION = 4096
+
+
+@lru_cache(maxsize=TAILLE_CACHE_MAJORATION)
+def majorer_prix(prix: float, taux: float = None) -> int:
+    """
+    Majore un prix net pour conserver le NET après une commission de 'taux'
+    et arrondit TOUJOURS à l'euro supérieur. Sans taux, seul l'arrondi
+    est appliqué.
+    """
+    if taux is not None:
+        brut = Decimal(str(prix)) / (Decimal("1") - Decimal(str(taux)))
+        return int(brut.quantize(Decimal("1"), rounding=ROUND_UP))
+
+    return int(Decimal(str(prix)).quantize(Decimal("1"), rounding=ROUND_UP))
+
+
+@lru_cache(maxsize=TAILLE_CACHE_MAJORATION)
+def majorer_centimes(prix_centimes: int, taux: float = None) -> int:
+    """
+    Équivalent de majorer_prix pour un prix en centimes entiers :
+    retourne le prix majoré, arrondi à l'euro supérieur, en centimes.
+    """
+    prix = Decimal(prix_centimes) / 100
+    if taux is not None:
+        prix = prix / (Decimal("1") - Decimal(str(taux)))
+    return int(prix.quantize(Decimal("1"), rounding=ROUND_UP)) * 100
 
 
 class TableauTarifs:
@@ -23,6 +58,9 @@ class TableauTarifs:
         """
         self.calculateur = calculateur
         self.plateforme = plateforme.lower() if plateforme else None
+        # Commissions des règles de tarification du calculateur
+        self.commissions = calculateur.plan.commissions
+        self._prix_jours = {}
 
     # ------------------------------------------------------------------
     # Utilitaires
@@ -32,55 +70,85 @@ class TableauTarifs:
         Ajuste le prix pour conserver le NET après commission
         et arrondit TOUJOURS à l'euro supérieur.
         """
-        if self.plateforme in self.COMMISSIONS:
-            taux = Decimal(str(self.COMMISSIONS[self.plateforme]))
-            brut = Decimal(str(prix)) / (Decimal("1") - taux)
-            return int(brut.quantize(Decimal("1"), rounding=ROUND_UP))
+        return majorer_prix(prix, self.commissions.get(self.plateforme))
+
+
+    def _prix_unitaires(self, id_tarif: str) -> tuple:
+        """
+        Retourne les prix majorés d'un tarif, en centimes : (semaine, week-end)
+        pour les colonnes unitaires, puis les prix du lundi au dimanche.
+        Une plateforme inconnue n'applique que l'arrondi, comme ajuster_prix.
+        """
+        prix = self._prix_jours.get(id_tarif)
+        if prix is None:
+            tarif = self.calculateur.grille_tarifs.obtenir(id_tarif)
+            taux = self.commissions.get(self.plateforme)
+            prix = self._prix_jours[id_tarif] = (
+                majorer_centimes(tarif.semaine_cents, taux),
+                majorer_centimes(tarif.weekend_cents, taux),
+                self.calculateur.plan.majorer(self.calculateur.plan.prix_jours(id_tarif), taux),
+            )
+        return prix
 
-        return int(Decimal(str(prix)).quantize(Decimal("1"), rounding=ROUND_UP))
+    def _ligne(self, debut: date, fin: date, id_tarif: str) -> dict:
+        return {
+            "debut": debut.strftime("%d-%m-%Y"),
+            "fin": fin.strftime("%d-%m-%Y"),
+            "periode": id_tarif,
+            **self._prix_ligne(debut, fin, id_tarif),
+        }
 
+    def _prix_ligne(self, debut: date, fin: date, id_tarif: str) -> dict:
+        semaine, weekend, prix_jours = self._prix_unitaires(id_tarif)
+        return {
+            "prix_semaine_unit": f"{semaine / 100:.2f}",
+            "prix_weekend_unit": f"{weekend / 100:.2f}",
+            "prix_semaine_7j": self._prix_7_jours(debut, fin, prix_jours),
+        }
 
-    def _prix_7_jours(self, debut: date, fin: date, tarif) -> str:
+    def _total_7_jours(self, debut: date, fin: date, prix_jours):
         """
-        Calcule le prix pour 7 jours consécutifs à partir de 'debut'.
-        Retourne une chaîne formatée sans le symbole € pour le CSV.
+        Calcule le prix (en centimes) pour 7 jours consécutifs à partir de
+        'debut', remise de durée des règles déduite, ou None si la période
+        est trop courte.
+
+        :param prix_jours: Prix majorés du lundi au dimanche, en centimes.
         """
         duree = (fin - debut).days + 1
         if duree < 7:
-            return "trop court"
+            return None
 
-        total = 0.0
-        for i in range(7):
-            jour = debut + timedelta(days=i)
-            prix_net = tarif.prix_pour_jour(jour)
-            total += self.ajuster_prix(prix_net)
+        plan = self.calculateur.plan
+        total = plan.total_semaines(prix_jours, debut, debut + timedelta(days=6))
+        return total - plan.remise_centimes(total, 7)
 
-        return f"{total:.2f}" # On retire le € ici
+    def _prix_7_jours(self, debut: date, fin: date, prix_jours) -> str:
+        """
+        Prix pour 7 jours consécutifs à partir de 'debut'.
+        Retourne une chaîne formatée sans le symbole € pour le CSV.
+        """
+        total = self._total_7_jours(debut, fin, prix_jours)
+        if total is None:
+            return "trop court"
+
+        return f"{total / 100:.2f}" # On retire le € ici
 
     # ------------------------------------------------------------------
     # TABLEAU COMPLET (toutes les périodes)
     # ------------------------------------------------------------------
-    def generer_tableau(self):
+    def iterer_tableau(self):
         """
-        Génère le tableau pour toutes les périodes connues.
+        Produit une à une les lignes du tableau de toutes les périodes connues,
+        sans construire la liste complète.
         """
-        tableau = []
-
         for periode in self.calculateur.calendrier.periodes:
-            tarif = self.calculateur.grille_tarifs.obtenir(periode.id_tarif)
-
-            tableau.append({
-                "debut": periode.debut.strftime("%d-%m-%Y"),
-                "fin": periode.fin.strftime("%d-%m-%Y"),
-                "periode": periode.id_tarif,
-                "prix_semaine_unit": f"{self.ajuster_prix(tarif.prix_semaine):.2f}",
-                "prix_weekend_unit": f"{self.ajuster_prix(tarif.prix_weekend):.2f}",
-                "prix_semaine_7j": self._prix_7_jours(
-                    periode.debut, periode.fin, tarif
-                ),
-            })
+            yield self._ligne(periode.debut, periode.fin, periode.id_tarif)
 
-        return tableau
+    def generer_tableau(self):
+        """
+        Génère le tableau pour toutes les périodes connues.
+        """
+        return list(self.iterer_tableau())
 
     def afficher(self):
         """
@@ -93,40 +161,58 @@ class TableauTarifs:
         """
         Exporte le tableau complet en CSV.
         """
-        self._exporter_csv(chemin_fichier, self.generer_tableau())
+        self._exporter_csv(chemin_fichier, self.iterer_tableau())
 
     # ------------------------------------------------------------------
     # TABLEAU LIMITÉ À UNE PLAGE DE DATES
     # ------------------------------------------------------------------
-    def generer_tableau_plage(self, date_debut: date, date_fin: date):
+    def iterer_tableau_plage(self, date_debut: date, date_fin: date):
         """
-        Génère le tableau limité à une plage de dates.
+        Produit une à une les lignes du tableau limité à une plage de dates.
         Les périodes sont découpées si nécessaire.
-        """
-        tableau = []
-        jour = date_debut
 
-        while jour <= date_fin:
-            periode = self.calculateur.calendrier.periode_pour_jour(jour)
-            tarif = self.calculateur.grille_tarifs.obtenir(periode.id_tarif)
+        :raises ValueError: Au moment d'atteindre un jour sans période.
+        """
+        segments = self.calculateur.calendrier.segments(date_debut, date_fin)
 
-            debut_ligne = jour
-            fin_ligne = min(periode.fin, date_fin)
+        for periode, debut_ligne, fin_ligne in segments:
+            yield self._ligne(debut_ligne, fin_ligne, periode.id_tarif)
 
-            tableau.append({
-                "debut": debut_ligne.strftime("%d-%m-%Y"),
-                "fin": fin_ligne.strftime("%d-%m-%Y"),
-                "periode": periode.id_tarif,
-                "prix_semaine_unit": f"{self.ajuster_prix(tarif.prix_semaine):.2f}",
-                "prix_weekend_unit": f"{self.ajuster_prix(tarif.prix_weekend):.2f}",
-                "prix_semaine_7j": self._prix_7_jours(
-                    debut_ligne, fin_ligne, tarif
-                ),
-            })
+    @chronometre("generer_tableau_plage")
+    def generer_tableau_plage(self, date_debut: date, date_fin: date):
+        """
+        Génère le tableau limité à une plage de dates.
+        Les périodes sont découpées si nécessaire.
+        """
+        return list(self.iterer_tableau_plage(date_debut, date_fin))
 
-            jour = fin_ligne + timedelta(days=1)
+    @chronometre("generer_tableau_plage")
+    def colonnes_plage(self, date_debut: date, date_fin: date) -> dict:
+        """
+        Génère le tableau limité à une plage au format colonnes : une liste par
+        colonne, montants en euros non formatés (None si la période est trop
+        courte pour un prix sur 7 jours). Les dates se déduisent de
+        'date_debut' et des durées successives.
 
-        return tableau
+        :raises ValueError: Si la plage contient un jour sans période.
+        """
+        colonnes = {
+            "date_debut": date_debut.isoformat(),
+            "nb_jours": [],
+            "periode": [],
+            "prix_semaine_unit": [],
+            "prix_weekend_unit": [],
+            "prix_semaine_7j": [],
+        }
+        for periode, debut, fin in self.calculateur.calendrier.segments(date_debut, date_fin):
+            semaine, weekend, prix_jours = self._prix_unitaires(periode.id_tarif)
+            total = self._total_7_jours(debut, fin, prix_jours)
+            colonnes["nb_jours"].append((fin - debut).days + 1)
+            colonnes["periode"].append(periode.id_tarif)
+            colonnes["prix_semaine_unit"].append(semaine / 100)
+            colonnes["prix_weekend_unit"].append(weekend / 100)
+            colonnes["prix_semaine_7j"].append(None if total is None else total / 100)
+        return colonnes
 
     def afficher_plage(self, date_debut: date, date_fin: date):
         """
@@ -144,15 +230,23 @@ class TableauTarifs:
         """
         self._exporter_csv(
             chemin_fichier,
-            self.generer_tableau_plage(date_debut, date_fin)
+            self.iterer_tableau_plage(date_debut, date_fin)
         )
 
+    @chronometre("export_csv")
+    def csv_plage(self, date_debut: date, date_fin: date) -> bytes:
+        """
+        Retourne en mémoire le CSV du tableau limité à une plage,
+        identique au fichier produit par exporter_csv_plage.
+        """
+        return b"".join(self.blocs_csv(self.iterer_tableau_plage(date_debut, date_fin)))
+
     # ------------------------------------------------------------------
     # AFFICHAGE & EXPORT COMMUNS
     # ------------------------------------------------------------------
     def _afficher_lignes(self, lignes):
         if self.plateforme:
-            taux = self.COMMISSIONS.get(self.plateforme, 0)
+            taux = self.commissions.get(self.plateforme, 0)
             print(f"MODE : Commission {self.plateforme.capitalize()} incluse ({taux*100:.1f}%)")
         else:
             print("MODE : Tarifs nets (aucune commission)")
@@ -174,20 +268,176 @@ class TableauTarifs:
 
         print("\nWARNING : La colonne 'Prix à la semaine' est donnée à titre indicatif.")
 
-    def _exporter_csv(self, chemin_fichier: str, lignes):
-        champs = [
-            "debut",
-            "fin",
-            "periode",
-            "prix_semaine_unit",
-            "prix_weekend_unit",
-            "prix_semaine_7j",
-        ]
+    CHAMPS_CSV = [
+        "debut",
+        "fin",
+        "periode",
+        "prix_semaine_unit",
+        "prix_weekend_unit",
+        "prix_semaine_7j",
+    ]
 
+    def _ecrire_csv(self, flux, lignes):
+        writer = csv.DictWriter(flux, fieldnames=self.CHAMPS_CSV, delimiter=";")
+        writer.writeheader()
+        for ligne in lignes:
+            writer.writerow(ligne)
+
+    @classmethod
+    def blocs_csv(cls, lignes, taille_bloc: int = 64 * 1024, champs=None):
+        """
+        Encode des lignes en CSV (BOM UTF-8, délimiteur ';') par blocs d'octets,
+        au fur et à mesure qu'elles sont produites.
+
+        :param lignes: Itérable de lignes (par exemple iterer_tableau_plage).
+        :param taille_bloc: Taille approximative de chaque bloc, en octets.
+        :param champs: Colonnes du CSV (CHAMPS_CSV par défaut).
+        """
+        tampon = io.StringIO(newline="")
+        writer = csv.DictWriter(tampon, fieldnames=champs or cls.CHAMPS_CSV, delimiter=";")
+        writer.writeheader()
+        encodage = "utf-8-sig"  # BOM sur le premier bloc seulement
+
+        for ligne in lignes:
+            writer.writerow(ligne)
+            if tampon.tell() >= taille_bloc:
+                yield tampon.getvalue().encode(encodage)
+                encodage = "utf-8"
+                tampon.seek(0)
+                tampon.truncate()
+
+        if tampon.tell():
+            yield tampon.getvalue().encode(encodage)
+
+    @staticmethod
+    def nom_fichier(plateforme: str = None) -> str:
+        """Nom du fichier CSV exporté pour une plateforme (None = tarifs nets)."""
+        return f"tableau_tarifs_{plateforme}.csv" if plateforme else "tableau_tarifs.csv"
+
+    @staticmethod
+    def blocs_ndjson(lignes):
+        """
+        Encode des lignes en NDJSON : un objet JSON par ligne, un bloc par ligne.
+        """
+        for ligne in lignes:
+            yield (json.dumps(ligne, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    @chronometre("export_csv")
+    def _exporter_csv(self, chemin_fichier: str, lignes):
         # On utilise 'utf-8-sig' pour ajouter un BOM (Byte Order Mark)
         # Cela permet à LibreOffice/Excel de reconnaître l'UTF-8 immédiatement.
         with open(chemin_fichier, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=champs, delimiter=";")
-            writer.writeheader()
-            for ligne in lignes:
-                writer.writerow(ligne)
\ No newline at end of file
+            self._ecrire_csv(f, lignes)
+
+
+class TableauPlateformes:
+    """
+    Tableaux de toutes les variantes (tarifs nets et chaque plateforme)
+    produits en un seul parcours des segments du calendrier : la période de
+    chaque segment n'est cherchée qu'une fois pour toutes les colonnes.
+    """
+
+    def __init__(self, calculateur, plateformes=None):
+        """
+        :param calculateur: instance de CalculateurLocation
+        :param plateformes: Variantes à produire, None désignant les tarifs nets
+                            (par défaut : nets puis chaque plateforme des règles).
+        """
+        if plateformes is None:
+            plateformes = [None, *calculateur.plan.commissions]
+        self.calculateur = calculateur
+        self._tableaux = {}
+        for plateforme in plateformes:
+            tableau = TableauTarifs(calculateur, plateforme=plateforme)
+            self._tableaux[tableau.plateforme] = tableau
+
+    @property
+    def plateformes(self) -> list:
+        return list(self._tableaux)
+
+    def iterer_plage(self, date_debut: date, date_fin: date):
+        """
+        Produit, pour chaque segment de la plage, un dict {plateforme: ligne},
+        chaque ligne étant celle de TableauTarifs.iterer_tableau_plage.
+
+        :raises ValueError: Au moment d'atteindre un jour sans période.
+        """
+        for periode, debut, fin in self.calculateur.calendrier.segments(date_debut, date_fin):
+            communs = {
+                "debut": debut.strftime("%d-%m-%Y"),
+                "fin": fin.strftime("%d-%m-%Y"),
+                "periode": periode.id_tarif,
+            }
+            yield {
+                plateforme: {**communs, **tableau._prix_ligne(debut, fin, periode.id_tarif)}
+                for plateforme, tableau in self._tableaux.items()
+            }
+
+    @chronometre("generer_tableau_plage")
+    def generer_plage(self, date_debut: date, date_fin: date) -> dict:
+        """
+        Génère les tableaux limités à une plage : {plateforme: liste de lignes}.
+        """
+        tableaux = {plateforme: [] for plateforme in self._tableaux}
+        for lignes in self.iterer_plage(date_debut, date_fin):
+            for plateforme, ligne in lignes.items():
+                tableaux[plateforme].append(ligne)
+        return tableaux
+
+    # ------------------------------------------------------------------
+    # EXPORTS
+    # ------------------------------------------------------------------
+    @staticmethod
+    def champs_larges(plateformes) -> list:
+        """
+        Colonnes du CSV large : début, fin et période, puis les colonnes de
+        prix de chaque plateforme suffixées de son nom (sans suffixe pour le net).
+        """
+        champs = TableauTarifs.CHAMPS_CSV[:3]
+        for plateforme in plateformes:
+            suffixe = f"_{plateforme}" if plateforme else ""
+            champs += [f"{champ}{suffixe}" for champ in TableauTarifs.CHAMPS_CSV[3:]]
+        return champs
+
+    @staticmethod
+    def ligne_large(lignes: dict) -> dict:
+        """Fusionne les lignes {plateforme: ligne} d'un segment en une ligne du CSV large."""
+        large = {}
+        for plateforme, ligne in lignes.items():
+            suffixe = f"_{plateforme}" if plateforme else ""
+            large.update({champ: ligne[champ] for champ in TableauTarifs.CHAMPS_CSV[:3]})
+            large.update({f"{champ}{suffixe}": ligne[champ] for champ in TableauTarifs.CHAMPS_CSV[3:]})
+        return large
+
+    @chronometre("export_csv")
+    def csv_large(self, date_debut: date, date_fin: date) -> bytes:
+        """
+        Retourne en mémoire le CSV large de la plage : une ligne par segment,
+        les prix de toutes les plateformes côte à côte.
+        """
+        lignes = (self.ligne_large(l) for l in self.iterer_plage(date_debut, date_fin))
+        return b"".join(TableauTarifs.blocs_csv(lignes, champs=self.champs_larges(self.plateformes)))
+
+    @chronometre("export_csv")
+    def zip_plage(self, date_debut: date, date_fin: date) -> bytes:
+        """
+        Retourne en mémoire une archive zip contenant un CSV par plateforme,
+        chacun identique à celui de TableauTarifs.csv_plage.
+        """
+        return archive_tableaux({"": self.generer_plage(date_debut, date_fin)})
+
+
+def archive_tableaux(tableaux: dict) -> bytes:
+    """
+    Construit une archive zip de CSV de tableaux.
+
+    :param tableaux: {dossier: {plateforme: liste de lignes}} ; un dossier vide
+                     place les fichiers à la racine de l'archive.
+    """
+    tampon = io.BytesIO()
+    with zipfile.ZipFile(tampon, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for dossier, lignes_plateformes in tableaux.items():
+            for plateforme, lignes in lignes_plateformes.items():
+                nom = TableauTarifs.nom_fichier(plateforme)
+                archive.writestr(f"{dossier}/{nom}" if dossier else nom, b"".join(TableauTarifs.blocs_csv(lignes)))
+    return tampon.getvalue()
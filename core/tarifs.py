@@ -1,19 +1,95 @@
+import threading
+import weakref
 from datetime import date
+from decimal import Decimal, ROUND_UP
+
+# Tarifs partagés entre grilles (plusieurs propriétés aux mêmes prix)
+_TARIFS_PARTAGES = weakref.WeakValueDictionary()
+
+# Table d'internement des identifiants de tarif : id <-> petit entier
+_IDS_TARIFS = []
+_INDICES_TARIFS = {}
+_VERROU_IDS = threading.Lock()
+
+
+def indice_tarif(id_tarif: str) -> int:
+    """Retourne le petit entier associé à un identifiant de tarif (créé au besoin)."""
+    indice = _INDICES_TARIFS.get(id_tarif)
+    if indice is None:
+        with _VERROU_IDS:
+            indice = _INDICES_TARIFS.get(id_tarif)
+            if indice is None:
+                indice = len(_IDS_TARIFS)
+                _IDS_TARIFS.append(id_tarif)
+                _INDICES_TARIFS[id_tarif] = indice
+    return indice
+
+
+def id_tarif_pour_indice(indice: int) -> str:
+    """Retourne l'identifiant de tarif associé à un indice de indice_tarif."""
+    return _IDS_TARIFS[indice]
+
+
+def centimes(prix: float) -> int:
+    """
+    Convertit un prix en euros en nombre entier de centimes.
+
+    Comme majorer_prix, le prix passe par Decimal(str(prix)) : 2.675 vaut
+    bien 267,5 centimes, et une fraction de centime est arrondie au centime
+    supérieur (ROUND_UP).
+    """
+    return int((Decimal(str(prix)) * 100).quantize(Decimal("1"), rounding=ROUND_UP))
+
 
 class Tarif:
     """
     Représente un tarif avec un prix semaine et un prix week-end.
+
+    Les prix sont conservés en centimes entiers (semaine_cents, weekend_cents) ;
+    prix_semaine et prix_weekend en sont une vue en euros.
     """
 
+    __slots__ = ("semaine_cents", "weekend_cents", "__weakref__")
+
     def __init__(self, prix_semaine: float, prix_weekend: float):
-        self.prix_semaine = prix_semaine
-        self.prix_weekend = prix_weekend
+        self.semaine_cents = centimes(prix_semaine)
+        self.weekend_cents = centimes(prix_weekend)
+
+    @property
+    def prix_semaine(self) -> float:
+        return self.semaine_cents / 100
+
+    @property
+    def prix_weekend(self) -> float:
+        return self.weekend_cents / 100
+
+    def centimes_pour_jour(self, jour: date) -> int:
+        """
+        Retourne le prix applicable pour une date donnée, en centimes.
+        Samedi (5) et dimanche (6) = week-end.
+        """
+        if jour.weekday() >= 5:
+            return self.weekend_cents
+        return self.semaine_cents
 
     def prix_pour_jour(self, jour: date) -> float:
         """
         Retourne le prix applicable pour une date donnée.
         Samedi (5) et dimanche (6) = week-end.
         """
-        if jour.weekday() >= 5:
-            return self.prix_weekend
-        return self.prix_semaine
\ No newline at end of file
+        return self.centimes_pour_jour(jour) / 100
+
+
+def tarif_partage(prix_semaine: float, prix_weekend: float) -> Tarif:
+    """
+    Retourne l'unique instance de Tarif pour ces prix (internement).
+
+    Les grilles de plusieurs propriétés partagent ainsi les mêmes objets ;
+    un Tarif ne doit donc pas être modifié après sa création.
+    """
+    cle = (centimes(prix_semaine), centimes(prix_weekend))
+    tarif = _TARIFS_PARTAGES.get(cle)
+    if tarif is None:
+        tarif = Tarif(prix_semaine, prix_weekend)
+        _TARIFS_PARTAGES[cle] = tarif
+    return tarif
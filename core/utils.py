@@ -1,4 +1,17 @@
-from datetime import datetime, date
+import re
+from datetime import date
+
+# Jour, mois et année (JJ-MM-AAAA) séparés par '-', '/' ou '.', le même séparateur deux fois
+_MOTIF_DATE_FR = re.compile(r"(\d{1,2})([-/.])(\d{1,2})\2(\d{4})")
+# Ordre année, mois, jour (AAAA-MM-JJ), rencontré dans les exports de channel managers
+_MOTIF_DATE_ISO = re.compile(r"(\d{4})([-/.])(\d{1,2})\2(\d{1,2})")
+
+
+def _erreur_date_fr(chaine_date: str) -> ValueError:
+    return ValueError(
+        f"Format de date invalide : '{chaine_date}'. "
+        "Utilisez JJ-MM-AAAA, JJ/MM/AAAA ou JJ.MM.AAAA"
+    )
 
 
 def date_fr(chaine_date: str) -> date:
@@ -6,28 +19,84 @@ def date_fr(chaine_date: str) -> date:
     Convertit une chaîne de caractères en objet date.
     Accepte plusieurs séparateurs : '-', '/', '.'
     """
-    formats_possibles = [
-        "%d-%m-%Y",
-        "%d/%m/%Y",
-        "%d.%m.%Y",
-    ]
+    correspondance = _MOTIF_DATE_FR.fullmatch(chaine_date.strip())
+    if correspondance is None:
+        raise _erreur_date_fr(chaine_date)
+
+    jour, _, mois, annee = correspondance.groups()
+    try:
+        return date(int(annee), int(mois), int(jour))
+    except ValueError:
+        raise _erreur_date_fr(chaine_date) from None
+
+
+def lire_date(valeur) -> date:
+    """
+    Convertit une date reçue par l'API, un lot ou le journal des
+    modifications : AAAA-MM-JJ (ISO), sinon l'un des formats de date_fr.
+
+    :raises ValueError: Si la valeur n'est dans aucun de ces formats.
+    """
+    valeur = str(valeur).strip()
+    try:
+        return date.fromisoformat(valeur)
+    except ValueError:
+        return date_fr(valeur)
+
+
+class LecteurDates:
+    """
+    Convertisseur de dates pour la lecture en masse d'un fichier.
+
+    L'ordre des champs (JJ-MM-AAAA ou AAAA-MM-JJ, séparateur '-', '/' ou '.')
+    est détecté sur la première date puis imposé au reste du fichier. Chaque
+    chaîne n'est analysée qu'une fois : les suivantes sont lues dans un cache.
+    """
+
+    def __init__(self):
+        self._motif = None
+        self._ordinaux = {}
+
+    def ordinal(self, chaine_date: str) -> int:
+        """
+        Retourne l'ordinal (date.toordinal) de la date.
+
+        :raises ValueError: Si la chaîne ne suit pas le format du fichier.
+        """
+        ordinal = self._ordinaux.get(chaine_date)
+        if ordinal is None:
+            ordinal = self._ordinaux[chaine_date] = self._convertir(chaine_date).toordinal()
+        return ordinal
 
-    nettoyee = chaine_date.strip()
+    def __call__(self, chaine_date: str) -> date:
+        return date.fromordinal(self.ordinal(chaine_date))
 
-    for fmt in formats_possibles:
+    def _convertir(self, chaine_date: str) -> date:
+        nettoyee = chaine_date.strip()
+        if self._motif is None:
+            self._motif = _MOTIF_DATE_ISO if _MOTIF_DATE_ISO.fullmatch(nettoyee) else _MOTIF_DATE_FR
+
+        correspondance = self._motif.fullmatch(nettoyee)
         try:
-            return datetime.strptime(nettoyee, fmt).date()
+            if correspondance is None:
+                raise ValueError
+            if self._motif is _MOTIF_DATE_ISO:
+                annee, _, mois, jour = correspondance.groups()
+            else:
+                jour, _, mois, annee = correspondance.groups()
+            return date(int(annee), int(mois), int(jour))
         except ValueError:
-            continue
-
-    raise ValueError(
-        f"Format de date invalide : '{chaine_date}'. "
-        "Utilisez JJ-MM-AAAA, JJ/MM/AAAA ou JJ.MM.AAAA"
-    )
+            if self._motif is _MOTIF_DATE_ISO:
+                raise ValueError(
+                    f"Format de date invalide : '{chaine_date}'. "
+                    "Le fichier utilise le format AAAA-MM-JJ"
+                ) from None
+            raise _erreur_date_fr(chaine_date) from None
 
 
 def formater_date_jour(d: date) -> str:
     """Retourne la date au format 'lundi 01-01-2026'."""
     jours = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
     nom_jour = jours[d.weekday()]
-    return f"{nom_jour:<9} {d.strftime('%d-%m-%Y')}"
\ No newline at end of file
+    return f"{nom_jour:<9} {d.strftime('%d-%m-%Y')}"
+
@@ -1,10 +1,16 @@
 import argparse
 import sys
 
-from services.calcul import calcul_tableau, calcul_detail, obtenir_calculateur, RESULTS_DIR
+from services.calcul import (
+    calcul_detail, calcul_recherche, compiler_donnees, devis_toutes_proprietes,
+    exporter_tableaux, lister_proprietes, obtenir_calculateur, RESULTS_DIR,
+)
 from datetime import date, timedelta
 from pathlib import Path
+from core import metriques
 from core.tableau_tarifs import TableauTarifs # Pour l'affichage console et export
+from services.profilage import profiler_cli
+from services.traitement_lot import traiter_lot
 from core.utils import date_fr, formater_date_jour
 
 # Détermination du dossier de base (script Python ou .exe PyInstaller)
@@ -13,8 +19,6 @@ if getattr(sys, "frozen", False):
 else:
     BASE_DIR = Path(__file__).resolve().parent
 
-JOURS_MINI = 2
-
 
 def demander_date(message: str) -> date:
     """
@@ -53,24 +57,109 @@ def main():
                         help="Afficher le tableau résumé par période pour la plage de dates")
 
     # Argument pour la commission par plateforme
-    parser.add_argument("-c", "--commission", choices=["airbnb", "booking", "abritel", "gites"],
-                        help="Calculer le tableau avec la commission d'une plateforme")
+    parser.add_argument("-c", "--commission", type=str.lower,
+                        help="Calculer le tableau avec la commission d'une plateforme "
+                             "(airbnb, booking, abritel, gites ou celles de regles.json)")
+    parser.add_argument("--export", choices=["zip", "large"],
+                        help="Exporter le tableau de toutes les plateformes en un zip de CSV "
+                             "ou en un CSV large (avec --toutes-proprietes : zip par propriété)")
 
     # Argument pour les frais de ménage
     parser.add_argument("-m", "--menage", action="store_true",
                         help="Ajouter les frais de ménage (40 €) au total")
 
+    # Propriété (gîte) à utiliser : sous-dossier de data/proprietes
+    parser.add_argument("-p", "--propriete",
+                        help="Identifiant de la propriété (par défaut : fichiers de data/)")
+    parser.add_argument("--toutes-proprietes", action="store_true",
+                        help="Calculer le séjour pour toutes les propriétés")
+    parser.add_argument("--processus", type=int,
+                        help="Nombre de processus pour --toutes-proprietes, --batch et --export")
+
+    # Recherche des fenêtres de séjour les moins chères dans la plage de dates
+    parser.add_argument("-r", "--recherche", action="store_true",
+                        help="Rechercher les séjours les moins chers dans la plage de dates")
+    parser.add_argument("--nuits", type=int, default=7,
+                        help="Durée des séjours recherchés, en nuits (défaut : 7)")
+    parser.add_argument("--nuits-max", type=int,
+                        help="Durée maximale des séjours recherchés (défaut : --nuits)")
+    parser.add_argument("-k", type=int, default=5,
+                        help="Nombre de séjours à afficher (défaut : 5)")
+    parser.add_argument("--plus-chers", action="store_true",
+                        help="Rechercher les séjours les plus chers")
+
     # On garde --airbnb pour la compatibilité ou on le retire, ici je le laisse comme alias
     parser.add_argument("--airbnb", action="store_true",
                         help="Ancien switch pour Airbnb (équivalent à -c airbnb)")
 
+    # Mode lot : séjours lus depuis un fichier ou l'entrée standard
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FICHIER",
+                        help="Calculer les séjours d'un fichier CSV ou JSONL ('-' ou absent : entrée standard)")
+    parser.add_argument("--format-sortie", choices=["ndjson", "csv"], default="ndjson",
+                        help="Format des résultats du mode --batch (défaut : ndjson)")
+
+    # Précompilation des CSV au format binaire (démarrage plus rapide)
+    parser.add_argument("--compiler", action="store_true",
+                        help="Valider prix.csv et periode.csv et écrire leur version binaire")
+
+    # Mesure des étapes (chargement, calcul, export) affichée en fin d'exécution
+    parser.add_argument("--stats", action="store_true",
+                        help="Afficher la durée des étapes et les compteurs en fin d'exécution")
+
+    # Profil cProfile de toute l'exécution, conservé dans results/profils
+    parser.add_argument("--profile", action="store_true",
+                        help="Profiler l'exécution (cProfile) et enregistrer le profil dans results/profils")
+
     args = parser.parse_args()
 
+    if args.stats:
+        metriques.activer()
+    try:
+        if args.profile:
+            profiler_cli(lambda: executer(args))
+        else:
+            executer(args)
+    finally:
+        if args.stats:
+            print("\nStatistiques :", file=sys.stderr)
+            print(metriques.resume(), file=sys.stderr)
+
+
+def executer(args):
+    """
+    Exécute le mode demandé par les arguments de la ligne de commande.
+    """
+    if args.compiler:
+        chemin = compiler_donnees(args.propriete)
+        print(f"Données compilées dans '{chemin}'")
+        return
+
+    if args.batch:
+        if args.batch == "-":
+            nb_erreurs = traiter_lot(sys.stdin, sys.stdout, args.format_sortie, args.propriete,
+                                     args.processus, minimum_global=True)
+        else:
+            with open(args.batch, newline="", encoding="utf-8-sig") as entree:
+                nb_erreurs = traiter_lot(entree, sys.stdout, args.format_sortie, args.propriete,
+                                         args.processus, minimum_global=True)
+        if nb_erreurs:
+            print(f"{nb_erreurs} séjour(s) en erreur", file=sys.stderr)
+            sys.exit(1)
+        return
+
     # Unification de la plateforme et activation automatique du mode tableau
     plateforme = args.commission
-    if plateforme:
+    if plateforme and not (args.recherche or args.toutes_proprietes):
+        args.tableau = True
+    if args.export:
         args.tableau = True
 
+    # Séjour minimum général des règles de tarification (regles.json)
+    calculateur = obtenir_calculateur(args.propriete)
+    jours_mini = calculateur.plan.regles.sejour_minimum
+    if plateforme and plateforme not in calculateur.plan.commissions and not args.toutes_proprietes:
+        raise ValueError(f"Plateforme '{plateforme}' inconnue ({', '.join(calculateur.plan.commissions)})")
+
     # --- Gestion des dates ---
     date_debut = None
     date_fin = None
@@ -84,8 +173,8 @@ def main():
 
     # 2. Date de fin (calculée ou saisie)
     if args.nb_jours:
-        if args.nb_jours < JOURS_MINI:
-            raise ValueError(f"La durée minimum de séjour est de {JOURS_MINI} jours.")
+        if args.nb_jours < jours_mini:
+            raise ValueError(f"La durée minimum de séjour est de {jours_mini} jours.")
         # Si on a un nombre de jours, la date de fin est début + (N-1) jours
         # (Ex: début le 1er, 3 jours -> 1, 2, 3. Fin le 3)
         date_fin = date_debut + timedelta(days=args.nb_jours - 1)
@@ -98,8 +187,8 @@ def main():
             while True:
                 try:
                     n = int(input("Nombre de jours : "))
-                    if n < JOURS_MINI:
-                        print(f"Erreur : Le séjour doit être de {JOURS_MINI} jours minimum.")
+                    if n < jours_mini:
+                        print(f"Erreur : Le séjour doit être de {jours_mini} jours minimum.")
                         continue
                     date_fin = date_debut + timedelta(days=n - 1)
                     break
@@ -107,22 +196,47 @@ def main():
                     print("Veuillez saisir un nombre entier.")
         else:
             while True:
-                date_fin = demander_date(f"Date de fin (séjour mini {JOURS_MINI} jours) : ")
-                if (date_fin - date_debut).days + 1 < JOURS_MINI:
+                date_fin = demander_date(f"Date de fin (séjour mini {jours_mini} jours) : ")
+                if (date_fin - date_debut).days + 1 < jours_mini:
                     print(
-                        f"Erreur : La date de fin doit être au moins le {(date_debut + timedelta(days=1)).strftime('%d/%m/%Y')}")
+                        f"Erreur : La date de fin doit être au moins le {(date_debut + timedelta(days=jours_mini - 1)).strftime('%d/%m/%Y')}")
                 else:
                     break
 
     # Validation métier finale
     nb_jours = (date_fin - date_debut).days + 1
-    if nb_jours < JOURS_MINI:
-        raise ValueError(f"Séjour trop court ({nb_jours} jour(s)). Le minimum est de {JOURS_MINI} jours.")
+    if nb_jours < jours_mini:
+        raise ValueError(f"Séjour trop court ({nb_jours} jour(s)). Le minimum est de {jours_mini} jours.")
 
     # --- Remplacement de l'initialisation par l'appel aux services ---
+    # ---------- Mode recherche ----------
+    if args.recherche:
+        fenetres = calcul_recherche(
+            date_debut, date_fin, args.nuits, args.nuits_max, plateforme,
+            k=args.k, moins_chers=not args.plus_chers, propriete=args.propriete,
+        )
+        sens = "plus chers" if args.plus_chers else "moins chers"
+        print(f"\nSéjours les {sens} entre le {date_debut.strftime('%d-%m-%Y')} "
+              f"et le {date_fin.strftime('%d-%m-%Y')} :")
+        for f in fenetres:
+            print(f"{formater_date_jour(f.debut)} → {formater_date_jour(f.derniere_nuitee)} "
+                  f"({f.nb_nuitees} nuits) : {f.total:>8.2f} € "
+                  f"(moy. {f.moyenne:>6.2f} €/nuit)")
+        return
+
     # ---------- Mode tableau ----------
+    if args.tableau and args.export:
+        # Toutes les plateformes en un seul parcours, plage découpée sur --processus
+        proprietes = lister_proprietes() if args.toutes_proprietes else [args.propriete]
+        contenu = exporter_tableaux(date_debut, date_fin, args.export, proprietes, args.processus)
+
+        nom_fichier = "tableaux_tarifs.zip" if args.export == "zip" else "tableau_tarifs_plateformes.csv"
+        chemin_export = RESULTS_DIR / nom_fichier
+        chemin_export.write_bytes(contenu)
+        print(f"\nTableaux exportés dans '{chemin_export.relative_to(BASE_DIR)}'")
+        return
+
     if args.tableau:
-        calculateur = obtenir_calculateur()
         tableau = TableauTarifs(calculateur, plateforme=plateforme)
         
         # Affichage dans la console
@@ -136,21 +250,34 @@ def main():
         print(f"\nTableau exporté dans '{chemin_export.relative_to(BASE_DIR)}'")
         return
 
-    # Mode normal
-    details, total = calcul_detail(date_debut, date_fin)
-    nb_jours = (date_fin - date_debut).days + 1
+    # ---------- Mode toutes propriétés ----------
+    if args.toutes_proprietes:
+        print(f"\nSéjour du {date_debut.strftime('%d-%m-%Y')} au {date_fin.strftime('%d-%m-%Y')} :")
+        for devis in devis_toutes_proprietes(date_debut, date_fin, plateforme, args.menage,
+                                             processus=args.processus):
+            if "erreur" in devis:
+                print(f"{devis['propriete']:<20} : {devis['erreur']}")
+            else:
+                print(f"{devis['propriete']:<20} : {devis['total']:>8.2f} € "
+                      f"(moy. {devis['moyenne']:>6.2f} €/nuit)")
+        return
+
+    # Mode normal : le séjour minimum du tarif d'arrivée s'applique aussi
+    calculateur.plan.verifier_sejour(calculateur.calendrier, date_debut, date_fin)
+    details, total = calcul_detail(date_debut, date_fin, args.propriete)
+    devis = calculateur.plan.devis(round(total * 100), nb_jours, args.menage)
 
     print("\nDétail journalier :")
     for jour, prix in details:
         date_col = formater_date_jour(jour)
         print(f"{date_col} : {prix:>6.2f} €")
+    if devis.remise:
+        print(f"{'Remise durée':<20} : {-devis.remise:>6.2f} €")
     if args.menage:
-        montant_menage = 25.0 if nb_jours <= 2 else 40.0
-        print(f"{'Frais de ménage':<20} : {montant_menage:>6.2f} €")
-        total += montant_menage
+        print(f"{'Frais de ménage':<20} : {devis.menage:>6.2f} €")
     print("-" * 30)
-    print(f"Prix total   : {total:>6.2f} €, pour {nb_jours} nuits.")
-    print(f"Prix moyen   : {total/nb_jours:>6.2f} € par nuit.")
+    print(f"Prix total   : {devis.total:>6.2f} €, pour {nb_jours} nuits.")
+    print(f"Prix moyen   : {devis.total/nb_jours:>6.2f} € par nuit.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Cache mémoire borné, thread-safe, avec éviction du moins récemment utilisé.
+
+    La taille est bornée par un nombre d'entrées et, si 'max_octets' est
+    donné, par la somme des tailles des valeurs (len() de la valeur).
+    """
+
+    def __init__(self, max_entrees: int = 128, max_octets: int = None):
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.octets = 0
+        self.hits = 0
+        self.misses = 0
+
+    def obtenir(self, cle):
+        """Retourne la valeur associée à 'cle', ou None si elle est absente."""
+        with self._verrou:
+            valeur = self._entrees.get(cle)
+            if valeur is None:
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return valeur
+
+    def ajouter(self, cle, valeur):
+        """Ajoute une valeur, en évinçant les entrées les plus anciennes si besoin."""
+        taille = len(valeur) if self.max_octets is not None else 0
+        if self.max_octets is not None and taille > self.max_octets:
+            return  # trop volumineux pour être conservé
+
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None and self.max_octets is not None:
+                self.octets -= len(ancienne)
+
+            self._entrees[cle] = valeur
+            self.octets += taille
+
+            while len(self._entrees) > self.max_entrees or (
+                self.max_octets is not None and self.octets > self.max_octets
+            ):
+                _, evincee = self._entrees.popitem(last=False)
+                if self.max_octets is not None:
+                    self.octets -= len(evincee)
+
+    def obtenir_ou_calculer(self, cle, calcul):
+        """Retourne la valeur en cache, ou la calcule avec 'calcul()' et la conserve."""
+        valeur = self.obtenir(cle)
+        if valeur is None:
+            valeur = calcul()
+            self.ajouter(cle, valeur)
+        return valeur
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self.octets = 0
+
+    def statistiques(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entrees": len(self._entrees),
+            "octets": self.octets,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hits": self.hits / total if total else 0.0,
+        }
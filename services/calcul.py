@@ -1,43 +1,913 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from core import binaire, metriques, regles
 from core.calculateur import CalculateurLocation
-from core.calendrier_tarifaire import CalendrierTarifaire
-from core.grille_tarifs import GrilleTarifs
-from core.tableau_tarifs import TableauTarifs
+from core.index_prix import IndexPrix
+from core.matrice import MatriceDevis
+from core.recherche import rechercher_fenetres
+from core.tableau_tarifs import TableauPlateformes, TableauTarifs, archive_tableaux, majorer_centimes
+from services import editions
+from services.cache import CacheLRU
 from datetime import date
 
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus, l'écriture reste atomique
+    fcntl = None
+
 # On définit le chemin des dossiers par rapport à la racine du projet
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
+# Une propriété supplémentaire par sous-dossier : data/proprietes/<id>/{prix,periode}.csv
+PROPRIETES_DIR = DATA_DIR / "proprietes"
 RESULTS_DIR = BASE_DIR / "results"
+# Matrices de devis sauvegardées, nommées d'après la version des données
+MATRICES_DIR = RESULTS_DIR / "matrices"
+MAX_MATRICES = 8
+
+# Index des prix publiés une fois et projetés en mémoire par tous les processus
+# (workers uvicorn/gunicorn), voir _partage_par_defaut()
+PARTAGE_DIR = RESULTS_DIR / "partage"
+MAX_INDEX_PARTAGES = 8
+
+
+def _partage_par_defaut() -> bool:
+    """
+    Indique si l'index des prix est partagé entre processus.
+
+    TARIFS_INDEX_PARTAGE=1 ou 0 force le choix (gunicorn, par exemple).
+    Sinon le partage n'est actif que sous plusieurs workers uvicorn :
+    WEB_CONCURRENCY supérieur à 1, ou processus lancé par le superviseur de
+    uvicorn hors mode --reload. Le CLI, les tests et un serveur à un seul
+    processus n'écrivent donc rien dans results/partage.
+    """
+    choix = os.environ.get("TARIFS_INDEX_PARTAGE", "").strip().lower()
+    if choix:
+        return choix not in ("0", "false", "non")
+    try:
+        if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+            return True
+    except ValueError:
+        pass
+    # Les workers de « uvicorn --workers N » démarrent par uvicorn._subprocess
+    return ("uvicorn._subprocess" in sys.modules
+            and multiprocessing.parent_process() is not None
+            and "--reload" not in sys.argv)
+
+
+PARTAGE_ACTIF = _partage_par_defaut()
 
 # On s'assure que le dossier results existe
 RESULTS_DIR.mkdir(exist_ok=True)
 
-def obtenir_calculateur() -> CalculateurLocation:
-    """Initialise et retourne le moteur de calcul en utilisant le dossier data."""
-    grille = GrilleTarifs.depuis_fichier(str(DATA_DIR / "prix.csv"))
-    calendrier = CalendrierTarifaire.depuis_fichier(str(DATA_DIR / "periode.csv"), grille)
-    return CalculateurLocation(calendrier, grille)
+# Délai minimal (en secondes) entre deux contrôles des fichiers de données
+INTERVALLE_CONTROLE = 1.0
+
+_log = logging.getLogger(__name__)
+
+# Identifiant de la propriété dont les fichiers sont directement dans data/
+PROPRIETE_DEFAUT = "defaut"
+
+# Exports de tableaux toutes plateformes : formats proposés et taille minimale
+# (en jours) des morceaux de plage répartis sur un pool de processus
+FORMATS_EXPORT = ("zip", "large")
+JOURS_PAR_MORCEAU = 366
+
+# Verrou (dans le dossier de chaque propriété) du journal des modifications
+NOM_VERROU = ".periodes.verrou"
+
+# Instantané des données chargées : remplacé d'un seul bloc lors d'un rechargement
+Donnees = namedtuple("Donnees", ["calculateur", "index", "version"])
+
+
+@contextmanager
+def _verrou_fichier(chemin: Path):
+    # Verrou exclusif entre processus, tenu tant que le bloc s'exécute
+    try:
+        f = open(chemin, "a")
+    except OSError:  # dossier en lecture seule : aucune écriture à protéger
+        yield
+        return
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+@contextmanager
+def _verrou_partage():
+    # Un seul processus construit et publie un index donné
+    PARTAGE_DIR.mkdir(exist_ok=True)
+    with _verrou_fichier(PARTAGE_DIR / ".verrou"):
+        yield
+
+
+def _lire_generation() -> tuple:
+    # Contenu du fichier 'generation' : (compteur, dernière version annoncée)
+    try:
+        compteur, version = (PARTAGE_DIR / "generation").read_text().split()[:2]
+        return int(compteur), version
+    except (OSError, ValueError):
+        return 0, None
+
+
+def _annoncer_generation(version: str) -> int:
+    # À appeler sous _verrou_partage : incrémente le compteur et annonce 'version'
+    generation = _lire_generation()[0] + 1
+    temporaire = PARTAGE_DIR / f"generation.{os.getpid()}.tmp"
+    temporaire.write_text(f"{generation} {version}\n")
+    os.replace(temporaire, PARTAGE_DIR / "generation")
+    return generation
+
+
+def _marque_generation():
+    # Change à chaque annonce : contrôlé à chaque demande, sans ouvrir le fichier
+    try:
+        stat = (PARTAGE_DIR / "generation").stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def index_partage(calendrier, grille, plan, version: str):
+    """
+    Retourne l'index des prix de 'version', projeté depuis PARTAGE_DIR.
+
+    Le premier processus qui charge une version construit l'index et le
+    publie sous le nom index-<version>.bin ; les suivants projettent le même
+    fichier en lecture seule, sans le reconstruire ni le copier.
+
+    Tout processus qui passe à une version autre que la dernière annoncée
+    incrémente le compteur de génération : les registres des autres
+    processus voient le compteur changer et contrôlent aussitôt leurs
+    fichiers (voir RegistreCalculateur._controler), sans attendre
+    INTERVALLE_CONTROLE.
+
+    :return: Un tuple (IndexPrix, génération de la publication).
+    """
+    fichier = PARTAGE_DIR / f"index-{version}.bin"
+    try:
+        resultat = IndexPrix.attacher(str(fichier), plan)
+    except (OSError, ValueError):
+        resultat = None
+    if resultat is not None and _lire_generation()[1] == version:
+        return resultat
+
+    with _verrou_partage():
+        if resultat is None:
+            try:
+                resultat = IndexPrix.attacher(str(fichier), plan)
+            except (OSError, ValueError):
+                pass
+        if resultat is not None:
+            if _lire_generation()[1] != version:
+                _annoncer_generation(version)
+            return resultat
+
+        index = IndexPrix(calendrier, grille, plan=plan)
+        generation = _lire_generation()[0] + 1
+        index.publier(str(fichier), generation)
+        _annoncer_generation(version)
+
+        # Les projections déjà ouvertes restent valides après suppression du fichier
+        anciens = sorted(PARTAGE_DIR.glob("index-*.bin"), key=lambda f: f.stat().st_mtime_ns)
+        for ancien in anciens[:max(len(anciens) - MAX_INDEX_PARTAGES, 0)]:
+            try:
+                ancien.unlink()
+            except OSError:
+                pass  # encore projeté sous Windows
+
+        # Le processus qui publie projette lui aussi le fichier plutôt que de garder sa copie
+        return IndexPrix.attacher(str(fichier), plan)
+
+
+class RegistreCalculateur:
+    """
+    Conserve un CalculateurLocation partagé par tout le processus.
+
+    Les fichiers prix.csv et periode.csv ne sont lus qu'une fois. À chaque
+    demande, on compare (au plus une fois par INTERVALLE_CONTROLE) leurs dates
+    de modification et tailles à celles du dernier chargement. En cas de
+    changement, un seul thread reconstruit un nouveau calculateur pendant que
+    les autres continuent d'utiliser l'ancien, puis la référence est remplacée
+    d'un bloc.
+
+    Les modifications de périodes (modifier) suivent le même principe : elles
+    s'appliquent à une copie du calendrier et de l'index, sur la seule plage
+    touchée, et sont ajoutées au journal rejoué à chaque chargement.
+    """
+
+    def __init__(self, dossier: Path, intervalle: float = INTERVALLE_CONTROLE):
+        self.dossier = Path(dossier)
+        self.intervalle = intervalle
+        self._verrou = threading.Lock()
+        self._donnees = None
+        self._signature = None
+        self._dernier_controle = 0.0
+        self.nb_chargements = 0
+        self.nb_rechargements = 0
+        self.duree_dernier_chargement = None
+        self.dernier_chargement = None
+        self.derniere_erreur = None
+        self.nb_modifications = 0
+        self.nb_compactages = 0
+        self._taille_journal = 0
+        self._matrice = None
+        self.generation = None
+        self._generation_vue = None
+        self.journal_rejete = None
+
+    @property
+    def fichiers(self):
+        return [self.dossier / "prix.csv", self.dossier / "periode.csv"]
+
+    @property
+    def fichier_binaire(self):
+        # Version précompilée (main.py --compiler), utilisée si plus récente que les CSV
+        return self.dossier / binaire.NOM_FICHIER
+
+    @property
+    def fichier_journal(self):
+        # Modifications de périodes pas encore reportées dans periode.csv
+        return self.dossier / editions.NOM_JOURNAL
+
+    @property
+    def fichier_verrou(self):
+        # Verrou entre processus des lectures et écritures de periode.csv et du journal
+        return self.dossier / NOM_VERROU
+
+    @property
+    def fichier_regles(self):
+        # Règles de tarification facultatives (règles par défaut si absent)
+        return self.dossier / regles.NOM_FICHIER
+
+    def _signature_fichiers(self):
+        signature = []
+        for fichier in self.fichiers:
+            stat = fichier.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        for fichier in (self.fichier_binaire, self.fichier_journal, self.fichier_regles):
+            if fichier.exists():
+                stat = fichier.stat()
+                signature.append((fichier.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    @property
+    def fichier_journal_rejete(self):
+        # Dernier journal écarté au chargement, conservé pour examen
+        return self.dossier / f"{editions.NOM_JOURNAL}.rejete"
+
+    def _rejeter_journal(self, erreur: ValueError):
+        os.replace(self.fichier_journal, self.fichier_journal_rejete)
+        self.journal_rejete = str(erreur)
+        _log.warning("%s : journal écarté dans '%s' (%s)",
+                     self.dossier, self.fichier_journal_rejete.name, erreur)
+
+    def _empreinte(self) -> str:
+        # Version des données : empreinte du contenu des fichiers, identique
+        # pour tous les processus qui lisent les mêmes fichiers
+        empreinte = hashlib.sha1()
+        for fichier in self.fichiers:
+            empreinte.update(fichier.read_bytes())
+        for fichier in (self.fichier_journal, self.fichier_regles):
+            if fichier.exists():
+                empreinte.update(fichier.read_bytes())
+        return empreinte.hexdigest()[:16]
+
+    def _charger(self, signature):
+        debut = time.perf_counter()
+        fichier_prix, fichier_periodes = self.fichiers
+        grille, calendrier = binaire.charger_donnees(
+            str(fichier_prix), str(fichier_periodes), str(self.fichier_binaire)
+        )
+        try:
+            journal = editions.lire_journal(self.fichier_journal)
+            for numero, edition in enumerate(journal, start=1):
+                try:
+                    editions.appliquer_edition(calendrier, grille, edition)
+                except ValueError as e:
+                    raise ValueError(f"{editions.NOM_JOURNAL}, modification n°{numero} {edition} : {e}")
+        except ValueError as e:
+            # Journal qui ne s'applique plus (periode.csv modifié à la main, par
+            # exemple) : il est mis de côté et periode.csv est chargé seul
+            self._rejeter_journal(e)
+            signature = self._signature_fichiers()
+            journal = []
+            grille, calendrier = binaire.charger_donnees(
+                str(fichier_prix), str(fichier_periodes), str(self.fichier_binaire)
+            )
+        if self.fichier_regles.exists():
+            plan = regles.Regles.depuis_fichier(str(self.fichier_regles)).compiler(grille)
+        else:
+            plan = regles.plan_par_defaut(grille)
+        calculateur = CalculateurLocation(calendrier, grille, plan)
+        version = self._empreinte()
+
+        if PARTAGE_ACTIF:
+            index, self.generation = index_partage(calendrier, grille, plan, version)
+            self._generation_vue = _marque_generation()
+        else:
+            index = IndexPrix(calendrier, grille, plan=plan)
+
+        # Remplacement atomique : les lecteurs voient l'ancien ou le nouvel instantané
+        self._donnees = Donnees(calculateur, index, version)
+        self._signature = signature
+        self._taille_journal = len(journal)
+
+        self.duree_dernier_chargement = time.perf_counter() - debut
+        self.dernier_chargement = time.time()
+        if self.nb_chargements:
+            self.nb_rechargements += 1
+        self.nb_chargements += 1
+
+    def _controler(self):
+        maintenant = time.monotonic()
+        # Un index publié par un autre processus déclenche le contrôle sans délai
+        marque = _marque_generation() if PARTAGE_ACTIF else None
+        if maintenant - self._dernier_controle < self.intervalle and marque == self._generation_vue:
+            return
+        # Si un autre thread recharge déjà, on sert l'ancienne version
+        if not self._verrou.acquire(blocking=False):
+            return
+        try:
+            self._dernier_controle = maintenant
+            self._generation_vue = marque
+            try:
+                # Fichier absent ou en cours de remplacement : stat() lève OSError
+                if self._signature_fichiers() != self._signature:
+                    # Sous verrou : jamais un periode.csv compacté avec l'ancien journal
+                    with _verrou_fichier(self.fichier_verrou):
+                        self._charger(self._signature_fichiers())
+                    self.derniere_erreur = None
+            except (OSError, ValueError, KeyError) as e:
+                # Données illisibles ou invalides : on garde la version précédente
+                self.derniere_erreur = str(e)
+                _log.warning("%s : rechargement impossible, version précédente conservée (%s)",
+                             self.dossier, e)
+        finally:
+            self._verrou.release()
+
+    def donnees(self) -> Donnees:
+        """Retourne l'instantané courant, rechargé si les fichiers ont changé."""
+        if self._donnees is None:
+            with self._verrou:
+                if self._donnees is None:
+                    with _verrou_fichier(self.fichier_verrou):
+                        self._charger(self._signature_fichiers())
+                    self._dernier_controle = time.monotonic()
+        else:
+            self._controler()
+        return self._donnees
+
+    def modifier(self, edition: dict):
+        """
+        Applique une modification de périodes (voir services.editions) sans
+        recharger les fichiers, puis la journalise.
+
+        :return: Un tuple (Donnees, (debut, fin)) : le nouvel instantané et la
+                 plage dont les prix peuvent avoir changé.
+        :raises ValueError: Si la modification est invalide ; rien n'est alors changé.
+        """
+        self.donnees()
+        # Ajout au journal (et compactage éventuel) d'un seul processus à la fois,
+        # à partir de l'état des fichiers relu sous le verrou
+        with self._verrou, _verrou_fichier(self.fichier_verrou):
+            # Fichiers modifiés par un autre processus : on repart de leur contenu
+            signature = self._signature_fichiers()
+            if signature != self._signature:
+                self._charger(signature)
+
+            actuelles = self._donnees
+            calendrier = actuelles.calculateur.calendrier.copie()
+            grille = actuelles.calculateur.grille_tarifs
+            debut, fin = editions.appliquer_edition(calendrier, grille, edition)
+
+            index = actuelles.index.copie()
+            index.rafraichir(calendrier, debut, fin)
+
+            matrice = None
+            if self._matrice is not None and self._matrice[0] == actuelles.version:
+                matrice = self._matrice[1].copie()
+                matrice.rafraichir(calendrier, index, debut, fin)
+
+            editions.ajouter_au_journal(self.fichier_journal, edition)
+            version = self._empreinte()
+
+            calculateur = CalculateurLocation(calendrier, grille, actuelles.calculateur.plan)
+            self._donnees = Donnees(calculateur, index, version)
+            if matrice is not None:
+                self._matrice = (version, matrice)
+            self._signature = self._signature_fichiers()
+            self.nb_modifications += 1
+            self._taille_journal += 1
+
+            if self._taille_journal >= editions.SEUIL_COMPACTAGE:
+                self._compacter()
+
+            return self._donnees, (debut, fin)
+
+    def matrice(self) -> MatriceDevis:
+        """
+        Retourne la matrice des devis de la version courante.
+
+        Elle est relue depuis MATRICES_DIR si elle y a déjà été sauvegardée
+        pour cette version, sinon construite puis sauvegardée ; les
+        modifications de périodes la mettent ensuite à jour par bandes.
+        """
+        donnees = self.donnees()
+        courante = self._matrice
+        if courante is not None and courante[0] == donnees.version:
+            return courante[1]
+
+        with self._verrou:
+            donnees = self._donnees
+            if self._matrice is not None and self._matrice[0] == donnees.version:
+                return self._matrice[1]
+
+            fichier = MATRICES_DIR / f"{donnees.version}.bin"
+            try:
+                matrice = MatriceDevis.charger(str(fichier), donnees.index)
+            except (OSError, ValueError):
+                matrice = MatriceDevis(donnees.calculateur.calendrier, donnees.index)
+                MATRICES_DIR.mkdir(exist_ok=True)
+                matrice.enregistrer(str(fichier))
+                # Seules les MAX_MATRICES plus récentes sont conservées
+                anciennes = sorted(MATRICES_DIR.glob("*.bin"), key=lambda f: f.stat().st_mtime_ns)
+                for ancienne in anciennes[:max(len(anciennes) - MAX_MATRICES, 0)]:
+                    ancienne.unlink(missing_ok=True)
+
+            self._matrice = (donnees.version, matrice)
+            return matrice
+
+    def compacter(self):
+        """Reporte les modifications journalisées dans periode.csv et vide le journal."""
+        self.donnees()
+        with self._verrou, _verrou_fichier(self.fichier_verrou):
+            # Journal complété par un autre processus : on le relit avant de le vider
+            signature = self._signature_fichiers()
+            if signature != self._signature:
+                self._charger(signature)
+            self._compacter()
+
+    def _compacter(self):
+        if not self.fichier_journal.exists():
+            return
+        _, fichier_periodes = self.fichiers
+        editions.ecrire_periodes(self._donnees.calculateur.calendrier, fichier_periodes)
+        self.fichier_journal.unlink()
+        self._taille_journal = 0
+        # Mêmes données, mais la version suit le contenu des fichiers réécrits
+        actuelles = self._donnees
+        version = self._empreinte()
+        self._donnees = actuelles._replace(version=version)
+        if self._matrice is not None and self._matrice[0] == actuelles.version:
+            self._matrice = (version, self._matrice[1])
+        # Même contenu qu'avant : on évite un rechargement inutile
+        self._signature = self._signature_fichiers()
+        self.nb_compactages += 1
+
+    def obtenir(self) -> CalculateurLocation:
+        """Retourne le calculateur courant."""
+        return self.donnees().calculateur
+
+    def index(self) -> IndexPrix:
+        """Retourne l'index des prix journaliers de la version courante."""
+        return self.donnees().index
+
+    @property
+    def version(self) -> str:
+        """Empreinte du contenu des fichiers de données actuellement chargés."""
+        return self.donnees().version
+
+    def statistiques(self) -> dict:
+        return {
+            "version": self._donnees.version if self._donnees else None,
+            "nb_chargements": self.nb_chargements,
+            "nb_rechargements": self.nb_rechargements,
+            "duree_dernier_chargement": self.duree_dernier_chargement,
+            "dernier_chargement": self.dernier_chargement,
+            "derniere_erreur": self.derniere_erreur,
+            "nb_modifications": self.nb_modifications,
+            "nb_compactages": self.nb_compactages,
+            "generation_index": self.generation,
+            "journal_rejete": self.journal_rejete,
+        }
+
+
+registre = RegistreCalculateur(DATA_DIR)
+
+# Registres des autres propriétés, créés à la première demande
+_registres = {}
+_verrou_registres = threading.Lock()
+_FORMAT_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Exports CSV récents, indexés par version des données et paramètres
+cache_csv = CacheLRU(max_entrees=64, max_octets=16 * 1024 * 1024)
+
+metriques.enregistrer_cache("csv", cache_csv.statistiques)
+metriques.enregistrer_cache("majoration", metriques.statistiques_lru(majorer_centimes))
+
+
+def lister_proprietes() -> list:
+    """Retourne les identifiants des propriétés disponibles (la propriété par défaut en tête)."""
+    proprietes = [PROPRIETE_DEFAUT]
+    if PROPRIETES_DIR.is_dir():
+        proprietes += sorted(
+            d.name for d in PROPRIETES_DIR.iterdir()
+            if d.is_dir() and _FORMAT_ID.match(d.name)
+            and (d / "prix.csv").exists() and (d / "periode.csv").exists()
+        )
+    return proprietes
+
+
+def registre_propriete(propriete: str = None) -> RegistreCalculateur:
+    """
+    Retourne le registre de données d'une propriété (chargé à la première demande).
+
+    :raises ValueError: Si la propriété est inconnue.
+    """
+    if not propriete or propriete == PROPRIETE_DEFAUT:
+        return registre
+
+    reg = _registres.get(propriete)
+    if reg is None:
+        dossier = PROPRIETES_DIR / propriete
+        if not _FORMAT_ID.match(propriete) or not (dossier / "prix.csv").exists():
+            raise ValueError(f"Propriété '{propriete}' inconnue")
+        with _verrou_registres:
+            reg = _registres.setdefault(propriete, RegistreCalculateur(dossier))
+    return reg
+
 
+def compiler_donnees(propriete: str = None) -> Path:
+    """
+    Valide les CSV d'une propriété et écrit leur version binaire précompilée.
 
-def calcul_tableau(date_debut: date, date_fin: date, plateforme: str = None):
+    :return: Le chemin du fichier binaire écrit.
+    """
+    reg = registre_propriete(propriete)
+    fichier_prix, fichier_periodes = reg.fichiers
+    binaire.compiler(str(fichier_prix), str(fichier_periodes), str(reg.fichier_binaire))
+    return reg.fichier_binaire
+
+
+def obtenir_calculateur(propriete: str = None) -> CalculateurLocation:
+    """Retourne le moteur de calcul partagé d'une propriété (par défaut : dossier data)."""
+    return registre_propriete(propriete).obtenir()
+
+
+def obtenir_index(propriete: str = None) -> IndexPrix:
+    """Retourne l'index des prix journaliers partagé (reconstruit avec les données)."""
+    return registre_propriete(propriete).index()
+
+
+def obtenir_matrice(propriete: str = None) -> MatriceDevis:
+    """Retourne la matrice des devis (arrivée × durée) partagée d'une propriété."""
+    return registre_propriete(propriete).matrice()
+
+
+def version_donnees(propriete: str = None) -> str:
+    """Empreinte des fichiers de données chargés, pour l'indexation des caches."""
+    return registre_propriete(propriete).version
+
+
+def statistiques_donnees() -> dict:
+    """Compteurs de chargement des données tarifaires, par propriété chargée."""
+    stats = {PROPRIETE_DEFAUT: registre.statistiques()}
+    for propriete, reg in list(_registres.items()):
+        stats[propriete] = reg.statistiques()
+    return stats
+
+
+def calcul_tableau(date_debut: date, date_fin: date, plateforme: str = None, propriete: str = None):
     """
     Logique utilisée par FastAPI et le CLI pour obtenir les données du tableau.
     """
-    calculateur = obtenir_calculateur()
+    calculateur = obtenir_calculateur(propriete)
     tableau = TableauTarifs(calculateur, plateforme=plateforme)
+    return tableau.generer_tableau_plage(date_debut, date_fin)
 
-    # GÉNÉRATION DU CSV pour permettre le téléchargement immédiat
-    nom_fichier = f"tableau_tarifs_{plateforme}.csv" if plateforme else "tableau_tarifs.csv"
-    tableau.exporter_csv_plage(str(RESULTS_DIR / nom_fichier), date_debut, date_fin)
 
-    # On utilise le bon nom de méthode : generer_tableau_plage
-    return tableau.generer_tableau_plage(date_debut, date_fin)
+def iterer_tableau(date_debut: date, date_fin: date, plateforme: str = None, propriete: str = None):
+    """
+    Variante paresseuse de calcul_tableau : les lignes sont produites à la demande.
+    La plage est contrôlée dès l'appel, pour qu'une erreur survienne avant la
+    première ligne plutôt qu'au milieu d'une réponse déjà commencée.
+    """
+    donnees = registre_propriete(propriete).donnees()
+    donnees.index.total_centimes(date_debut, date_fin)  # lève ValueError hors du calendrier
+    tableau = TableauTarifs(donnees.calculateur, plateforme=plateforme)
+    return tableau.iterer_tableau_plage(date_debut, date_fin)
+
+
+def flux_csv_tableau(date_debut: date, date_fin: date, plateforme: str = None, propriete: str = None):
+    """
+    Retourne le CSV du tableau sous forme d'itérable de blocs d'octets.
+    Un CSV déjà en cache est renvoyé tel quel ; sinon il est encodé au fil
+    des lignes, sans être conservé.
+    """
+    donnees = registre_propriete(propriete).donnees()
+    contenu = cache_csv.obtenir((donnees.version, date_debut, date_fin, plateforme))
+    if contenu is not None:
+        return [contenu]
+
+    donnees.index.total_centimes(date_debut, date_fin)  # lève ValueError hors du calendrier
+    tableau = TableauTarifs(donnees.calculateur, plateforme=plateforme)
+    return tableau.blocs_csv(tableau.iterer_tableau_plage(date_debut, date_fin))
+
+
+def csv_tableau(date_debut: date, date_fin: date, plateforme: str = None, propriete: str = None) -> bytes:
+    """
+    Retourne le CSV du tableau (BOM UTF-8, délimiteur ';'), sans écrire sur disque.
+    Le résultat est conservé en cache pour la version courante des données.
+    """
+    donnees = registre_propriete(propriete).donnees()
+    cle = (donnees.version, date_debut, date_fin, plateforme)
+
+    def generer():
+        tableau = TableauTarifs(donnees.calculateur, plateforme=plateforme)
+        return tableau.csv_plage(date_debut, date_fin)
+
+    return cache_csv.obtenir_ou_calculer(cle, generer)
+
+
+def tableaux_plateformes(date_debut: date, date_fin: date, format_export: str = "zip",
+                         propriete: str = None) -> bytes:
+    """
+    Retourne les tableaux de toutes les plateformes, produits en un seul
+    parcours du calendrier : archive zip d'un CSV par plateforme ('zip') ou
+    CSV unique aux prix côte à côte ('large'). Le résultat est conservé en
+    cache pour la version courante des données.
+
+    :raises ValueError: Si le format est inconnu ou la plage hors du calendrier.
+    """
+    if format_export not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'export '{format_export}' inconnu ({', '.join(FORMATS_EXPORT)})")
+    donnees = registre_propriete(propriete).donnees()
+    cle = (donnees.version, date_debut, date_fin, f"plateformes.{format_export}")
+
+    def generer():
+        tableau = TableauPlateformes(donnees.calculateur)
+        if format_export == "zip":
+            return tableau.zip_plage(date_debut, date_fin)
+        return tableau.csv_large(date_debut, date_fin)
+
+    return cache_csv.obtenir_ou_calculer(cle, generer)
+
+
+def _morceaux(calendrier, date_debut: date, date_fin: date, nb_jours: int) -> list:
+    """
+    Découpe une plage en morceaux d'au moins nb_jours jours, coupés aux
+    limites de segments : chaque morceau produit exactement les lignes
+    qu'il aurait dans le tableau de toute la plage.
+
+    :raises ValueError: Si la plage contient un jour sans période.
+    """
+    morceaux = []
+    debut = None
+    for _, debut_segment, fin_segment in calendrier.segments(date_debut, date_fin):
+        if debut is None:
+            debut = debut_segment
+        if (fin_segment - debut).days + 1 >= nb_jours:
+            morceaux.append((debut, fin_segment))
+            debut = None
+    if debut is not None:
+        morceaux.append((debut, fin_segment))
+    return morceaux
+
+
+def _tableaux_morceau(propriete: str, date_debut: date, date_fin: date) -> dict:
+    # Exécuté dans le processus courant ou dans un processus du pool
+    return TableauPlateformes(obtenir_calculateur(propriete)).generer_plage(date_debut, date_fin)
+
+
+def exporter_tableaux(date_debut: date, date_fin: date, format_export: str = "zip",
+                      proprietes: list = None, processus: int = None,
+                      jours_par_morceau: int = JOURS_PAR_MORCEAU) -> bytes:
+    """
+    Exporte les tableaux de toutes les plateformes sur une plage, pour une
+    ou plusieurs propriétés.
 
+    Avec processus > 1, la plage de chaque propriété est découpée en morceaux
+    (voir _morceaux) répartis sur un pool de processus, chacun chargeant les
+    données dont il a besoin ; les lignes sont ensuite recollées dans l'ordre.
 
-def calcul_detail(date_debut: date, date_fin: date):
+    :param format_export: 'zip' (un CSV par plateforme, dans un dossier par
+                          propriété s'il y en a plusieurs) ou 'large' (un seul
+                          CSV, une seule propriété).
+    :param proprietes: Propriétés à exporter (par défaut : la propriété par défaut).
+    :return: Le contenu du fichier exporté.
+    :raises ValueError: Si le format est inconnu ou si une plage contient un jour sans période.
+    """
+    if format_export not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'export '{format_export}' inconnu ({', '.join(FORMATS_EXPORT)})")
+    proprietes = list(proprietes or [PROPRIETE_DEFAUT])
+    if format_export == "large" and len(proprietes) > 1:
+        raise ValueError("Le CSV large ne concerne qu'une seule propriété")
+
+    parallele = processus is not None and processus > 1
+    taches = []
+    for propriete in proprietes:
+        if parallele:
+            calendrier = obtenir_calculateur(propriete).calendrier
+            morceaux = _morceaux(calendrier, date_debut, date_fin, jours_par_morceau)
+        else:
+            morceaux = [(date_debut, date_fin)]
+        taches += [(propriete, debut, fin) for debut, fin in morceaux]
+
+    if parallele and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=min(processus, len(taches))) as pool:
+            resultats = list(pool.map(_tableaux_morceau, *zip(*taches)))
+    else:
+        resultats = [_tableaux_morceau(*tache) for tache in taches]
+
+    tableaux = {}
+    for (propriete, _, _), morceau in zip(taches, resultats):
+        tableau = tableaux.setdefault(propriete, {plateforme: [] for plateforme in morceau})
+        for plateforme, lignes in morceau.items():
+            tableau[plateforme].extend(lignes)
+
+    if format_export == "zip":
+        if len(tableaux) == 1:
+            return archive_tableaux({"": tableaux[proprietes[0]]})
+        return archive_tableaux(tableaux)
+
+    (tableau,) = tableaux.values()
+    champs = TableauPlateformes.champs_larges(tableau)
+    lignes = (TableauPlateformes.ligne_large(dict(zip(tableau, l))) for l in zip(*tableau.values()))
+    return b"".join(TableauTarifs.blocs_csv(lignes, champs=champs))
+
+
+def lister_periodes(propriete: str = None) -> list:
+    """
+    Retourne les périodes courantes (journal compris), dates de fin incluses.
+    """
+    calendrier = obtenir_calculateur(propriete).calendrier
+    return [
+        {"date_debut": p.debut.isoformat(), "date_fin": p.fin.isoformat(), "id_tarif": p.id_tarif}
+        for p in calendrier.periodes
+    ]
+
+
+def modifier_periodes(corps: dict, propriete: str = None) -> dict:
+    """
+    Applique et journalise une modification du calendrier (voir services.editions).
+
+    :return: La nouvelle version des données et les périodes de la plage touchée.
+    :raises ValueError: Si la modification est invalide.
+    """
+    edition = editions.normaliser_edition(corps)
+    donnees, (debut, fin) = registre_propriete(propriete).modifier(edition)
+
+    calendrier = donnees.calculateur.calendrier
+    return {
+        "version": donnees.version,
+        "date_debut": debut.isoformat(),
+        "date_fin": fin.isoformat(),
+        "periodes": [
+            {"date_debut": p.debut.isoformat(), "date_fin": p.fin.isoformat(), "id_tarif": p.id_tarif}
+            for p, _, _ in calendrier.segments(debut, fin)
+        ],
+    }
+
+
+def calcul_detail(date_debut: date, date_fin: date, propriete: str = None):
     """
     Logique pour obtenir le calcul détaillé (utilisé par le CLI et l'API).
+    Les prix et le total sont lus dans l'index précalculé.
+    """
+    details, total = obtenir_index(propriete).details(date_debut, date_fin)
+    metriques.compter("jours_calcules", len(details))
+    return details, total
+
+
+def calcul_detail_colonnes(date_debut: date, date_fin: date, propriete: str = None):
+    """
+    Variante de calcul_detail sans date ni formatage par nuitée.
+
+    :return: Un tuple (prix de chaque nuitée en centimes, [[id_tarif, nb_nuitees], ...])
+             où les nuitées consécutives d'un même tarif sont regroupées.
     """
-    calculateur = obtenir_calculateur()
-    return calculateur.calculer(date_debut, date_fin)
\ No newline at end of file
+    donnees = registre_propriete(propriete).donnees()
+    prix = donnees.index.prix_centimes(date_debut, date_fin)
+    periodes = []
+    if prix:
+        for periode, debut, fin in donnees.calculateur.calendrier.segments(date_debut, date_fin):
+            nb_nuitees = (fin - debut).days + 1
+            if periodes and periodes[-1][0] == periode.id_tarif:
+                periodes[-1][1] += nb_nuitees
+            else:
+                periodes.append([periode.id_tarif, nb_nuitees])
+    metriques.compter("jours_calcules", len(prix))
+    return prix, periodes
+
+
+def calcul_tableau_colonnes(date_debut: date, date_fin: date, plateforme: str = None, propriete: str = None) -> dict:
+    """
+    Données du tableau au format colonnes (voir TableauTarifs.colonnes_plage).
+    """
+    tableau = TableauTarifs(obtenir_calculateur(propriete), plateforme=plateforme)
+    return tableau.colonnes_plage(date_debut, date_fin)
+
+
+def calcul_lot(debuts, fins, plateforme: str = None, menage: bool = False, propriete: str = None,
+               minimum_global: bool = True):
+    """
+    Calcule les totaux d'une liste de séjours (nuitées de debuts[k] à fins[k] incluses),
+    avec le séjour minimum de chacun (voir IndexPrix.calculer_lot).
+    """
+    donnees = registre_propriete(propriete).donnees()
+    index = donnees.index
+    minimums = index.plan.sejours_minimums(
+        donnees.calculateur.calendrier, index.premier_jour, index.dernier_jour, minimum_global
+    )
+    resultat = index.calculer_lot(debuts, fins, plateforme=plateforme, menage=menage, minimums=minimums)
+    metriques.compter("sejours_lot", len(resultat.totaux))
+    # Tableaux NumPy, ou listes si NumPy est absent
+    nb_nuitees = resultat.nb_nuitees
+    metriques.compter("jours_calcules", int(nb_nuitees.sum() if hasattr(nb_nuitees, "sum") else sum(nb_nuitees)))
+    return resultat
+
+
+def calcul_recherche(date_debut: date, date_fin: date, nuits_min: int, nuits_max: int = None,
+                     plateforme: str = None, k: int = 5, moins_chers: bool = True,
+                     critere: str = "total", propriete: str = None, minimum_global: bool = True):
+    """
+    Recherche les fenêtres de séjour les moins (ou plus) chères sur la plage,
+    remise de durée déduite et séjour minimum appliqué comme pour un devis.
+    """
+    donnees = registre_propriete(propriete).donnees()
+    return rechercher_fenetres(
+        donnees.index, date_debut, date_fin, nuits_min, nuits_max,
+        plateforme=plateforme, k=k, moins_chers=moins_chers, critere=critere,
+        calendrier=donnees.calculateur.calendrier, minimum_global=minimum_global,
+    )
+
+
+def _devis_propriete(propriete: str, calendrier, index: IndexPrix, date_debut: date, date_fin: date,
+                     plateforme: str, menage: bool, minimum_global: bool) -> dict:
+    # Exécuté dans le processus courant ou dans un processus du pool, sur les
+    # données déjà chargées par le processus courant
+    try:
+        index.plan.verifier_sejour(calendrier, date_debut, date_fin, minimum_global)
+        nb_nuitees = max((date_fin - date_debut).days + 1, 0)
+        devis = index.plan.devis(index.total_centimes(date_debut, date_fin, plateforme), nb_nuitees, menage)
+    except ValueError as e:
+        return {"propriete": propriete, "erreur": str(e)}
+
+    return {
+        "propriete": propriete,
+        "nb_nuitees": nb_nuitees,
+        "total": devis.total,
+        "total_nuitees": devis.nuitees,
+        "remise_montant": devis.remise,
+        "menage_montant": devis.menage,
+        "moyenne": devis.moyenne,
+    }
+
+
+def devis_toutes_proprietes(date_debut: date, date_fin: date, plateforme: str = None,
+                            menage: bool = False, processus: int = None,
+                            minimum_global: bool = True) -> list:
+    """
+    Calcule le prix d'un même séjour pour toutes les propriétés.
+
+    Les données de chaque propriété viennent de son registre, chargé une
+    seule fois par le processus courant. Avec processus > 1, les devis sont
+    répartis sur un pool de processus qui reçoivent ces données (calendrier
+    et index) au lieu de relire les CSV. Une propriété dont les données sont
+    illisibles, dont le calendrier ne couvre pas le séjour, ou pour laquelle
+    il est plus court que le séjour minimum, est renvoyée avec une clé
+    'erreur'.
+    """
+    resultats = {}
+    arguments = []
+    for propriete in lister_proprietes():
+        try:
+            donnees = registre_propriete(propriete).donnees()
+        except (OSError, ValueError, KeyError) as e:
+            resultats[propriete] = {"propriete": propriete, "erreur": str(e)}
+            continue
+        resultats[propriete] = None
+        arguments.append((propriete, donnees.calculateur.calendrier, donnees.index,
+                          date_debut, date_fin, plateforme, menage, minimum_global))
+
+    if processus is not None and processus > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=min(processus, len(arguments))) as pool:
+            devis = list(pool.map(_devis_propriete, *zip(*arguments)))
+    else:
+        devis = [_devis_propriete(*a) for a in arguments]
+
+    for d in devis:
+        resultats[d["propriete"]] = d
+    return list(resultats.values())
@@ -0,0 +1,128 @@
+"""
+Modifications du calendrier appliquées à chaud et journalisées.
+
+Chaque modification est un dict JSON, par exemple :
+    {"operation": "scinder", "jour": "2026-07-14", "id_tarif": "Haute_2026"}
+    {"operation": "fusionner", "jour": "2026-07-14"}
+    {"operation": "retarifer", "jour": "2026-07-14", "id_tarif": "Tres_haute_2026"}
+    {"operation": "ajouter", "date_debut": "2027-01-04", "date_fin": "2027-03-31", "id_tarif": "Basse_2026"}
+
+Les dates de période sont incluses (comme dans periode.csv). Les
+modifications sont ajoutées au journal, une par ligne, puis rejouées après
+periode.csv à chaque chargement, jusqu'au compactage qui réécrit
+periode.csv et vide le journal.
+"""
+
+import json
+import os
+from datetime import date
+from core.utils import lire_date
+
+NOM_JOURNAL = "periodes.journal.jsonl"
+
+# Nombre de modifications journalisées au-delà duquel le journal est compacté
+SEUIL_COMPACTAGE = 50
+
+# Champs obligatoires de chaque opération (id_tarif est facultatif pour scinder et fusionner)
+OPERATIONS = {
+    "scinder": ("jour",),
+    "fusionner": ("jour",),
+    "retarifer": ("jour", "id_tarif"),
+    "ajouter": ("date_debut", "date_fin", "id_tarif"),
+}
+
+
+def normaliser_edition(corps: dict) -> dict:
+    """
+    Vérifie une modification et la met sous la forme écrite dans le journal
+    (dates ISO, champs inutiles retirés).
+
+    :raises ValueError: Si l'opération est inconnue ou qu'un champ manque.
+    """
+    if not isinstance(corps, dict):
+        raise ValueError("Un objet JSON décrivant la modification est attendu")
+    operation = corps.get("operation")
+    if operation not in OPERATIONS:
+        raise ValueError(f"Opération '{operation}' inconnue ({', '.join(OPERATIONS)})")
+
+    edition = {"operation": operation}
+    for champ in OPERATIONS[operation]:
+        if corps.get(champ) in (None, ""):
+            raise ValueError(f"Champ '{champ}' manquant pour l'opération '{operation}'")
+    for champ in ("jour", "date_debut", "date_fin"):
+        if corps.get(champ) not in (None, ""):
+            edition[champ] = lire_date(corps[champ]).isoformat()
+    if corps.get("id_tarif"):
+        edition["id_tarif"] = str(corps["id_tarif"])
+    return edition
+
+
+def appliquer_edition(calendrier, grille_tarifs, edition: dict):
+    """
+    Applique une modification normalisée au calendrier (en place).
+
+    :return: La plage (debut, fin) dont les prix peuvent avoir changé.
+    :raises ValueError: Si le tarif est inconnu ou si la modification casse la chronologie.
+    """
+    id_tarif = edition.get("id_tarif")
+    if id_tarif is not None:
+        grille_tarifs.obtenir(id_tarif)  # tarif inconnu : erreur avant toute modification
+
+    operation = edition["operation"]
+    if operation == "ajouter":
+        return calendrier.ajouter(
+            date.fromisoformat(edition["date_debut"]), date.fromisoformat(edition["date_fin"]), id_tarif
+        )
+
+    jour = date.fromisoformat(edition["jour"])
+    if operation == "scinder":
+        return calendrier.scinder(jour, id_tarif)
+    if operation == "fusionner":
+        return calendrier.fusionner(jour, id_tarif)
+    return calendrier.retarifer(jour, id_tarif)
+
+
+# ----------------------------------------------------------------------
+# Journal
+# ----------------------------------------------------------------------
+def lire_journal(chemin) -> list:
+    """
+    Retourne les modifications du journal, dans l'ordre (liste vide s'il n'existe pas).
+
+    :raises ValueError: Si une ligne est illisible.
+    """
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            lignes = f.readlines()
+    except FileNotFoundError:
+        return []
+
+    editions = []
+    for numero, ligne in enumerate(lignes, start=1):
+        if not ligne.strip():
+            continue
+        try:
+            editions.append(normaliser_edition(json.loads(ligne)))
+        except ValueError as e:
+            raise ValueError(f"{os.path.basename(chemin)}, ligne {numero} : {e}")
+    return editions
+
+
+def ajouter_au_journal(chemin, edition: dict):
+    """Ajoute une modification à la fin du journal, écrite sur disque avant de rendre la main."""
+    with open(chemin, "a", encoding="utf-8") as f:
+        f.write(json.dumps(edition, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def ecrire_periodes(calendrier, chemin):
+    """
+    Réécrit periode.csv à partir du calendrier, de façon atomique.
+    """
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, "w", newline="", encoding="utf-8") as f:
+        f.write("date_debut;date_fin;id\n")
+        for periode in calendrier.periodes:
+            f.write(f"{periode.debut.strftime('%d-%m-%Y')};{periode.fin.strftime('%d-%m-%Y')};{periode.id_tarif}\n")
+    os.replace(temporaire, chemin)
@@ -0,0 +1,193 @@
+"""
+Profilage à la demande des requêtes et du CLI.
+
+Côté API, un échantillonneur relève la pile du thread qui exécute le calcul
+toutes les millisecondes environ et produit des piles repliées (« collapsed
+stacks », une ligne 'a;b;c nombre' par pile), directement utilisables par
+flamegraph.pl ou speedscope. Côté CLI, cProfile mesure toute l'exécution.
+
+Les profils sont écrits dans results/profils, qui ne garde que les
+MAX_PROFILS plus récents. Le profilage de l'API n'est possible que si la
+variable d'environnement TARIFS_PROFILAGE vaut 1.
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from services.calcul import RESULTS_DIR
+
+PROFILS_DIR = RESULTS_DIR / "profils"
+MAX_PROFILS = int(os.environ.get("TARIFS_PROFILS_MAX", "20"))
+INTERVALLE_ECHANTILLON = 0.001
+
+PROFILAGE_ACTIF = os.environ.get("TARIFS_PROFILAGE", "").strip().lower() in ("1", "true", "oui")
+
+_FORMAT_NOM = re.compile(r"^[A-Za-z0-9_.-]+\.(txt|prof)$")
+_verrou = threading.Lock()
+_numeros = itertools.count(1)
+
+# sys.setswitchinterval est global au processus : l'intervalle est abaissé
+# par le premier échantillonneur actif et rétabli par le dernier
+_verrou_intervalle = threading.Lock()
+_nb_actifs = 0
+_intervalle_origine = None
+
+
+def _abaisser_intervalle(intervalle: float):
+    global _nb_actifs, _intervalle_origine
+    with _verrou_intervalle:
+        if _nb_actifs == 0:
+            _intervalle_origine = sys.getswitchinterval()
+            sys.setswitchinterval(min(_intervalle_origine, intervalle))
+        _nb_actifs += 1
+
+
+def _retablir_intervalle():
+    global _nb_actifs
+    with _verrou_intervalle:
+        _nb_actifs -= 1
+        if _nb_actifs == 0:
+            sys.setswitchinterval(_intervalle_origine)
+
+
+class Echantillonneur:
+    """
+    Profileur par échantillonnage d'un thread, utilisé comme gestionnaire de contexte :
+
+        with Echantillonneur() as profil:
+            calcul()
+        texte = profil.piles_repliees()
+    """
+
+    def __init__(self, thread_id: int = None, intervalle: float = INTERVALLE_ECHANTILLON):
+        self.thread_id = thread_id
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self.duree = 0.0
+        self._arret = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        # Le thread profilé doit rendre le GIL assez souvent pour être observé
+        _abaisser_intervalle(self.intervalle / 10)
+        self._debut = time.perf_counter()
+        self._thread = threading.Thread(target=self._boucle, name="echantillonneur", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.duree = time.perf_counter() - self._debut
+        self._arret.set()
+        self._thread.join()
+        _retablir_intervalle()
+        return False
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle):
+            cadre = sys._current_frames().get(self.thread_id)
+            if cadre is None:
+                continue
+            pile = []
+            while cadre is not None:
+                code = cadre.f_code
+                pile.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+                cadre = cadre.f_back
+            if self._arret.is_set():
+                break  # pile prise pendant la sortie du profileur lui-même
+            self.piles[";".join(reversed(pile))] += 1
+
+    def piles_repliees(self) -> str:
+        """Retourne les piles au format replié, de la plus fréquente à la moins fréquente."""
+        return "".join(f"{pile} {nombre}\n" for pile, nombre in self.piles.most_common())
+
+
+def profilage_demande(valeur: str) -> bool:
+    """Indique si un drapeau de requête (en-tête ou paramètre) demande un profil."""
+    return PROFILAGE_ACTIF and valeur is not None and valeur.strip().lower() not in ("", "0", "false", "non")
+
+
+# ----------------------------------------------------------------------
+# Anneau de fichiers
+# ----------------------------------------------------------------------
+def enregistrer_profil(etiquette: str, contenu, extension: str = "txt") -> str:
+    """
+    Écrit un profil dans PROFILS_DIR et supprime les plus anciens au-delà de MAX_PROFILS.
+
+    :param contenu: Texte (piles repliées) ou octets.
+    :return: Le nom du fichier écrit.
+    """
+    etiquette = re.sub(r"[^A-Za-z0-9_-]+", "_", etiquette).strip("_") or "profil"
+    nom = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_numeros):04d}-{etiquette}.{extension}"
+
+    with _verrou:
+        PROFILS_DIR.mkdir(parents=True, exist_ok=True)
+        chemin = PROFILS_DIR / nom
+        if isinstance(contenu, str):
+            chemin.write_text(contenu, encoding="utf-8")
+        else:
+            chemin.write_bytes(contenu)
+
+        anciens = sorted(PROFILS_DIR.iterdir(), key=lambda f: f.stat().st_mtime_ns)
+        for fichier in anciens[:max(len(anciens) - MAX_PROFILS, 0)]:
+            fichier.unlink(missing_ok=True)
+
+    return nom
+
+
+def lister_profils() -> list:
+    """Retourne les profils conservés, du plus récent au plus ancien."""
+    if not PROFILS_DIR.exists():
+        return []
+    fichiers = sorted(PROFILS_DIR.iterdir(), key=lambda f: f.stat().st_mtime_ns, reverse=True)
+    return [
+        {
+            "nom": f.name,
+            "octets": f.stat().st_size,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(f.stat().st_mtime)),
+        }
+        for f in fichiers
+        if _FORMAT_NOM.match(f.name)
+    ]
+
+
+def chemin_profil(nom: str):
+    """
+    Retourne le chemin d'un profil conservé.
+
+    :raises ValueError: Si le nom est invalide ou si le profil n'existe plus.
+    """
+    if not _FORMAT_NOM.match(nom) or not (PROFILS_DIR / nom).is_file():
+        raise ValueError(f"Profil '{nom}' introuvable")
+    return PROFILS_DIR / nom
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+def profiler_cli(fonction, etiquette: str = "cli", nb_lignes: int = 25):
+    """
+    Exécute 'fonction' sous cProfile, enregistre le profil (.prof, lisible par
+    pstats ou snakeviz) et affiche les fonctions les plus coûteuses sur stderr.
+    """
+    profil = cProfile.Profile()
+    try:
+        return profil.runcall(fonction)
+    finally:
+        profil.create_stats()
+        # Même contenu que Profile.dump_stats, sans fichier intermédiaire
+        nom = enregistrer_profil(etiquette, marshal.dumps(profil.stats), extension="prof")
+
+        sortie = io.StringIO()
+        pstats.Stats(profil, stream=sortie).sort_stats("cumulative").print_stats(nb_lignes)
+        print(sortie.getvalue(), file=sys.stderr)
+        print(f"Profil enregistré dans '{PROFILS_DIR / nom}'", file=sys.stderr)
@@ -0,0 +1,181 @@
+import csv
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from core.utils import lire_date
+from services.calcul import registre_propriete
+
+CHAMPS_SORTIE = [
+    "ligne",
+    "debut",
+    "fin",
+    "nb_nuitees",
+    "plateforme",
+    "total",
+    "moyenne",
+    "remise_montant",
+    "menage_montant",
+    "erreur",
+]
+
+# Nombre de séjours traités ensemble (et envoyés à un processus)
+TAILLE_PAQUET = 1000
+
+
+def _lire_booleen(valeur) -> bool:
+    if isinstance(valeur, bool):
+        return valeur
+    return str(valeur).strip().lower() in ("1", "true", "oui", "o", "vrai", "x")
+
+
+def lire_sejours(flux):
+    """
+    Lit les séjours d'un flux texte, ligne par ligne.
+
+    Le format est détecté sur la première ligne utile : JSONL si elle commence
+    par '{', sinon CSV avec en-tête (délimiteur ';' ou ','). Colonnes
+    reconnues : debut, fin ou nb_jours, plateforme, menage.
+
+    :return: Générateur de tuples (numero_ligne, séjour) ; pour le JSONL, le
+             séjour est la ligne brute, décodée au moment du calcul.
+    """
+    numero = 0
+    premiere = ""
+    for premiere in flux:
+        numero += 1
+        if premiere.strip():
+            break
+    if not premiere.strip():
+        return
+
+    if premiere.lstrip().startswith("{"):
+        yield numero, premiere
+        for numero, ligne in enumerate(flux, start=numero + 1):
+            if ligne.strip():
+                yield numero, ligne
+        return
+
+    delimiteur = ";" if ";" in premiere else ","
+    champs = [c.strip() for c in next(csv.reader([premiere], delimiter=delimiteur))]
+    lecteur = csv.DictReader(flux, fieldnames=champs, delimiter=delimiteur)
+    for numero, ligne in enumerate(lecteur, start=numero + 1):
+        yield numero, ligne
+
+
+def chiffrer_sejour(donnees, sejour: dict, minimum_global: bool = False) -> dict:
+    """
+    Calcule un séjour décrit par un dict (debut, fin ou nb_jours, plateforme, menage).
+
+    Comme dans le CLI, 'fin' est la dernière nuitée (incluse) et 'nb_jours'
+    le nombre de nuitées. Une ligne JSON brute est acceptée. Le séjour
+    minimum du tarif d'arrivée est toujours contrôlé, le minimum général
+    seulement si minimum_global est vrai.
+
+    :param donnees: Instantané des données (services.calcul.Donnees).
+    """
+    if isinstance(sejour, str):
+        sejour = json.loads(sejour)
+    debut = lire_date(sejour["debut"])
+    if sejour.get("nb_jours") not in (None, ""):
+        fin = debut + timedelta(days=int(sejour["nb_jours"]) - 1)
+    else:
+        fin = lire_date(sejour["fin"])
+
+    nb_nuitees = (fin - debut).days + 1
+    plan = donnees.calculateur.plan
+    plan.verifier_sejour(donnees.calculateur.calendrier, debut, fin, minimum_global)
+
+    plateforme = (sejour.get("plateforme") or "").strip().lower() or None
+    total = donnees.index.total_centimes(debut, fin, plateforme)
+    devis = plan.devis(total, nb_nuitees, _lire_booleen(sejour.get("menage") or False))
+
+    return {
+        "debut": debut.strftime("%d-%m-%Y"),
+        "fin": fin.strftime("%d-%m-%Y"),
+        "nb_nuitees": nb_nuitees,
+        "plateforme": plateforme or "",
+        "total": devis.total,
+        "moyenne": devis.moyenne,
+        "remise_montant": devis.remise,
+        "menage_montant": devis.menage,
+    }
+
+
+def chiffrer_paquet(paquet, propriete: str = None, minimum_global: bool = False) -> list:
+    """
+    Calcule une liste de (numero_ligne, sejour) ; une erreur sur un séjour
+    est rapportée dans le résultat sans interrompre le paquet.
+    """
+    donnees = registre_propriete(propriete).donnees()
+    resultats = []
+    for numero, sejour in paquet:
+        try:
+            resultat = chiffrer_sejour(donnees, sejour, minimum_global)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            resultat = {"erreur": str(e) if not isinstance(e, KeyError) else f"colonne manquante : {e}"}
+        resultats.append({"ligne": numero, **resultat})
+    return resultats
+
+
+def _paquets(sejours, taille: int):
+    sejours = iter(sejours)
+    while True:
+        paquet = list(islice(sejours, taille))
+        if not paquet:
+            return
+        yield paquet
+
+
+def _resultats(sejours, propriete, minimum_global, processus, taille_paquet):
+    paquets = _paquets(sejours, taille_paquet)
+
+    if processus is None or processus <= 1:
+        for paquet in paquets:
+            yield from chiffrer_paquet(paquet, propriete, minimum_global)
+        return
+
+    # Au plus 2 paquets en attente par processus : la mémoire reste bornée
+    # et l'ordre des résultats suit celui de l'entrée.
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        en_cours = deque()
+        for paquet in paquets:
+            en_cours.append(pool.submit(chiffrer_paquet, paquet, propriete, minimum_global))
+            if len(en_cours) >= 2 * processus:
+                yield from en_cours.popleft().result()
+        while en_cours:
+            yield from en_cours.popleft().result()
+
+
+def traiter_lot(entree, sortie, format_sortie: str = "ndjson", propriete: str = None,
+                processus: int = None, minimum_global: bool = False, taille_paquet: int = TAILLE_PAQUET) -> int:
+    """
+    Lit des séjours depuis 'entree' et écrit leurs prix dans 'sortie' au fil de l'eau.
+
+    :param entree: Flux texte en CSV ou JSONL (voir lire_sejours).
+    :param sortie: Flux texte de sortie.
+    :param format_sortie: 'ndjson' (une ligne JSON par séjour) ou 'csv' (délimiteur ';').
+    :param processus: Nombre de processus de calcul (aucun pool si None ou 1).
+    :param minimum_global: Applique aussi le séjour minimum général des règles.
+    :return: Le nombre de séjours en erreur.
+    """
+    if format_sortie not in ("ndjson", "csv"):
+        raise ValueError(f"Format de sortie '{format_sortie}' inconnu (ndjson ou csv)")
+
+    writer = None
+    if format_sortie == "csv":
+        writer = csv.DictWriter(sortie, fieldnames=CHAMPS_SORTIE, delimiter=";", extrasaction="ignore")
+        writer.writeheader()
+
+    nb_erreurs = 0
+    resultats = _resultats(lire_sejours(entree), propriete, minimum_global, processus, taille_paquet)
+    for resultat in resultats:
+        if "erreur" in resultat:
+            nb_erreurs += 1
+        if writer:
+            writer.writerow(resultat)
+        else:
+            sortie.write(json.dumps(resultat, ensure_ascii=False) + "\n")
+    sortie.flush()
+    return nb_erreurs
@@ -93,9 +93,29 @@ document.getElementById('calc-form').addEventListener('submit', async (e) => {
     }
 });
 
+// Dates du format colonnes : jour J (UTC) à partir d'une date ISO
+const JOURS = ['dimanche', 'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi'];
+
+function ajouterJours(iso, n) {
+    const [a, m, j] = iso.split('-').map(Number);
+    return new Date(Date.UTC(a, m - 1, j + n));
+}
+
+function formaterDate(d) {
+    const jj = String(d.getUTCDate()).padStart(2, '0');
+    const mm = String(d.getUTCMonth() + 1).padStart(2, '0');
+    return `${jj}-${mm}-${d.getUTCFullYear()}`;
+}
+
+function formaterDateJour(d) {
+    // Même présentation que formater_date_jour côté serveur
+    return `${JOURS[d.getUTCDay()].padEnd(9, ' ')} ${formaterDate(d)}`;
+}
+
 async function afficherTableau(formData) {
     const params = new URLSearchParams(Object.fromEntries(formData));
     params.set('menage', document.getElementById('menage').checked ? 'true' : 'false');
+    params.set('format', 'colonnes');
     const plate = formData.get('plateforme');
 
     const response = await fetch(`/tableau?${params.toString()}`);
@@ -103,20 +123,32 @@ async function afficherTableau(formData) {
 
     const tbody = document.querySelector('#tarifs-table tbody');
     tbody.innerHTML = '';
-    data.forEach(row => {
+    let decalage = 0;
+    data.periode.forEach((periode, k) => {
+        const debut = formaterDate(ajouterJours(data.date_debut, decalage));
+        decalage += data.nb_jours[k];
+        const fin = formaterDate(ajouterJours(data.date_debut, decalage - 1));
+        const prix7j = data.prix_semaine_7j[k];
         const tr = document.createElement('tr');
-        tr.innerHTML = `<td>${row.debut}</td><td>${row.fin}</td><td>${row.periode}</td><td>${row.prix_semaine_unit} €</td><td>${row.prix_weekend_unit} €</td><td>${row.prix_semaine_7j}</td>`;
+        tr.innerHTML = `<td>${debut}</td><td>${fin}</td><td>${periode}</td><td>${data.prix_semaine_unit[k].toFixed(2)} €</td><td>${data.prix_weekend_unit[k].toFixed(2)} €</td><td>${prix7j === null ? 'trop court' : prix7j.toFixed(2)}</td>`;
         tbody.appendChild(tr);
     });
 
     const downloadBtn = document.querySelector('.btn-download');
-    downloadBtn.href = `/download-csv${plate ? '?plateforme=' + plate : ''}`;
+    // Le CSV est généré à la demande avec les mêmes paramètres que le tableau
+    const csvParams = new URLSearchParams({
+        date_debut: formData.get('date_debut'),
+        date_fin: formData.get('date_fin'),
+    });
+    if (plate) csvParams.set('plateforme', plate);
+    downloadBtn.href = `/download-csv?${csvParams.toString()}`;
     document.getElementById('results-table').classList.remove('hidden');
 }
 
 async function afficherDetail(formData) {
     const params = new URLSearchParams(Object.fromEntries(formData));
     params.set('menage', document.getElementById('menage').checked ? 'true' : 'false');
+    params.set('format', 'colonnes');
     const response = await fetch(`/detail?${params.toString()}`);
     const data = await response.json();
 
@@ -124,6 +156,9 @@ async function afficherDetail(formData) {
     const lignes = [
         `Nuitées         : ${data.total_nuitees.toFixed(2)} € (${data.nb_nuitees} nuits · moy. ${data.moyenne.toFixed(2)} €/nuit)`,
     ];
+    if (data.remise_montant > 0) {
+        lignes.push(`Remise durée    : -${data.remise_montant.toFixed(2)} €`);
+    }
     if (data.menage_montant > 0) {
         lignes.push(`Frais de ménage : ${data.menage_montant.toFixed(2)} €`);
     }
@@ -135,13 +170,12 @@ async function afficherDetail(formData) {
 
     const list = document.getElementById('daily-list');
     list.innerHTML = '';
-    data.details.forEach(day => {
-        if (day[0] === 'Frais de ménage') return; // affiché dans le récapitulatif
+    data.prix_centimes.forEach((centimes, k) => {
         const li = document.createElement('li');
-        const prixLabel = day[1].toFixed(2).padStart(7, ' ');
-        li.innerText = `${day[0]} : ${prixLabel} €`;
+        const prixLabel = (centimes / 100).toFixed(2).padStart(7, ' ');
+        li.innerText = `${formaterDateJour(ajouterJours(data.date_debut, k))} : ${prixLabel} €`;
         list.appendChild(li);
     });
 
     document.getElementById('results-detail').classList.remove('hidden');
-}
\ No newline at end of file
+}
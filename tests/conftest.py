@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Les tests importent core/ et services/ depuis la racine du dépôt
+RACINE = Path(__file__).resolve().parent.parent
+if str(RACINE) not in sys.path:
+    sys.path.insert(0, str(RACINE))
+
+# Copie figée de data/prix.csv et data/periode.csv : les tableaux de référence
+# de fixtures/tableaux ont été produits à partir de ces fichiers
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.grille_tarifs import GrilleTarifs
+
+
+@pytest.fixture(scope="session")
+def donnees():
+    """Grille et calendrier des fixtures, chargés depuis les CSV."""
+    grille = GrilleTarifs.depuis_fichier(str(FIXTURES / "prix.csv"))
+    calendrier = CalendrierTarifaire.depuis_fichier(str(FIXTURES / "periode.csv"), grille)
+    return grille, calendrier
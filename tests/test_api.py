@@ -0,0 +1,176 @@
+"""
+Réponses de l'API sur les données du dossier data.
+"""
+import json
+import shutil
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from core import index_prix
+from services import calcul, profilage
+from services.calcul import RegistreCalculateur
+
+client = TestClient(app.app)
+
+JETON = "jeton-de-test"
+
+
+@pytest.fixture
+def registre_temporaire(tmp_path, monkeypatch):
+    """Propriété par défaut servie depuis une copie des fixtures, modifiable."""
+    monkeypatch.setattr(calcul, "PARTAGE_ACTIF", False)
+    for nom in ("prix.csv", "periode.csv"):
+        shutil.copy(calcul.BASE_DIR / "tests" / "fixtures" / nom, tmp_path / nom)
+    reg = RegistreCalculateur(tmp_path)
+    monkeypatch.setattr(calcul, "registre", reg)
+    return reg
+
+
+@pytest.fixture(params=["numpy", "python"])
+def mode_lot(request, monkeypatch):
+    """Calcul par lot vectorisé, ou boucle Python quand NumPy est absent."""
+    if request.param == "python":
+        monkeypatch.setattr(index_prix, "np", None)
+    elif index_prix.np is None:
+        pytest.skip("NumPy n'est pas installé")
+    return request.param
+
+
+def test_download_csv():
+    reponse = client.get("/download-csv", params={"date_debut": "2026-01-05", "date_fin": "2026-01-19",
+                                                  "plateforme": "booking"})
+    assert reponse.status_code == 200
+    assert reponse.headers["content-type"].startswith("text/csv")
+    assert reponse.content.startswith(b"\xef\xbb\xbfdebut;fin;periode;")
+
+
+def test_download_csv_hors_calendrier():
+    reponse = client.get("/download-csv", params={"date_debut": "2020-01-05", "date_fin": "2020-01-19"})
+    assert reponse.status_code == 400
+    assert "Aucune période" in reponse.json()["detail"]
+
+
+# ----------------------------------------------------------------------
+# Modification des périodes
+# ----------------------------------------------------------------------
+def test_periodes_sans_jeton_configure(registre_temporaire, monkeypatch):
+    monkeypatch.delenv("TARIFS_JETON_ADMIN", raising=False)
+    reponse = client.patch("/periodes", json={"operation": "scinder", "jour": "2026-02-01"},
+                           headers={"Authorization": f"Bearer {JETON}"})
+    assert reponse.status_code == 403
+    assert not (registre_temporaire.fichier_journal).exists()
+
+
+@pytest.mark.parametrize("entete", [None, "Bearer mauvais", f"Basic {JETON}", JETON])
+def test_periodes_jeton_refuse(registre_temporaire, monkeypatch, entete):
+    monkeypatch.setenv("TARIFS_JETON_ADMIN", JETON)
+    entetes = {"Authorization": entete} if entete else {}
+    for methode, corps in (("PATCH", {"operation": "scinder", "jour": "2026-02-01"}),
+                           ("PUT", {"date_debut": "2027-03-08", "date_fin": "2027-03-31", "id_tarif": "Basse_2027"})):
+        reponse = client.request(methode, "/periodes", json=corps, headers=entetes)
+        assert reponse.status_code == 401
+        assert reponse.headers["www-authenticate"] == "Bearer"
+    assert not (registre_temporaire.fichier_journal).exists()
+
+
+def test_periodes_modifiees(registre_temporaire, monkeypatch):
+    monkeypatch.setenv("TARIFS_JETON_ADMIN", JETON)
+    entetes = {"Authorization": f"Bearer {JETON}"}
+
+    reponse = client.patch("/periodes", json={"operation": "scinder", "jour": "2026-02-01",
+                                              "id_tarif": "Haute_2026"}, headers=entetes)
+    assert reponse.status_code == 200
+    assert reponse.json()["periodes"] == [{"date_debut": "2026-02-01", "date_fin": "2026-04-03",
+                                           "id_tarif": "Haute_2026"}]
+
+    reponse = client.put("/periodes", json={"date_debut": "2027-03-08", "date_fin": "2027-03-31",
+                                            "id_tarif": "Basse_2027"}, headers=entetes)
+    assert reponse.status_code == 200
+
+    # Modification invalide : 400 et rien de journalisé
+    reponse = client.put("/periodes", json={"date_debut": "2027-05-01", "date_fin": "2027-05-31",
+                                            "id_tarif": "Basse_2027"}, headers=entetes)
+    assert reponse.status_code == 400
+
+    liste = client.get("/periodes").json()
+    assert {"date_debut": "2026-01-04", "date_fin": "2026-01-31", "id_tarif": "Basse_2026"} in liste
+    assert liste[-1] == {"date_debut": "2027-03-08", "date_fin": "2027-03-31", "id_tarif": "Basse_2027"}
+    assert len(registre_temporaire.fichier_journal.read_text().splitlines()) == 2
+
+
+# ----------------------------------------------------------------------
+# Devis par lot
+# ----------------------------------------------------------------------
+def test_quotes(registre_temporaire, mode_lot):
+    sejours = [
+        {"date_debut": "2026-01-05", "date_fin": "2026-01-12"},
+        {"date_debut": "14/07/2026", "date_fin": "28/07/2026"},
+        {"date_debut": "2026-03-01", "date_fin": "2026-03-03"},
+    ]
+    reponse = client.post("/quotes", params={"plateforme": "airbnb", "menage": "true"},
+                          content=json.dumps(sejours), headers={"content-type": "application/json"})
+    assert reponse.status_code == 200
+    lignes = reponse.json()
+    assert [l["date_debut"] for l in lignes] == ["2026-01-05", "2026-07-14", "2026-03-01"]
+
+    # Mêmes totaux que le plan de tarification, nuitée par nuitée
+    donnees = registre_temporaire.donnees()
+    plan, calendrier = donnees.calculateur.plan, donnees.calculateur.calendrier
+    for ligne in lignes:
+        debut, fin = date.fromisoformat(ligne["date_debut"]), date.fromisoformat(ligne["date_fin"])
+        nb_nuitees = (fin - debut).days
+        centimes = plan.total_centimes(calendrier, debut, fin - timedelta(days=1), "airbnb")
+        centimes -= plan.remise_centimes(centimes, nb_nuitees)
+        assert ligne["nb_nuitees"] == nb_nuitees
+        assert ligne["total"] == pytest.approx(centimes / 100 + plan.frais_menage(nb_nuitees))
+        assert ligne["moyenne"] == pytest.approx(centimes / 100 / nb_nuitees)
+
+
+def test_quotes_csv(registre_temporaire, mode_lot):
+    corps = "date_debut,date_fin\n05-01-2026,12-01-2026\n2026-01-05,2026-01-12\n"
+    reponse = client.post("/quotes", content=corps.encode(), headers={"content-type": "text/csv"})
+    assert reponse.status_code == 200
+    premiere, seconde = reponse.json()
+    assert premiere == seconde
+    assert premiere["total"] == pytest.approx(
+        registre_temporaire.obtenir().calculer_total(date(2026, 1, 5), date(2026, 1, 11)))
+
+
+@pytest.mark.parametrize("sejours, message", [
+    ([{"date_debut": "2026-01-05", "date_fin": "32/01/2026"}], "Séjours illisibles"),
+    ([{"date_debut": "2026-01-05"}], "Séjours illisibles"),
+    ([{"date_debut": "2026-01-05", "date_fin": "2026-01-12"},
+      {"date_debut": "2031-01-05", "date_fin": "2031-01-12"}], "Séjour n°2 hors du calendrier"),
+])
+def test_quotes_refuses(registre_temporaire, mode_lot, sejours, message):
+    reponse = client.post("/quotes", content=json.dumps(sejours), headers={"content-type": "application/json"})
+    assert reponse.status_code == 400
+    assert message in reponse.json()["detail"]
+
+
+# ----------------------------------------------------------------------
+# Profils de /debug
+# ----------------------------------------------------------------------
+def test_profils_reserves_a_l_administration(tmp_path, monkeypatch):
+    monkeypatch.setattr(profilage, "PROFILAGE_ACTIF", True)
+    monkeypatch.setattr(profilage, "PROFILS_DIR", tmp_path)
+    nom = profilage.enregistrer_profil("tableau", "app.py:tableau 3\n")
+
+    monkeypatch.delenv("TARIFS_JETON_ADMIN", raising=False)
+    for chemin in ("/debug/profiles", f"/debug/profiles/{nom}"):
+        assert client.get(chemin, headers={"Authorization": f"Bearer {JETON}"}).status_code == 403
+
+    monkeypatch.setenv("TARIFS_JETON_ADMIN", JETON)
+    for chemin in ("/debug/profiles", f"/debug/profiles/{nom}"):
+        for entetes in ({}, {"Authorization": "Bearer mauvais"}):
+            reponse = client.get(chemin, headers=entetes)
+            assert reponse.status_code == 401
+            assert reponse.headers["www-authenticate"] == "Bearer"
+
+    entetes = {"Authorization": f"Bearer {JETON}"}
+    assert [p["nom"] for p in client.get("/debug/profiles", headers=entetes).json()] == [nom]
+    assert client.get(f"/debug/profiles/{nom}", headers=entetes).text == "app.py:tableau 3\n"
+    assert client.get("/debug/profiles/absent.txt", headers=entetes).status_code == 404
@@ -0,0 +1,89 @@
+"""
+Format binaire du calendrier : un fichier compilé puis projeté en mémoire
+donne les mêmes prix que les CSV, et un fichier incohérent est refusé.
+"""
+import os
+import shutil
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from core import binaire
+from core.calculateur import CalculateurLocation
+from core.index_prix import IndexPrix
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+@pytest.fixture
+def fichiers(tmp_path):
+    """Chemins (prix.csv, periode.csv, calendrier.bin) d'un dossier temporaire."""
+    for nom in ("prix.csv", "periode.csv"):
+        shutil.copy(FIXTURES / nom, tmp_path / nom)
+    return str(tmp_path / "prix.csv"), str(tmp_path / "periode.csv"), str(tmp_path / binaire.NOM_FICHIER)
+
+
+def cumuls(grille, calendrier) -> dict:
+    index = IndexPrix(calendrier, grille)
+    return {plateforme: list(index.cumuls_centimes(plateforme)) for plateforme in [None, *index.commissions]}
+
+
+def test_aller_retour(donnees, fichiers):
+    grille_csv, calendrier_csv = donnees
+    fichier_prix, fichier_periodes, fichier_binaire = fichiers
+    binaire.compiler(fichier_prix, fichier_periodes, fichier_binaire)
+    assert binaire.binaire_a_jour(fichier_prix, fichier_periodes, fichier_binaire)
+
+    grille, calendrier = binaire.charger(fichier_binaire)
+    assert list(grille.tarifs) == list(grille_csv.tarifs)
+    for id_tarif, tarif in grille.tarifs.items():
+        attendu = grille_csv.tarifs[id_tarif]
+        assert (tarif.semaine_cents, tarif.weekend_cents) == (attendu.semaine_cents, attendu.weekend_cents)
+    assert [(p.debut, p.fin, p.id_tarif) for p in calendrier.periodes] == \
+        [(p.debut, p.fin, p.id_tarif) for p in calendrier_csv.periodes]
+    assert cumuls(grille, calendrier) == cumuls(grille_csv, calendrier_csv)
+
+    projete = CalculateurLocation(calendrier, grille)
+    reference = CalculateurLocation(calendrier_csv, grille_csv)
+    debut = calendrier_csv.periodes[0].debut
+    for decalage, nb_nuitees in ((0, 7), (45, 21), (180, 3), (300, 60)):
+        arrivee = debut + timedelta(days=decalage)
+        fin = arrivee + timedelta(days=nb_nuitees - 1)
+        assert projete.calculer_total(arrivee, fin) == reference.calculer_total(arrivee, fin)
+
+
+def test_csv_plus_recent_que_le_binaire(fichiers):
+    fichier_prix, fichier_periodes, fichier_binaire = fichiers
+    binaire.compiler(fichier_prix, fichier_periodes, fichier_binaire)
+    date_binaire = os.stat(fichier_binaire).st_mtime_ns
+    os.utime(fichier_periodes, ns=(date_binaire + 10 ** 9, date_binaire + 10 ** 9))
+    assert not binaire.binaire_a_jour(fichier_prix, fichier_periodes, fichier_binaire)
+
+
+def test_indice_hors_table(donnees, fichiers):
+    fichier_prix, fichier_periodes, fichier_binaire = fichiers
+    binaire.compiler(fichier_prix, fichier_periodes, fichier_binaire)
+    # Le dernier u16 du fichier est l'indice de tarif de la dernière période
+    with open(fichier_binaire, "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"\xff\xff")
+
+    with pytest.raises(ValueError, match="Indice de tarif hors de la table"):
+        binaire.charger(fichier_binaire)
+
+    # Au chargement, le fichier refusé laisse la place aux CSV
+    grille, calendrier = binaire.charger_donnees(fichier_prix, fichier_periodes, fichier_binaire)
+    _, calendrier_csv = donnees
+    assert calendrier.periode_pour_jour(date(2027, 3, 1)).id_tarif == \
+        calendrier_csv.periode_pour_jour(date(2027, 3, 1)).id_tarif
+    assert len(calendrier.periodes) == len(calendrier_csv.periodes)
+
+
+def test_fichier_tronque(fichiers):
+    fichier_prix, fichier_periodes, fichier_binaire = fichiers
+    binaire.compiler(fichier_prix, fichier_periodes, fichier_binaire)
+    with open(fichier_binaire, "r+b") as f:
+        f.truncate(os.path.getsize(fichier_binaire) - 1)
+    with pytest.raises(ValueError, match="tronqué"):
+        binaire.charger(fichier_binaire)
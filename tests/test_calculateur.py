@@ -0,0 +1,93 @@
+"""
+Le chiffrage par segment (calculer_total, PlanTarifaire.total_centimes) doit
+donner exactement la somme du détail jour par jour, pour le prix net comme
+pour chaque plateforme, sur des plages tirées au hasard (graine fixe).
+"""
+import random
+from datetime import timedelta
+
+import pytest
+
+from core.calculateur import CalculateurLocation
+from core.regles import MENAGE, Regles, plan_par_defaut
+
+GRAINE = 20260105
+NB_PLAGES = 500
+
+# Règles qui éloignent les prix jour par jour du simple couple semaine/week-end
+REGLES_VARIEES = {
+    "jours_weekend": ["vendredi", "samedi"],
+    "prix_jours": {"Basse_2026": {"dimanche": 52.5}, "Haute_2026": {"mercredi": 71.25}},
+    "commissions": {"airbnb": 0.036, "booking": 0.164, "abritel": 0.08, "gites": 0.03},
+}
+
+
+def plages(calendrier, nb=NB_PLAGES, graine=GRAINE):
+    """Plages (début, fin incluse) aléatoires contenues dans le calendrier."""
+    aleatoire = random.Random(graine)
+    premier = calendrier.periodes[0].debut
+    nb_jours = (calendrier.periodes[-1].fin - premier).days + 1
+    for _ in range(nb):
+        debut = premier + timedelta(days=aleatoire.randrange(nb_jours))
+        reste = (calendrier.periodes[-1].fin - debut).days
+        # Surtout des séjours courts, quelques-uns sur toute l'année
+        longueur = aleatoire.choice((aleatoire.randint(0, 30), aleatoire.randint(0, reste)))
+        yield debut, debut + timedelta(days=min(longueur, reste))
+
+
+def somme_jours(plan, calendrier, date_debut, date_fin, plateforme=None):
+    """Total en centimes en parcourant la plage jour par jour."""
+    total = 0
+    jour = date_debut
+    while jour <= date_fin:
+        total += plan.prix_jours(calendrier.periode_pour_jour(jour).id_tarif, plateforme)[jour.weekday()]
+        jour += timedelta(days=1)
+    return total
+
+
+@pytest.fixture(scope="module", params=["defaut", "variees"])
+def calculateur(request, donnees):
+    grille, calendrier = donnees
+    if request.param == "defaut":
+        plan = plan_par_defaut(grille)
+    else:
+        plan = Regles.depuis_dict(REGLES_VARIEES).compiler(grille)
+    return CalculateurLocation(calendrier, grille, plan)
+
+
+def test_total_egal_somme_du_detail(calculateur):
+    for date_debut, date_fin in plages(calculateur.calendrier):
+        details, total = calculateur.calculer(date_debut, date_fin)
+        assert len(details) == (date_fin - date_debut).days + 1
+        assert round(sum(montant for _, montant in details), 2) == total
+        assert calculateur.calculer_total(date_debut, date_fin) == total
+
+
+def test_total_par_plateforme(calculateur):
+    plan = calculateur.plan
+    calendrier = calculateur.calendrier
+    for plateforme in (None, *plan.commissions):
+        for date_debut, date_fin in plages(calendrier, graine=GRAINE + 1):
+            attendu = somme_jours(plan, calendrier, date_debut, date_fin, plateforme)
+            assert plan.total_centimes(calendrier, date_debut, date_fin, plateforme) == attendu, \
+                (plateforme, date_debut, date_fin)
+
+
+def test_plage_vide(calculateur):
+    jour = calculateur.calendrier.periodes[0].debut
+    assert calculateur.calculer(jour, jour - timedelta(days=1)) == ([], 0)
+    assert calculateur.calculer_total(jour, jour - timedelta(days=1)) == 0
+
+
+def test_frais_de_menage(donnees):
+    grille, _ = donnees
+    # Sans regles.json, le forfait historique : 25 € jusqu'à 2 nuitées, 40 € au-delà
+    plan = plan_par_defaut(grille)
+    assert [plan.frais_menage(n) for n in (1, 2, 3, 14)] == [25.0, 25.0, 40.0, 40.0]
+    assert plan.devis(10000, 2, True).menage == MENAGE["montant_court"]
+
+    # Une clé absente de "menage" garde sa valeur par défaut
+    plan = Regles.depuis_dict({"menage": {"montant": 60}}).compiler(grille)
+    assert [plan.frais_menage(n) for n in (2, 3)] == [25.0, 60.0]
+    with pytest.raises(ValueError):
+        Regles.depuis_dict({"menage": ["montant", 60]})
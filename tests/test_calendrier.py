@@ -0,0 +1,101 @@
+"""
+Lecture de periode.csv : toutes les erreurs d'un fichier mal formé sont
+rapportées ensemble, chacune avec son numéro de ligne.
+"""
+from datetime import date
+
+import pytest
+
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.utils import LecteurDates
+
+ENTETE = "date_debut;date_fin;id\n"
+
+MAL_FORME = ENTETE + (
+    "01-01-2026;31-01-2026;Basse_2026\n"      # 2
+    "01-02-2026;30-02-2026;Basse_2026\n"      # 3 : date impossible
+    "01-03-2026;31-03-2026;Inconnu\n"         # 4 : tarif inconnu
+    "01-04-2026;30-04-2026\n"                 # 5 : colonne manquante
+    "01-05-2026;31-05-2026;Haute_2026\n"      # 6 : trou dû à la ligne 5, non signalé
+    "03-06-2026;30-06-2026;Haute_2026\n"      # 7 : trou
+    "2026-07-01;2026-07-31;Haute_2026\n"      # 8 : format différent de la première date
+    "\n"                                      # 9 : ligne vide ignorée
+    "25-06-2026;31-07-2026;Haute_2026\n"      # 10 : chevauchement, même après une ligne invalide
+    "10-09-2026;01-09-2026;Basse_2026\n"      # 11 : fin avant le début
+)
+
+
+def lire(tmp_path, contenu, grille):
+    fichier = tmp_path / "periode.csv"
+    fichier.write_text(contenu, encoding="utf-8")
+    return CalendrierTarifaire.depuis_fichier(str(fichier), grille)
+
+
+def erreurs(tmp_path, contenu, grille) -> list:
+    with pytest.raises(ValueError) as e:
+        lire(tmp_path, contenu, grille)
+    return str(e.value).splitlines()
+
+
+def test_toutes_les_erreurs_avec_leur_ligne(tmp_path, donnees):
+    grille, _ = donnees
+    lignes = erreurs(tmp_path, MAL_FORME, grille)
+    assert lignes[0] == f"7 erreurs dans {tmp_path / 'periode.csv'} :"
+    assert lignes[1:] == [
+        "  ligne 3 : Format de date invalide : '30-02-2026'. Utilisez JJ-MM-AAAA, JJ/MM/AAAA ou JJ.MM.AAAA",
+        "  ligne 4 : Tarif 'Inconnu' absent de prix.csv",
+        "  ligne 5 : Colonnes manquantes",
+        "  ligne 7 : Périodes non consécutives : 2026-05-31 -> 2026-06-03",
+        "  ligne 8 : Format de date invalide : '2026-07-01'. Utilisez JJ-MM-AAAA, JJ/MM/AAAA ou JJ.MM.AAAA",
+        "  ligne 10 : Périodes non consécutives : 2026-06-30 -> 2026-06-25",
+        "  ligne 11 : La date de fin est antérieure à la date de début",
+    ]
+
+
+def test_erreur_unique(tmp_path, donnees):
+    grille, _ = donnees
+    contenu = ENTETE + "01-01-2026;31-01-2026;Basse_2026\n01-02-2026;28-02-2026;Inconnu\n"
+    assert erreurs(tmp_path, contenu, grille) == ["Ligne 3 : Tarif 'Inconnu' absent de prix.csv"]
+
+
+def test_lignes_dans_le_desordre(tmp_path, donnees):
+    grille, _ = donnees
+    # Dans le désordre, les jonctions sont vérifiées après le tri, sans numéro de ligne
+    contenu = ENTETE + (
+        "01-03-2026;31-03-2026;Basse_2026\n"
+        "01-01-2026;31-01-2026;Basse_2026\n"
+        "01-02-2026;27-02-2026;Inconnu\n"
+    )
+    assert erreurs(tmp_path, contenu, grille)[1:] == [
+        "  ligne 4 : Tarif 'Inconnu' absent de prix.csv",
+        "Périodes non consécutives : 2026-02-27 -> 2026-03-01",
+    ]
+    contenu = ENTETE + "01-02-2026;28-02-2026;Basse_2026\n01-01-2026;31-01-2026;Basse_2026\n"
+    assert [p.debut for p in lire(tmp_path, contenu, grille).periodes] == [date(2026, 1, 1), date(2026, 2, 1)]
+
+
+def test_colonnes_absentes(tmp_path, donnees):
+    grille, _ = donnees
+    with pytest.raises(ValueError, match="Colonnes 'date_debut', 'date_fin' et 'id' attendues"):
+        lire(tmp_path, "debut;fin;id\n01-01-2026;31-01-2026;Basse_2026\n", grille)
+
+
+def test_format_iso(tmp_path, donnees):
+    grille, _ = donnees
+    contenu = ENTETE + "2026-01-01;2026-01-31;Basse_2026\n2026/02/01;2026/02/28;Haute_2026\n"
+    calendrier = lire(tmp_path, contenu, grille)
+    assert calendrier.periode_pour_jour(date(2026, 2, 14)).id_tarif == "Haute_2026"
+
+    contenu = ENTETE + "2026-01-01;2026-01-31;Basse_2026\n01-02-2026;28-02-2026;Haute_2026\n"
+    assert erreurs(tmp_path, contenu, grille) == [
+        "Ligne 3 : Format de date invalide : '01-02-2026'. Le fichier utilise le format AAAA-MM-JJ"
+    ]
+
+
+def test_lecteur_dates():
+    lecteur = LecteurDates()
+    assert lecteur(" 14/07/2026 ") == date(2026, 7, 14)
+    assert lecteur.ordinal("1.8.2026") == date(2026, 8, 1).toordinal()
+    for chaine in ("2026-07-14", "14-07/2026", "31-04-2026", ""):
+        with pytest.raises(ValueError, match="Format de date invalide"):
+            lecteur(chaine)
@@ -0,0 +1,248 @@
+"""
+Modifications du calendrier à chaud : opérations sur les périodes, journal
+rejoué au chargement, compactage et mise à l'écart d'un journal qui ne
+s'applique plus. Après chaque étape, les prix doivent être ceux d'un
+chargement à froid des mêmes fichiers.
+"""
+import json
+import multiprocessing
+import random
+import shutil
+from datetime import date, timedelta
+
+import pytest
+
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.index_prix import IndexPrix
+from services import calcul, editions
+from services.calcul import RegistreCalculateur
+
+FIXTURES = calcul.BASE_DIR / "tests" / "fixtures"
+GRAINE = 20260714
+
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    """Dossier de propriété avec les prix et périodes des fixtures."""
+    monkeypatch.setattr(calcul, "PARTAGE_ACTIF", False)
+    for nom in ("prix.csv", "periode.csv"):
+        shutil.copy(FIXTURES / nom, tmp_path / nom)
+    return tmp_path
+
+
+def periodes(calendrier) -> list:
+    return [(p.debut, p.fin, p.id_tarif) for p in calendrier.periodes]
+
+
+def prix(donnees) -> dict:
+    """Horizon et sommes cumulées de chaque variante de l'index."""
+    index = donnees.index
+    return {
+        "horizon": (index.premier_jour, index.dernier_jour),
+        **{plateforme: list(index.cumuls_centimes(plateforme)) for plateforme in [None, *index.commissions]},
+    }
+
+
+def edition_aleatoire(aleatoire, calendrier, ids) -> dict:
+    premier, dernier = calendrier.periodes[0].debut, calendrier.periodes[-1].fin
+    jour = premier + timedelta(days=aleatoire.randint(0, (dernier - premier).days))
+    operation = aleatoire.choice(["scinder", "fusionner", "retarifer", "ajouter"])
+    if operation == "ajouter":
+        # Parfois avec un trou ou un chevauchement, refusés par les jonctions
+        debut = dernier + timedelta(days=aleatoire.choice([1, 1, 1, 0, 2]))
+        return {"operation": operation, "date_debut": debut.isoformat(),
+                "date_fin": (debut + timedelta(days=aleatoire.randint(0, 40))).isoformat(),
+                "id_tarif": aleatoire.choice(ids)}
+    edition = {"operation": operation, "jour": jour.isoformat(), "id_tarif": aleatoire.choice(ids)}
+    if operation != "retarifer" and aleatoire.random() < 0.5:
+        del edition["id_tarif"]
+    return edition
+
+
+# ----------------------------------------------------------------------
+# Opérations sur le calendrier
+# ----------------------------------------------------------------------
+def test_operations(donnees):
+    grille, calendrier = donnees
+    calendrier = calendrier.copie()
+
+    assert calendrier.scinder(date(2026, 2, 1), "Haute_2026") == (date(2026, 2, 1), date(2026, 4, 3))
+    assert calendrier.periode_pour_jour(date(2026, 1, 31)).id_tarif == "Basse_2026"
+    assert calendrier.periode_pour_jour(date(2026, 2, 1)).id_tarif == "Haute_2026"
+
+    assert calendrier.retarifer(date(2026, 3, 1), "Moyenne_2026") == (date(2026, 2, 1), date(2026, 4, 3))
+    assert calendrier.fusionner(date(2026, 1, 10)) == (date(2026, 1, 4), date(2026, 4, 3))
+    assert calendrier.periode_pour_jour(date(2026, 3, 1)).id_tarif == "Basse_2026"
+
+    fin = calendrier.periodes[-1].fin
+    assert calendrier.ajouter(fin + timedelta(days=1), fin + timedelta(days=30), "Basse_2027")[1] == fin + timedelta(days=30)
+    calendrier._verifier_consecutivite()
+
+
+@pytest.mark.parametrize("operation, arguments", [
+    ("scinder", (date(2026, 1, 4),)),                                     # déjà un premier jour
+    ("scinder", (date(2020, 1, 1),)),                                     # hors calendrier
+    ("fusionner", (date(2027, 3, 1),)),                                   # dernière période
+    ("ajouter", (date(2027, 3, 9), date(2027, 3, 31), "Basse_2027")),     # trou
+    ("ajouter", (date(2027, 3, 7), date(2027, 3, 31), "Basse_2027")),     # chevauchement
+    ("ajouter", (date(2027, 3, 20), date(2027, 3, 10), "Basse_2027")),    # fin avant début
+])
+def test_operation_refusee_laisse_le_calendrier_intact(donnees, operation, arguments):
+    _, calendrier = donnees
+    calendrier = calendrier.copie()
+    avant = periodes(calendrier)
+    with pytest.raises(ValueError):
+        getattr(calendrier, operation)(*arguments)
+    assert periodes(calendrier) == avant
+    assert calendrier._debuts == [p.debut_ord for p in calendrier.periodes]
+
+
+def test_jonctions_locales_suffisent(donnees):
+    # _remplacer ne vérifie que les voisines : le calendrier entier doit
+    # pourtant rester consécutif, et l'index partiel égal à un index neuf
+    grille, calendrier = donnees
+    calendrier = calendrier.copie()
+    index = IndexPrix(calendrier, grille)
+    ids = list(grille.tarifs)
+    aleatoire = random.Random(GRAINE)
+    nb_appliquees = 0
+    for _ in range(300):
+        edition = editions.normaliser_edition(edition_aleatoire(aleatoire, calendrier, ids))
+        avant = periodes(calendrier)
+        try:
+            debut, fin = editions.appliquer_edition(calendrier, grille, edition)
+        except ValueError:
+            assert periodes(calendrier) == avant
+            continue
+        nb_appliquees += 1
+        CalendrierTarifaire(list(calendrier.periodes))._verifier_consecutivite()
+        assert calendrier._debuts == [p.debut_ord for p in calendrier.periodes]
+        index.rafraichir(calendrier, debut, fin)
+        neuf = IndexPrix(calendrier, grille)
+        assert index._prix == neuf._prix and index._cumuls == neuf._cumuls
+    assert nb_appliquees > 100
+
+
+def test_tarif_inconnu(donnees):
+    grille, calendrier = donnees
+    calendrier = calendrier.copie()
+    avant = periodes(calendrier)
+    with pytest.raises(ValueError):
+        editions.appliquer_edition(calendrier, grille, {"operation": "retarifer", "jour": "2026-03-01",
+                                                        "id_tarif": "Inconnu"})
+    assert periodes(calendrier) == avant
+
+
+def test_normaliser_edition():
+    assert editions.normaliser_edition({"operation": "scinder", "jour": "14-07-2026", "autre": 1}) == \
+        {"operation": "scinder", "jour": "2026-07-14"}
+    for corps in ({"operation": "deplacer"}, {"operation": "retarifer", "jour": "2026-07-14"}, []):
+        with pytest.raises(ValueError):
+            editions.normaliser_edition(corps)
+
+
+# ----------------------------------------------------------------------
+# Journal, rechargement et compactage
+# ----------------------------------------------------------------------
+def test_journal_rejoue_et_compacte(dossier, monkeypatch):
+    monkeypatch.setattr(editions, "SEUIL_COMPACTAGE", 1000)
+    reg = RegistreCalculateur(dossier, intervalle=0)
+    ids = list(reg.obtenir().grille_tarifs.tarifs)
+    aleatoire = random.Random(GRAINE)
+    nb_appliquees = 0
+    for _ in range(60):
+        donnees = reg.donnees()
+        edition = editions.normaliser_edition(
+            edition_aleatoire(aleatoire, donnees.calculateur.calendrier, ids))
+        try:
+            nouvelles, _ = reg.modifier(edition)
+        except ValueError:
+            assert reg.donnees() is donnees
+            continue
+        nb_appliquees += 1
+        assert nouvelles.version != donnees.version
+    assert nb_appliquees > 20
+    assert len(editions.lire_journal(dossier / editions.NOM_JOURNAL)) == nb_appliquees
+
+    # Chargement à froid : periode.csv puis le journal rejoué
+    froid = RegistreCalculateur(dossier).donnees()
+    courant = reg.donnees()
+    assert periodes(froid.calculateur.calendrier) == periodes(courant.calculateur.calendrier)
+    assert prix(froid) == prix(courant)
+    assert froid.version == courant.version
+
+    # Compactage : periode.csv réécrit, journal vidé, mêmes prix
+    reg.compacter()
+    assert not (dossier / editions.NOM_JOURNAL).exists()
+    froid = RegistreCalculateur(dossier).donnees()
+    assert periodes(froid.calculateur.calendrier) == periodes(courant.calculateur.calendrier)
+    assert prix(froid) == prix(reg.donnees())
+    assert froid.version == reg.version
+    assert reg.statistiques()["nb_compactages"] == 1
+
+
+def test_compactage_automatique(dossier, monkeypatch):
+    monkeypatch.setattr(editions, "SEUIL_COMPACTAGE", 3)
+    reg = RegistreCalculateur(dossier, intervalle=0)
+    for jour in ("2026-02-01", "2026-03-01", "2026-05-01"):
+        reg.modifier(editions.normaliser_edition({"operation": "scinder", "jour": jour}))
+    assert not (dossier / editions.NOM_JOURNAL).exists()
+    assert "01-03-2026;03-04-2026;Basse_2026" in (dossier / "periode.csv").read_text()
+    assert prix(RegistreCalculateur(dossier).donnees()) == prix(reg.donnees())
+
+
+def test_journal_ecarte(dossier):
+    reference = RegistreCalculateur(dossier).donnees()
+    journal = dossier / editions.NOM_JOURNAL
+    # periode.csv se termine le 07-03-2027 : la période ajoutée laisse un trou
+    journal.write_text(
+        json.dumps({"operation": "scinder", "jour": "2026-02-01"}) + "\n"
+        + json.dumps({"operation": "ajouter", "date_debut": "2027-03-20", "date_fin": "2027-04-30",
+                      "id_tarif": "Basse_2027"}) + "\n",
+        encoding="utf-8",
+    )
+    reg = RegistreCalculateur(dossier)
+    donnees = reg.donnees()
+    assert not journal.exists()
+    assert (dossier / f"{editions.NOM_JOURNAL}.rejete").exists()
+    assert "modification n°2" in reg.statistiques()["journal_rejete"]
+    assert periodes(donnees.calculateur.calendrier) == periodes(reference.calculateur.calendrier)
+    assert prix(donnees) == prix(reference)
+
+    # Les modifications suivantes repartent d'un journal neuf
+    reg.modifier(editions.normaliser_edition({"operation": "scinder", "jour": "2026-02-01"}))
+    assert prix(RegistreCalculateur(dossier).donnees()) == prix(reg.donnees())
+
+
+def _scinder(dossier, jours):
+    calcul.PARTAGE_ACTIF = False
+    reg = RegistreCalculateur(dossier, intervalle=0)
+    for jour in jours:
+        reg.modifier(editions.normaliser_edition({"operation": "scinder", "jour": jour.isoformat()}))
+
+
+@pytest.mark.skipif(calcul.fcntl is None, reason="verrou entre processus indisponible (fcntl)")
+def test_modifications_concurrentes(dossier, monkeypatch):
+    # Ajouts au journal et compactages de plusieurs processus : aucune modification perdue
+    monkeypatch.setattr(editions, "SEUIL_COMPACTAGE", 4)
+    calendrier = RegistreCalculateur(dossier).obtenir().calendrier
+    debuts = {p.debut for p in calendrier.periodes}
+    jours = [calendrier.periodes[0].debut + timedelta(days=k) for k in range(1, 400)]
+    jours = [j for j in jours if j not in debuts and j <= calendrier.periodes[-1].fin]
+    nb_processus, nb_modifications = 4, 10
+
+    contexte = multiprocessing.get_context("fork")
+    processus = [
+        contexte.Process(target=_scinder,
+                         args=(dossier, jours[k * nb_modifications:(k + 1) * nb_modifications]))
+        for k in range(nb_processus)
+    ]
+    for p in processus:
+        p.start()
+    for p in processus:
+        p.join()
+    assert [p.exitcode for p in processus] == [0] * nb_processus
+
+    final = RegistreCalculateur(dossier).obtenir().calendrier
+    assert len(final.periodes) == len(calendrier.periodes) + nb_processus * nb_modifications
+    final._verifier_consecutivite()
@@ -0,0 +1,112 @@
+"""
+Calcul par lot (IndexPrix.calculer_lot), avec NumPy et en Python pur :
+chaque total doit être celui du calculateur pour le même séjour.
+"""
+import random
+from datetime import timedelta
+
+import pytest
+
+from core import index_prix
+from core.calculateur import CalculateurLocation
+from core.index_prix import IndexPrix
+from core.regles import Regles
+
+GRAINE = 20260321
+
+REGLES = {
+    "sejour_minimum": 2,
+    "sejour_minimum_tarifs": {"Tres_haute_2026": 7},
+    "remises_duree": [{"nuitees": 7, "taux": 0.05}, {"nuitees": 28, "taux": 0.15}],
+    "menage": {"montant": 55, "montant_court": 30, "nuitees_court": 3},
+}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def mode(request, monkeypatch):
+    """Calcul vectorisé, ou boucle Python quand NumPy est absent."""
+    if request.param == "python":
+        monkeypatch.setattr(index_prix, "np", None)
+    elif index_prix.np is None:
+        pytest.skip("NumPy n'est pas installé")
+    return request.param
+
+
+@pytest.fixture
+def calculateur(donnees):
+    grille, calendrier = donnees
+    return CalculateurLocation(calendrier, grille, Regles.depuis_dict(REGLES).compiler(grille))
+
+
+def sejours(calendrier, nb):
+    """Séjours aléatoires dans l'horizon, dont quelques-uns vides (fin avant le début)."""
+    aleatoire = random.Random(GRAINE)
+    premier, dernier = calendrier.periodes[0].debut, calendrier.periodes[-1].fin
+    debuts, fins = [], []
+    while len(debuts) < nb:
+        debut = premier + timedelta(days=aleatoire.randint(0, (dernier - premier).days))
+        fin = debut + timedelta(days=aleatoire.randint(-2, 40))
+        if fin <= dernier:
+            debuts.append(debut)
+            fins.append(fin)
+    return debuts, fins
+
+
+def attendu(calculateur, debut, fin, plateforme, menage):
+    """(total, moyenne, nb_nuitees) d'après le calculateur."""
+    plan = calculateur.plan
+    nb_nuitees = (fin - debut).days + 1
+    if nb_nuitees <= 0:
+        return 0.0, 0.0, 0
+    if plateforme is None:
+        centimes = round(calculateur.calculer_total(debut, fin) * 100)
+    else:
+        centimes = plan.total_centimes(calculateur.calendrier, debut, fin, plateforme)
+    total = (centimes - plan.remise_centimes(centimes, nb_nuitees)) / 100
+    moyenne = total / nb_nuitees
+    if menage:
+        total += plan.frais_menage(nb_nuitees)
+    return total, moyenne, nb_nuitees
+
+
+@pytest.mark.parametrize("plateforme", [None, "airbnb", "booking"])
+@pytest.mark.parametrize("menage", [False, True])
+def test_totaux_egaux_au_calculateur(calculateur, mode, plateforme, menage):
+    calendrier = calculateur.calendrier
+    index = IndexPrix(calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    minimums = calculateur.plan.sejours_minimums(calendrier, index.premier_jour, index.dernier_jour)
+    debuts, fins = sejours(calendrier, 300)
+
+    resultat = index.calculer_lot(debuts, fins, plateforme=plateforme, menage=menage, minimums=minimums)
+    assert len(resultat.totaux) == len(debuts)
+    for k, (debut, fin) in enumerate(zip(debuts, fins)):
+        total, moyenne, nb_nuitees = attendu(calculateur, debut, fin, plateforme, menage)
+        assert resultat.totaux[k] == pytest.approx(total, abs=1e-9), (debut, fin)
+        assert resultat.moyennes[k] == pytest.approx(moyenne, abs=1e-9), (debut, fin)
+        assert resultat.nb_nuitees[k] == nb_nuitees
+        if nb_nuitees:
+            assert resultat.minimums[k] == calculateur.plan.sejour_minimum(calendrier, debut)
+
+
+def test_memes_resultats_avec_et_sans_numpy(calculateur, monkeypatch):
+    if index_prix.np is None:
+        pytest.skip("NumPy n'est pas installé")
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    debuts, fins = sejours(calculateur.calendrier, 500)
+    vectorise = index.calculer_lot(debuts, fins, plateforme="abritel", menage=True)
+    monkeypatch.setattr(index_prix, "np", None)
+    boucle = index.calculer_lot(debuts, fins, plateforme="abritel", menage=True)
+    for colonne in vectorise._fields:
+        assert list(getattr(vectorise, colonne)) == getattr(boucle, colonne), colonne
+
+
+def test_sejour_hors_calendrier(calculateur, mode):
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    debuts = [index.premier_jour, index.dernier_jour]
+    fins = [index.premier_jour + timedelta(days=3), index.dernier_jour + timedelta(days=1)]
+    with pytest.raises(ValueError, match="Séjour n°2 hors du calendrier"):
+        index.calculer_lot(debuts, fins)
+    with pytest.raises(ValueError, match="même longueur"):
+        index.calculer_lot(debuts, fins[:1])
+    with pytest.raises(ValueError, match="inconnue"):
+        index.calculer_lot(debuts[:1], fins[:1], plateforme="inconnue")
@@ -0,0 +1,128 @@
+"""
+Matrice des devis : chaque case doit valoir le total du séjour chiffré par
+le calculateur (remise de durée déduite), y compris après un
+rafraîchissement par bandes et après relecture du format binaire.
+"""
+import random
+from datetime import timedelta
+
+import pytest
+
+from core.calculateur import CalculateurLocation
+from core.calendrier_tarifaire import CalendrierTarifaire
+from core.grille_tarifs import GrilleTarifs
+from core.index_prix import IndexPrix
+from core.matrice import MatriceDevis
+from core.regles import Regles
+from services import editions
+
+GRAINE = 20260801
+
+REGLES = {
+    "sejour_minimum": 2,
+    "sejour_minimum_tarifs": {"Tres_haute_2026": 7},
+    "remises_duree": [{"nuitees": 7, "taux": 0.05}, {"nuitees": 14, "taux": 0.1}, {"nuitees": 28, "taux": 0.15}],
+}
+
+
+@pytest.fixture
+def calculateur(donnees):
+    grille, calendrier = donnees
+    plan = Regles.depuis_dict(REGLES).compiler(grille)
+    return CalculateurLocation(calendrier.copie(), grille, plan)
+
+
+def attendu(calculateur, arrivee, nb_nuitees, plateforme):
+    """Total du séjour d'après le calculateur, ou None s'il n'est pas réservable."""
+    plan, calendrier = calculateur.plan, calculateur.calendrier
+    if arrivee + timedelta(days=nb_nuitees - 1) > calendrier.periodes[-1].fin:
+        return None
+    if nb_nuitees < plan.sejour_minimum(calendrier, arrivee):
+        return None
+    fin = arrivee + timedelta(days=nb_nuitees - 1)
+    if plateforme is None:
+        total = round(calculateur.calculer_total(arrivee, fin) * 100)
+    else:
+        total = plan.total_centimes(calendrier, arrivee, fin, plateforme)
+    return total - plan.remise_centimes(total, nb_nuitees)
+
+
+def verifier_cases(matrice, calculateur, nb=400):
+    aleatoire = random.Random(GRAINE)
+    for _ in range(nb):
+        arrivee = matrice.premier_jour + timedelta(days=aleatoire.randrange(matrice.nb_jours))
+        nb_nuitees = aleatoire.randint(matrice.nuits_min, matrice.nuits_max)
+        for plateforme in matrice.plateformes:
+            assert matrice.total_centimes(arrivee, nb_nuitees, plateforme) == \
+                attendu(calculateur, arrivee, nb_nuitees, plateforme), (arrivee, nb_nuitees, plateforme)
+
+
+def test_cases_egales_au_calculateur(calculateur):
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    matrice = MatriceDevis(calculateur.calendrier, index)
+    verifier_cases(matrice, calculateur)
+
+
+def test_rafraichissement_par_bandes(calculateur):
+    calendrier, grille, plan = calculateur.calendrier, calculateur.grille_tarifs, calculateur.plan
+    index = IndexPrix(calendrier, grille, plan=plan)
+    matrice = MatriceDevis(calendrier, index)
+    ids = list(grille.tarifs)
+    aleatoire = random.Random(GRAINE)
+    nb_appliquees = 0
+
+    for _ in range(40):
+        premier, dernier = calendrier.periodes[0].debut, calendrier.periodes[-1].fin
+        jour = premier + timedelta(days=aleatoire.randint(0, (dernier - premier).days))
+        operation = aleatoire.choice(["scinder", "fusionner", "retarifer", "ajouter"])
+        if operation == "ajouter":
+            edition = {"operation": operation, "date_debut": (dernier + timedelta(days=1)).isoformat(),
+                       "date_fin": (dernier + timedelta(days=aleatoire.randint(0, 40))).isoformat(),
+                       "id_tarif": aleatoire.choice(ids)}
+        else:
+            edition = {"operation": operation, "jour": jour.isoformat(), "id_tarif": aleatoire.choice(ids)}
+        try:
+            debut, fin = editions.appliquer_edition(calendrier, grille, editions.normaliser_edition(edition))
+        except ValueError:
+            continue
+        nb_appliquees += 1
+        index.rafraichir(calendrier, debut, fin)
+        matrice.rafraichir(calendrier, index, debut, fin)
+
+        complete = MatriceDevis(calendrier, IndexPrix(calendrier, grille, plan=plan))
+        assert matrice.nb_jours == complete.nb_jours
+        assert matrice._cellules == complete._cellules, edition
+
+    assert nb_appliquees > 10
+    verifier_cases(matrice, calculateur)
+
+
+def test_format_binaire(calculateur, tmp_path):
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    matrice = MatriceDevis(calculateur.calendrier, index)
+    fichier = tmp_path / "matrice.bin"
+    matrice.enregistrer(str(fichier))
+    relue = MatriceDevis.charger(str(fichier), index)
+    assert relue._cellules == matrice._cellules
+    assert (relue.nuits_min, relue.nuits_max) == (matrice.nuits_min, matrice.nuits_max)
+
+
+def test_sejours_au_dela_de_32_bits(tmp_path):
+    # 28 nuits à 900 000 € : 2,52 milliards de centimes, hors de portée d'un int32
+    (tmp_path / "prix.csv").write_text("id;prix_semaine;prix_weekend\nLuxe;900000;950000\n")
+    (tmp_path / "periode.csv").write_text("date_debut;date_fin;id\n01-01-2026;31-03-2026;Luxe\n")
+    grille = GrilleTarifs.depuis_fichier(str(tmp_path / "prix.csv"))
+    calendrier = CalendrierTarifaire.depuis_fichier(str(tmp_path / "periode.csv"), grille)
+    calculateur = CalculateurLocation(calendrier, grille)
+    index = IndexPrix(calendrier, grille, plan=calculateur.plan)
+    matrice = MatriceDevis(calendrier, index)
+
+    arrivee = calendrier.periodes[0].debut
+    total = matrice.total_centimes(arrivee, 28)
+    assert total > 2 ** 31
+    assert total == attendu(calculateur, arrivee, 28, None)
+    for plateforme in index.commissions:
+        assert matrice.total_centimes(arrivee, 28, plateforme) == attendu(calculateur, arrivee, 28, plateforme)
+
+    matrice.enregistrer(str(tmp_path / "matrice.bin"))
+    assert MatriceDevis.charger(str(tmp_path / "matrice.bin"), index).total_centimes(arrivee, 28) == total
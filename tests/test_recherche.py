@@ -0,0 +1,98 @@
+"""
+Recherche des fenêtres les moins (ou plus) chères : le tas doit retenir
+exactement les fenêtres d'un parcours exhaustif chiffré par le calculateur,
+remise de durée et séjour minimum compris.
+"""
+import random
+from datetime import timedelta
+
+import pytest
+
+from core.calculateur import CalculateurLocation
+from core.index_prix import IndexPrix
+from core.recherche import Fenetre, rechercher_fenetres
+from core.regles import Regles
+
+GRAINE = 20260412
+
+REGLES = {
+    "sejour_minimum": 3,
+    "sejour_minimum_tarifs": {"Tres_haute_2026": 7, "Haute_2026": 5},
+    "remises_duree": [{"nuitees": 5, "taux": 0.03}, {"nuitees": 7, "taux": 0.05}, {"nuitees": 14, "taux": 0.1}],
+}
+
+
+@pytest.fixture
+def calculateur(donnees):
+    grille, calendrier = donnees
+    return CalculateurLocation(calendrier, grille, Regles.depuis_dict(REGLES).compiler(grille))
+
+
+def exhaustif(calculateur, date_debut, date_fin, nuits_min, nuits_max, plateforme, k,
+              moins_chers, critere, minimum_global):
+    """Toutes les fenêtres, chiffrées une à une puis triées (même ordre à égalité que le tas)."""
+    plan, calendrier = calculateur.plan, calculateur.calendrier
+    candidates = []
+    for nb_nuitees in range(nuits_min, nuits_max + 1):
+        debut = date_debut
+        while debut + timedelta(days=nb_nuitees - 1) <= date_fin:
+            fin = debut + timedelta(days=nb_nuitees - 1)
+            if nb_nuitees >= plan.sejour_minimum(calendrier, debut, minimum_global):
+                if plateforme is None:
+                    centimes = round(calculateur.calculer_total(debut, fin) * 100)
+                else:
+                    centimes = plan.total_centimes(calendrier, debut, fin, plateforme)
+                centimes -= plan.remise_centimes(centimes, nb_nuitees)
+                cle = centimes / nb_nuitees if critere == "moyenne" else centimes
+                candidates.append((cle, Fenetre(debut, fin, nb_nuitees, centimes / 100,
+                                                centimes / 100 / nb_nuitees)))
+            debut += timedelta(days=1)
+    candidates.sort(key=lambda c: c[0], reverse=not moins_chers)
+    return [fenetre for _, fenetre in candidates[:k]]
+
+
+def test_tas_egal_au_parcours_exhaustif(calculateur):
+    calendrier = calculateur.calendrier
+    index = IndexPrix(calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    premier, dernier = calendrier.periodes[0].debut, calendrier.periodes[-1].fin
+    aleatoire = random.Random(GRAINE)
+    nb_trouvees = 0
+
+    for _ in range(60):
+        date_debut = premier + timedelta(days=aleatoire.randint(0, (dernier - premier).days))
+        date_fin = min(date_debut + timedelta(days=aleatoire.randint(0, 50)), dernier)
+        nuits_min = aleatoire.randint(1, 10)
+        parametres = dict(
+            nuits_max=nuits_min + aleatoire.randint(0, 8),
+            plateforme=aleatoire.choice([None, *index.commissions]),
+            k=aleatoire.choice([1, 3, 5, 20]),
+            moins_chers=aleatoire.random() < 0.5,
+            critere=aleatoire.choice(["total", "moyenne"]),
+            minimum_global=aleatoire.random() < 0.7,
+        )
+        fenetres = rechercher_fenetres(index, date_debut, date_fin, nuits_min,
+                                       calendrier=calendrier, **parametres)
+        assert fenetres == exhaustif(calculateur, date_debut, date_fin, nuits_min, **parametres), \
+            (date_debut, date_fin, nuits_min, parametres)
+        nb_trouvees += bool(fenetres)
+    assert nb_trouvees > 30
+
+
+def test_sans_calendrier_seul_le_minimum_general_compte(calculateur):
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    debut = index.premier_jour
+    fenetres = rechercher_fenetres(index, debut, debut + timedelta(days=30), 1, 4, k=1000)
+    assert {f.nb_nuitees for f in fenetres} == {3, 4}
+    fenetres = rechercher_fenetres(index, debut, debut + timedelta(days=30), 1, 4, k=1000, minimum_global=False)
+    assert {f.nb_nuitees for f in fenetres} == {1, 2, 3, 4}
+
+
+@pytest.mark.parametrize("arguments", [
+    dict(nuits_min=0),
+    dict(nuits_min=5, nuits_max=4),
+    dict(nuits_min=3, critere="mediane"),
+])
+def test_parametres_invalides(calculateur, arguments):
+    index = IndexPrix(calculateur.calendrier, calculateur.grille_tarifs, plan=calculateur.plan)
+    with pytest.raises(ValueError):
+        rechercher_fenetres(index, index.premier_jour, index.premier_jour + timedelta(days=20), **arguments)
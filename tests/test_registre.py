@@ -0,0 +1,170 @@
+"""
+Registre des données d'une propriété : chargement, rechargement et
+conservation de la dernière version valide.
+"""
+import pickle
+import shutil
+from datetime import date
+
+import pytest
+
+from services import calcul
+from services.calcul import RegistreCalculateur
+
+FIXTURES = calcul.BASE_DIR / "tests" / "fixtures"
+
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    """Dossier de propriété avec les prix et périodes des fixtures."""
+    # Pas d'index publié dans results/partage pendant les tests
+    monkeypatch.setattr(calcul, "PARTAGE_ACTIF", False)
+    for nom in ("prix.csv", "periode.csv"):
+        shutil.copy(FIXTURES / nom, tmp_path / nom)
+    return tmp_path
+
+
+def test_fichier_absent_garde_la_version_precedente(dossier):
+    reg = RegistreCalculateur(dossier, intervalle=0)
+    avant = reg.donnees()
+    total = avant.calculateur.calculer_total(date(2026, 1, 5), date(2026, 1, 11))
+
+    (dossier / "periode.csv").unlink()
+    apres = reg.donnees()
+    assert apres is avant
+    assert apres.calculateur.calculer_total(date(2026, 1, 5), date(2026, 1, 11)) == total
+    assert "periode.csv" in reg.derniere_erreur
+
+    # Le fichier revient : rechargement normal et erreur effacée
+    shutil.copy(FIXTURES / "periode.csv", dossier / "periode.csv")
+    assert reg.donnees() is not avant
+    assert reg.derniere_erreur is None
+
+
+def test_fichier_invalide_garde_la_version_precedente(dossier):
+    reg = RegistreCalculateur(dossier, intervalle=0)
+    avant = reg.donnees()
+    (dossier / "periode.csv").write_text("date_debut;date_fin;id\n01-01-2026;31-01-2026;Inconnu\n")
+    assert reg.donnees() is avant
+    assert "Inconnu" in reg.derniere_erreur
+
+
+# ----------------------------------------------------------------------
+# Index partagé entre processus
+# ----------------------------------------------------------------------
+@pytest.fixture
+def partage(dossier, tmp_path_factory, monkeypatch):
+    """Partage actif, publié dans un dossier temporaire."""
+    repertoire = tmp_path_factory.mktemp("partage")
+    monkeypatch.setattr(calcul, "PARTAGE_DIR", repertoire)
+    monkeypatch.setattr(calcul, "PARTAGE_ACTIF", True)
+    return repertoire
+
+
+def cumuls(donnees) -> dict:
+    index = donnees.index
+    return {plateforme: list(index.cumuls_centimes(plateforme)) for plateforme in [None, *index.commissions]}
+
+
+@pytest.mark.parametrize("environnement, attendu", [
+    ({}, False),
+    ({"WEB_CONCURRENCY": "1"}, False),
+    ({"WEB_CONCURRENCY": "4"}, True),
+    ({"WEB_CONCURRENCY": "4", "TARIFS_INDEX_PARTAGE": "0"}, False),
+    ({"TARIFS_INDEX_PARTAGE": "1"}, True),
+])
+def test_partage_par_defaut(monkeypatch, environnement, attendu):
+    for nom in ("WEB_CONCURRENCY", "TARIFS_INDEX_PARTAGE"):
+        monkeypatch.delenv(nom, raising=False)
+    for nom, valeur in environnement.items():
+        monkeypatch.setenv(nom, valeur)
+    assert calcul._partage_par_defaut() is attendu
+
+
+def test_index_publie_puis_attache(dossier, partage):
+    premier = RegistreCalculateur(dossier).donnees()
+    publies = list(partage.glob("index-*.bin"))
+    assert [f.name for f in publies] == [f"index-{premier.version}.bin"]
+    assert calcul._lire_generation() == (1, premier.version)
+
+    # Un second registre (un autre worker) projette le même fichier
+    second = RegistreCalculateur(dossier).donnees()
+    assert second.version == premier.version
+    assert second.index is not premier.index
+    assert cumuls(second) == cumuls(premier)
+    assert list(partage.glob("index-*.bin")) == publies
+    assert calcul._lire_generation() == (1, premier.version)
+
+    # Mêmes prix qu'un index construit sans partage
+    calcul.PARTAGE_ACTIF = False
+    assert cumuls(RegistreCalculateur(dossier).donnees()) == cumuls(premier)
+
+
+def test_generation_declenche_le_controle(dossier, partage):
+    lent = RegistreCalculateur(dossier, intervalle=3600)
+    avant = lent.donnees()
+    rapide = RegistreCalculateur(dossier, intervalle=0)
+    rapide.donnees()
+
+    # Sans annonce, l'intervalle de contrôle n'est pas encore écoulé
+    contenu = (dossier / "periode.csv").read_text()
+    (dossier / "periode.csv").write_text(contenu.replace("Basse_2026", "Haute_2026", 1))
+    assert lent.donnees() is avant
+
+    # Un autre processus recharge et publie : le compteur change, contrôle immédiat
+    nouvelle = rapide.donnees()
+    assert nouvelle.version != avant.version
+    assert calcul._lire_generation() == (2, nouvelle.version)
+    apres = lent.donnees()
+    assert apres.version == nouvelle.version
+    assert cumuls(apres) == cumuls(nouvelle)
+
+
+def test_index_partage_transmissible(dossier, partage):
+    # Un index projeté depuis results/partage se copie pour un processus du pool
+    index = RegistreCalculateur(dossier).donnees().index
+    assert index._carte is not None
+    copie = pickle.loads(pickle.dumps(index))
+    assert not hasattr(copie, "_carte")
+    assert copie.premier_jour == index.premier_jour
+    for plateforme in [None, *index.commissions]:
+        assert list(copie.cumuls_centimes(plateforme)) == list(index.cumuls_centimes(plateforme))
+
+
+# ----------------------------------------------------------------------
+# Devis toutes propriétés
+# ----------------------------------------------------------------------
+@pytest.fixture
+def proprietes(dossier, tmp_path_factory, monkeypatch):
+    """Propriété par défaut, une seconde plus chère et une troisième illisible."""
+    repertoire = tmp_path_factory.mktemp("proprietes")
+    for nom in ("chalet", "studio"):
+        (repertoire / nom).mkdir()
+        shutil.copy(FIXTURES / "periode.csv", repertoire / nom / "periode.csv")
+    prix = (FIXTURES / "prix.csv").read_text()
+    (repertoire / "chalet" / "prix.csv").write_text(prix.replace("Basse_2026;50;55", "Basse_2026;150;155"))
+    (repertoire / "studio" / "prix.csv").write_text("id;prix_semaine;prix_weekend\nAutre;10;10\n")
+
+    monkeypatch.setattr(calcul, "PROPRIETES_DIR", repertoire)
+    monkeypatch.setattr(calcul, "_registres", {})
+    monkeypatch.setattr(calcul, "registre", RegistreCalculateur(dossier))
+    return repertoire
+
+
+@pytest.mark.parametrize("processus", [None, 2])
+def test_devis_toutes_proprietes(proprietes, processus):
+    debut, fin = date(2026, 1, 5), date(2026, 1, 11)
+    devis = calcul.devis_toutes_proprietes(debut, fin, "airbnb", menage=True, processus=processus)
+    assert [d["propriete"] for d in devis] == [calcul.PROPRIETE_DEFAUT, "chalet", "studio"]
+
+    defaut, chalet, studio = devis
+    for resultat in (defaut, chalet):
+        plan = calcul.registre_propriete(resultat["propriete"]).donnees().index.plan
+        calendrier = calcul.registre_propriete(resultat["propriete"]).obtenir().calendrier
+        centimes = plan.total_centimes(calendrier, debut, fin, "airbnb")
+        assert resultat["total"] == plan.devis(centimes, 7, True).total
+    assert chalet["total"] > defaut["total"]
+    assert "Basse_2026" in studio["erreur"]
+
+    hors_calendrier = calcul.devis_toutes_proprietes(date(2030, 1, 5), date(2030, 1, 11), processus=processus)
+    assert all("erreur" in d for d in hors_calendrier)
@@ -0,0 +1,100 @@
+"""
+Non-régression des tableaux de tarifs : les lignes et les CSV produits
+doivent rester identiques, octet par octet, à ceux du code d'origine.
+
+Les fichiers de fixtures/tableaux ont été générés par TableauTarifs avant
+l'introduction des majorations précalculées (exporter_csv et
+exporter_csv_plage), à partir de fixtures/prix.csv et fixtures/periode.csv.
+Ils se nomment <variante>_<cas>.csv, la variante « net » désignant les
+tarifs sans commission.
+"""
+import csv
+import io
+import zipfile
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from core.calculateur import CalculateurLocation
+from core import tableau_tarifs
+from core.tableau_tarifs import TableauPlateformes, TableauTarifs
+
+TABLEAUX = Path(__file__).resolve().parent / "fixtures" / "tableaux"
+VARIANTES = [None, "airbnb", "booking", "abritel", "gites"]
+PLAGES = {
+    "annee": (date(2026, 1, 1), date(2026, 12, 31)),
+    "courte": (date(2026, 5, 28), date(2026, 6, 10)),
+    "jour": (date(2026, 7, 4), date(2026, 7, 4)),
+}
+
+
+def reference(plateforme, cas) -> bytes:
+    return (TABLEAUX / f"{plateforme or 'net'}_{cas}.csv").read_bytes()
+
+
+def lignes_reference(plateforme, cas) -> list:
+    flux = io.StringIO(reference(plateforme, cas).decode("utf-8-sig"), newline="")
+    return list(csv.DictReader(flux, delimiter=";"))
+
+
+@pytest.fixture(scope="module")
+def calculateur(donnees):
+    grille, calendrier = donnees
+    return CalculateurLocation(calendrier, grille)
+
+
+@pytest.mark.parametrize("plateforme", VARIANTES)
+def test_tableau_complet(calculateur, plateforme, tmp_path):
+    tableau = TableauTarifs(calculateur, plateforme=plateforme)
+    assert list(tableau.iterer_tableau()) == lignes_reference(plateforme, "complet")
+    assert tableau.generer_tableau() == lignes_reference(plateforme, "complet")
+
+    fichier = tmp_path / "tableau.csv"
+    tableau.exporter_csv(str(fichier))
+    assert fichier.read_bytes() == reference(plateforme, "complet")
+
+
+@pytest.mark.parametrize("cas", PLAGES)
+@pytest.mark.parametrize("plateforme", VARIANTES)
+def test_tableau_plage(calculateur, plateforme, cas, tmp_path):
+    date_debut, date_fin = PLAGES[cas]
+    tableau = TableauTarifs(calculateur, plateforme=plateforme)
+    assert list(tableau.iterer_tableau_plage(date_debut, date_fin)) == lignes_reference(plateforme, cas)
+    assert tableau.generer_tableau_plage(date_debut, date_fin) == lignes_reference(plateforme, cas)
+    assert tableau.csv_plage(date_debut, date_fin) == reference(plateforme, cas)
+
+    fichier = tmp_path / "tableau.csv"
+    tableau.exporter_csv_plage(str(fichier), date_debut, date_fin)
+    assert fichier.read_bytes() == reference(plateforme, cas)
+
+
+def test_blocs_csv_petits(calculateur):
+    # Un découpage en blocs minuscules ne doit pas changer le contenu
+    date_debut, date_fin = PLAGES["annee"]
+    lignes = TableauTarifs(calculateur, plateforme="booking").iterer_tableau_plage(date_debut, date_fin)
+    assert b"".join(TableauTarifs.blocs_csv(lignes, taille_bloc=1)) == reference("booking", "annee")
+
+
+@pytest.mark.parametrize("cas", PLAGES)
+def test_toutes_plateformes(calculateur, cas):
+    date_debut, date_fin = PLAGES[cas]
+    tableaux = TableauPlateformes(calculateur)
+    assert tableaux.plateformes == VARIANTES
+
+    generes = tableaux.generer_plage(date_debut, date_fin)
+    for plateforme in VARIANTES:
+        assert generes[plateforme] == lignes_reference(plateforme, cas)
+
+    with zipfile.ZipFile(io.BytesIO(tableaux.zip_plage(date_debut, date_fin))) as archive:
+        for plateforme in VARIANTES:
+            assert archive.read(TableauTarifs.nom_fichier(plateforme)) == reference(plateforme, cas)
+
+
+def test_cache_de_majoration_borne():
+    # Une grille nouvelle à chaque rechargement : le cache ne grossit pas sans fin
+    majorer = tableau_tarifs.majorer_centimes
+    for prix in range(1, 3 * tableau_tarifs.TAILLE_CACHE_MAJORATION):
+        assert majorer(prix * 100, 0.164) == majorer.__wrapped__(prix * 100, 0.164)
+    assert majorer.cache_info().currsize <= tableau_tarifs.TAILLE_CACHE_MAJORATION
+    assert tableau_tarifs.majorer_prix.cache_info().maxsize == tableau_tarifs.TAILLE_CACHE_MAJORATION
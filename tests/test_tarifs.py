@@ -0,0 +1,27 @@
+"""
+Prix des tarifs en centimes entiers : même conversion décimale et même
+arrondi (au centime supérieur) que la majoration des plateformes.
+"""
+import pytest
+
+from core.tarifs import Tarif, centimes, tarif_partage
+
+
+@pytest.mark.parametrize("prix, attendu", [
+    (50, 5000),
+    (50.1, 5010),
+    ("63.45", 6345),
+    (0.125, 13),      # arrondi bancaire : 12
+    (2.675, 268),     # 2.675 * 100 vaut 267.49999... en virgule flottante
+    (33.333, 3334),
+    (1e-9, 1),
+])
+def test_centimes(prix, attendu):
+    assert centimes(prix) == attendu
+
+
+def test_tarif_partage():
+    tarif = tarif_partage(70, 80.005)
+    assert (tarif.semaine_cents, tarif.weekend_cents) == (7000, 8001)
+    assert tarif_partage(70.0, 80.005) is tarif
+    assert Tarif(70, 80).prix_weekend == 80.0